@@ -1,44 +1,63 @@
+from typing import Optional
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from ..models.schemas import ChunkStrategy, VectorBackend, DBBackend, IngestResponse
-from ..services.chunking import chunk_text
-from ..services.embedding import encode_texts
-from ..services.vector_store import VectorItem, upsert_vectors
+from ..models.schemas import ChunkStrategy, VectorBackend, DBBackend, IngestJobResponse, IngestJobStatus, DocumentDeleted, TenantDropped
+from ..services.jobs import IngestJob, get_job_queue, new_job_id, spool_path
+from ..services.tenants import delete_document, drop_tenant
 from ..core.config import get_settings
-from ..db import sql as sql_db
-from ..db import nosql as nosql_db
-import uuid
-
-from pypdf import PdfReader
+from ..core.concurrency import run_io
+from ..core.tracing import span
+import shutil
 
 router = APIRouter(prefix="/api", tags=["ingestion"])
 settings = get_settings()
 
-def extract_text(file: UploadFile) -> str:
-    if file.filename.lower().endswith(".txt"):
-        return file.file.read().decode("utf-8", errors="ignore")
-    if file.filename.lower().endswith(".pdf"):
-        reader = PdfReader(file.file)
-        text = []
-        for p in reader.pages:
-            t = p.extract_text() or ""
-            text.append(t)
-        return "\n".join(text)
-    raise HTTPException(status_code=400, detail="Only .pdf and .txt supported")
+def _check_type(file: UploadFile) -> None:
+    if not file.filename.lower().endswith((".txt", ".pdf")):
+        raise HTTPException(status_code=400, detail="Only .pdf and .txt supported")
+
+def _spool(file: UploadFile, job_id: str) -> str:
+    path = spool_path(job_id, file.filename)
+    with open(path, "wb") as out:
+        shutil.copyfileobj(file.file, out, length=1 << 20)
+    return str(path)
 
-@router.post("/ingest", response_model=IngestResponse)
+@router.post("/ingest", response_model=IngestJobResponse, status_code=202)
 async def ingest_document(
     file: UploadFile = File(...),
     strategy: ChunkStrategy = Form(...),
     vector_backend: VectorBackend = Form(...),
     db_backend: DBBackend = Form(...),
+    doc_id: Optional[str] = Form(None, description="Stable document key: re-uploads under it replace the document, unchanged chunks are not re-embedded. Omitted = a new document"),
+    tenant_id: Optional[str] = Form(None, max_length=128, description="Tenant partition; omitted = the default one"),
 ):
-    raw = extract_text(file)
-    chunks = chunk_text(raw, strategy.value)
-    vecs = encode_texts([c.text for c in chunks])
-    items = [VectorItem(id=str(uuid.uuid4()), vector=v.tolist(), text=c.text, metadata={"filename": file.filename}) for c, v in zip(chunks, vecs)]
-    upsert_vectors(items, backend=vector_backend.value)
-    if db_backend.value == "postgres":
-        sql_db.save_metadata(file.filename, strategy.value, vector_backend.value)
-    else:
-        await nosql_db.save_metadata(file.filename, strategy.value, vector_backend.value)
-    return IngestResponse(chunks=len(chunks), vector_backend=vector_backend)
+    _check_type(file)
+    job_id = new_job_id()
+    with span("spool"):
+        path = await run_io(_spool, file, job_id)
+    job = IngestJob(id=job_id, filename=file.filename, path=path, strategy=strategy.value,
+                    vector_backend=vector_backend.value, db_backend=db_backend.value, doc_id=doc_id,
+                    tenant_id=tenant_id or None)
+    await get_job_queue().submit(job)
+    return IngestJobResponse(job_id=job_id, status=job.status)
+
+@router.get("/ingest/{job_id}", response_model=IngestJobStatus)
+async def ingest_status(job_id: str):
+    job = await get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown ingest job")
+    return IngestJobStatus(
+        job_id=job.id, status=job.status, filename=job.filename, doc_id=job.doc_id or job.id,
+        tenant_id=job.tenant_id, strategy=job.strategy, vector_backend=job.vector_backend, attempts=job.attempts, pages=job.pages,
+        chunks=job.chunks, skipped=job.skipped, deleted=job.deleted, error=job.error, timings=job.timings,
+    )
+
+@router.delete("/documents/{doc_id:path}", response_model=DocumentDeleted)
+async def remove_document(doc_id: str, vector_backend: VectorBackend, db_backend: DBBackend,
+                          tenant_id: Optional[str] = None):
+    chunks = await delete_document(doc_id, tenant_id or None, vector_backend.value, db_backend.value)
+    return DocumentDeleted(doc_id=doc_id, tenant_id=tenant_id or None, chunks=chunks)
+
+@router.delete("/tenants/{tenant_id}", response_model=TenantDropped)
+async def remove_tenant(tenant_id: str, vector_backend: VectorBackend, db_backend: DBBackend):
+    documents = await drop_tenant(tenant_id, vector_backend.value, db_backend.value)
+    return TenantDropped(tenant_id=tenant_id, documents=documents)
@@ -1,9 +1,17 @@
-from fastapi import APIRouter
-from ..models.schemas import ChatQuery, ChatResponse, BookingDetails, BookingResponse
-from ..services.memory import get_history, append_message
-from ..services.embedding import encode_texts
-from ..services.vector_store import search_vectors
+import asyncio
+import time
+import numpy as np
+from fastapi import APIRouter, HTTPException
+from ..models.schemas import ChatQuery, ChatResponse, ChatBatchRequest, ChatBatchResponse, BookingDetails, BookingResponse, EmailStatus, RetrievalMode
+from ..services.memory import get_history, get_histories, append_messages, append_many
+from ..services.embedding import aencode_texts
+from ..services.vector_store import SearchFilter, SearchHit, search_vectors, search_vectors_batch
+from ..services.lexical import reciprocal_rank_fusion, search_lexical
+from ..services.answer_cache import CachedAnswer, get_answer_cache
+from ..core.concurrency import run_cpu
+from ..core.tracing import span, traced
 from ..services.booking import save_booking, send_confirmation
+from ..services.outbox import get_message, live_senders
 from ..core.config import get_settings
 
 settings = get_settings()
@@ -14,19 +22,144 @@ def synthesize_answer(query: str, context_texts: list[str], history: list[tuple[
     ctx = "\n---\n".join(context_texts)
     return f"Based on the docs, here is a concise answer to: '{query}'.\n\nContext used:\n{ctx[:1200]}\n\n(History considered: {len(history)} turns)"
 
+def _where(query: ChatQuery) -> SearchFilter:
+    # hashable: batch queries with the same filter share one search call
+    doc_ids = tuple(sorted(set(query.doc_ids))) if query.doc_ids is not None else None
+    return SearchFilter(query.tenant_id or None, doc_ids)
+
+def _lexical_search(query: ChatQuery, top_k: int) -> list[SearchHit]:
+    where = _where(query)
+    return search_lexical(query.query, top_k, where.tenant_id, where.doc_ids)
+
+async def retrieve(query: ChatQuery, qvec: np.ndarray | None = None) -> list[SearchHit]:
+    if query.retrieval == RetrievalMode.lexical:
+        with span("search", "lexical"):
+            return await run_cpu(_lexical_search, query, query.top_k)
+    if qvec is None:
+        qvec = (await aencode_texts([query.query]))[0]
+    if query.retrieval == RetrievalMode.dense:
+        return await search_vectors(qvec, top_k=query.top_k, backend=settings.VECTOR_BACKEND, where=_where(query))
+    depth = max(settings.HYBRID_CANDIDATES, query.top_k)
+    async def _lexical() -> list[SearchHit]:
+        with span("search", "lexical"):
+            return await run_cpu(_lexical_search, query, depth)
+    dense, lexical = await asyncio.gather(
+        search_vectors(qvec, top_k=depth, backend=settings.VECTOR_BACKEND, where=_where(query)),
+        _lexical(),
+    )
+    return reciprocal_rank_fusion(dense, lexical, k=settings.RRF_K, top_k=query.top_k)
+
 @router.post("/chat", response_model=ChatResponse)
 async def chat(query: ChatQuery) -> ChatResponse:
-    history = get_history(query.session_id, limit=12)
-    qvec = encode_texts([query.query])[0].tolist()
-    results = search_vectors(qvec, top_k=query.top_k, backend=settings.VECTOR_BACKEND)
-    ctx_texts = [r[2].get("text", "") for r in results]
-    answer = synthesize_answer(query.query, ctx_texts, history)
-    append_message(query.session_id, "user", query.query)
-    append_message(query.session_id, "assistant", answer)
+    t0 = time.perf_counter()
+    history = await get_history(query.session_id, limit=12)
+    if not settings.ANSWER_CACHE_ENABLED or query.retrieval == RetrievalMode.lexical:
+        # the cache is keyed by query vectors; BM25 alone needs no embedding and is cheap to rerun
+        results = await retrieve(query)
+        ctx_texts = [r[2].get("text", "") for r in results]
+        answer = traced("synthesize", "", synthesize_answer, query.query, ctx_texts, history)
+    else:
+        cache = get_answer_cache()
+        # cached context must never cross tenants or document filters
+        where = _where(query)
+        docs = ",".join(where.doc_ids) if where.doc_ids is not None else "*"
+        scope = f"{settings.VECTOR_BACKEND}:{where.tenant_id or ''}:{docs}:{query.retrieval.value}:{query.top_k}"
+        qvec = (await aencode_texts([query.query]))[0]
+        with span("answer_cache"):
+            await cache.sync()
+            hit = cache.lookup(scope, qvec)
+        if hit is not None:
+            ctx_texts = hit.context
+            # answers depend on the conversation, so only history-free turns reuse one
+            if hit.answer is not None and not history:
+                answer = hit.answer
+            else:
+                answer = traced("synthesize", "", synthesize_answer, query.query, ctx_texts, history)
+        else:
+            results = await retrieve(query, qvec)
+            ctx_texts = [r[2].get("text", "") for r in results]
+            answer = traced("synthesize", "", synthesize_answer, query.query, ctx_texts, history)
+            cache.store(scope, qvec, CachedAnswer(query.query, ctx_texts, None if history else answer))
+        cache.stats.observe(hit is not None, time.perf_counter() - t0)
+    await append_messages(query.session_id, [("user", query.query), ("assistant", answer)])
     return ChatResponse(response=answer, context=ctx_texts)
 
+async def retrieve_batch(queries: list[ChatQuery], qvecs: np.ndarray) -> list[list[SearchHit]]:
+    # one multi-query search per retriever, each at the deepest depth any query needs;
+    # qvecs holds one row per non-lexical query, in order
+    results: list[list[SearchHit]] = [[] for _ in queries]
+    lexical_idx = [i for i, q in enumerate(queries) if q.retrieval != RetrievalMode.dense]
+    vector_idx = [i for i, q in enumerate(queries) if q.retrieval != RetrievalMode.lexical]
+    def depth(q: ChatQuery) -> int:
+        return q.top_k if q.retrieval != RetrievalMode.hybrid else max(settings.HYBRID_CANDIDATES, q.top_k)
+    async def _dense() -> list[list[SearchHit]]:
+        # one multi-query search per distinct tenant/document filter
+        groups: dict[SearchFilter, list[int]] = {}
+        for row, i in enumerate(vector_idx):
+            groups.setdefault(_where(queries[i]), []).append(row)
+        async def _group(where: SearchFilter, rows: list[int]) -> list[list[SearchHit]]:
+            k = max(depth(queries[vector_idx[r]]) for r in rows)
+            return await search_vectors_batch(qvecs[rows], top_k=k, backend=settings.VECTOR_BACKEND, where=where)
+        found = await asyncio.gather(*(_group(w, rows) for w, rows in groups.items()))
+        out: list[list[SearchHit]] = [[] for _ in vector_idx]
+        for rows, hits in zip(groups.values(), found):
+            for r, h in zip(rows, hits):
+                out[r] = h
+        return out
+    async def _lexical() -> list[list[SearchHit]]:
+        if not lexical_idx:
+            return []
+        jobs = [(queries[i], depth(queries[i])) for i in lexical_idx]
+        with span("search", "lexical"):
+            return await run_cpu(lambda: [_lexical_search(q, k) for q, k in jobs])
+    dense, lexical = await asyncio.gather(_dense(), _lexical())
+    dense_by = dict(zip(vector_idx, dense))
+    lexical_by = dict(zip(lexical_idx, lexical))
+    for i, q in enumerate(queries):
+        if q.retrieval == RetrievalMode.dense:
+            results[i] = dense_by[i][:q.top_k]
+        elif q.retrieval == RetrievalMode.lexical:
+            results[i] = lexical_by[i]
+        else:
+            d = depth(q)
+            results[i] = reciprocal_rank_fusion(dense_by[i][:d], lexical_by[i], k=settings.RRF_K, top_k=q.top_k)
+    return results
+
+@router.post("/chat/batch", response_model=ChatBatchResponse)
+async def chat_batch(req: ChatBatchRequest) -> ChatBatchResponse:
+    # every query in the batch sees the history as it was when the batch arrived;
+    # the answer cache is bypassed
+    queries = req.queries
+    if len(queries) > settings.CHAT_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {settings.CHAT_BATCH_MAX} queries per batch")
+    if not queries:
+        return ChatBatchResponse(results=[])
+    # lexical-only queries are left out of the (single) encode call
+    texts = [q.query for q in queries if q.retrieval != RetrievalMode.lexical]
+    async def _embed() -> np.ndarray:
+        return await aencode_texts(texts) if texts else np.zeros((0, 0), dtype=np.float32)
+    histories, qvecs = await asyncio.gather(get_histories([q.session_id for q in queries], limit=12), _embed())
+    hits = await retrieve_batch(queries, qvecs)
+    out: list[ChatResponse] = []
+    turns: dict[str, list[tuple[str, str]]] = {}
+    for q, results in zip(queries, hits):
+        ctx_texts = [r[2].get("text", "") for r in results]
+        answer = traced("synthesize", "", synthesize_answer, q.query, ctx_texts, histories[q.session_id])
+        turns.setdefault(q.session_id, []).extend([("user", q.query), ("assistant", answer)])
+        out.append(ChatResponse(response=answer, context=ctx_texts))
+    await append_many(turns)
+    return ChatBatchResponse(results=out)
+
 @router.post("/book", response_model=BookingResponse)
 async def book(details: BookingDetails) -> BookingResponse:
-    save_booking(details)
-    send_confirmation(details)
-    return BookingResponse(status="confirmed")
+    await save_booking(details)
+    msg = await send_confirmation(details)
+    return BookingResponse(status="confirmed", email_id=msg.id if msg else None)
+
+@router.get("/book/email/{email_id}", response_model=EmailStatus)
+async def email_status(email_id: str) -> EmailStatus:
+    msg, senders = await asyncio.gather(get_message(email_id), live_senders())
+    if msg is None:
+        raise HTTPException(status_code=404, detail="Unknown email")
+    return EmailStatus(email_id=msg.id, status=msg.status, attempts=msg.attempts, error=msg.error,
+                       created_at=msg.created_at, sent_at=msg.sent_at, senders=senders)
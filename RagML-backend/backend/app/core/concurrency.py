@@ -0,0 +1,50 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, TypeVar
+import asyncio
+import multiprocessing as mp
+from .config import get_settings
+
+settings = get_settings()
+T = TypeVar("T")
+
+# CPU-bound work (embedding, chunking, PDF parsing) goes to a small pool sized to
+# the cores we want to give it; blocking SDK / network calls go to a wider pool
+# so they never queue behind a long encode.
+_cpu: ThreadPoolExecutor | None = None
+_io: ThreadPoolExecutor | None = None
+_proc: ProcessPoolExecutor | None = None
+
+def _cpu_pool() -> ThreadPoolExecutor:
+    global _cpu
+    if _cpu is None:
+        _cpu = ThreadPoolExecutor(max_workers=settings.CPU_EXECUTOR_WORKERS, thread_name_prefix="cpu")
+    return _cpu
+
+def _io_pool() -> ThreadPoolExecutor:
+    global _io
+    if _io is None:
+        _io = ThreadPoolExecutor(max_workers=settings.IO_EXECUTOR_WORKERS, thread_name_prefix="io")
+    return _io
+
+def process_pool() -> ProcessPoolExecutor | None:
+    # pure-Python CPU work (PDF parsing) that the GIL would serialize on threads;
+    # spawned, not forked, because the parent already runs threads
+    global _proc
+    if _proc is None and settings.PROCESS_EXECUTOR_WORKERS > 1:
+        _proc = ProcessPoolExecutor(max_workers=settings.PROCESS_EXECUTOR_WORKERS, mp_context=mp.get_context("spawn"))
+    return _proc
+
+async def run_cpu(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    return await asyncio.get_running_loop().run_in_executor(_cpu_pool(), partial(fn, *args, **kwargs))
+
+async def run_io(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    return await asyncio.get_running_loop().run_in_executor(_io_pool(), partial(fn, *args, **kwargs))
+
+def shutdown_executors() -> None:
+    global _cpu, _io, _proc
+    for pool in (_cpu, _io, _proc):
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+    _cpu = _io = _proc = None
@@ -1,8 +1,9 @@
+from __future__ import annotations
 from pydantic import EmailStr
 from typing import Sequence
 import smtplib
+import time
 from email.mime.text import MIMEText
-from pydantic import EmailStr
 from .config import get_settings
 
 try:
@@ -14,20 +15,92 @@ except Exception:
 
 settings = get_settings()
 
-def send_email(to: Sequence[EmailStr], subject: str, html: str) -> None:
-    if settings.SENDGRID_API_KEY and SendGridAPIClient is not None:
-        message = Mail(from_email=settings.EMAIL_SENDER, to_emails=list(to), subject=subject, html_content=html)
-        sg = SendGridAPIClient(settings.SENDGRID_API_KEY)
-        sg.send(message)
-        return
-    # Fallback: SMTP
-    if not all([settings.SMTP_HOST, settings.SMTP_USERNAME, settings.SMTP_PASSWORD]):
-        raise RuntimeError("Email not configured (SENDGRID_API_KEY or SMTP_* required)")
+def build_message(to: Sequence[EmailStr], subject: str, html: str) -> MIMEText:
     msg = MIMEText(html, "html")
     msg["Subject"] = subject
     msg["From"] = settings.EMAIL_SENDER
     msg["To"] = ",".join(to)
-    with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT) as server:
-        server.starttls()
-        server.login(settings.SMTP_USERNAME, settings.SMTP_PASSWORD)
-        server.sendmail(settings.EMAIL_SENDER, list(to), msg.as_string())
+    return msg
+
+class SmtpSession:
+    """One SMTP connection kept open across messages.
+
+    The connect + STARTTLS + login handshake runs once; an idle connection is
+    probed with NOOP before reuse and reopened if the server dropped it.
+    Blocking: call from the I/O executor.
+    """
+
+    def __init__(self, host: str, port: int, username: str | None, password: str | None,
+                 starttls: bool = True, timeout: float = 30.0):
+        self.host, self.port = host, port
+        self.username, self.password = username, password
+        self.starttls, self.timeout = starttls, timeout
+        self._smtp: smtplib.SMTP | None = None
+        self._used = 0.0
+
+    def _open(self) -> smtplib.SMTP:
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password or "")
+        except BaseException:
+            smtp.close()
+            raise
+        return smtp
+
+    def _conn(self) -> smtplib.SMTP:
+        if self._smtp is not None and time.monotonic() - self._used > settings.EMAIL_IDLE_NOOP_S:
+            try:
+                if self._smtp.noop()[0] != 250:
+                    raise smtplib.SMTPServerDisconnected("NOOP refused")
+            except (smtplib.SMTPException, OSError):
+                self.close()
+        if self._smtp is None:
+            self._smtp = self._open()
+        return self._smtp
+
+    def send(self, to: Sequence[EmailStr], subject: str, html: str) -> None:
+        msg = build_message(to, subject, html).as_string()
+        try:
+            self._conn().sendmail(settings.EMAIL_SENDER, list(to), msg)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            # the server closed an idle connection between probes: one fresh try
+            self.close()
+            self._conn().sendmail(settings.EMAIL_SENDER, list(to), msg)
+        self._used = time.monotonic()
+
+    def close(self) -> None:
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                self._smtp.close()
+            self._smtp = None
+
+class SendGridSession:
+    def __init__(self, api_key: str):
+        self._client = SendGridAPIClient(api_key)
+
+    def send(self, to: Sequence[EmailStr], subject: str, html: str) -> None:
+        self._client.send(Mail(from_email=settings.EMAIL_SENDER, to_emails=list(to), subject=subject, html_content=html))
+
+    def close(self) -> None:
+        pass
+
+def open_session() -> SmtpSession | SendGridSession:
+    if settings.SENDGRID_API_KEY and SendGridAPIClient is not None:
+        return SendGridSession(settings.SENDGRID_API_KEY)
+    if not settings.SMTP_HOST:
+        raise RuntimeError("Email not configured (SENDGRID_API_KEY or SMTP_* required)")
+    return SmtpSession(settings.SMTP_HOST, settings.SMTP_PORT or 587, settings.SMTP_USERNAME,
+                       settings.SMTP_PASSWORD, starttls=settings.SMTP_STARTTLS)
+
+def send_email(to: Sequence[EmailStr], subject: str, html: str) -> None:
+    # one-off send on a fresh session; bookings go through the outbox instead
+    session = open_session()
+    try:
+        session.send(to, subject, html)
+    finally:
+        session.close()
@@ -0,0 +1,13 @@
+from functools import lru_cache
+from types import ModuleType
+import importlib
+
+# Heavy SDKs are imported the first time a backend that needs them is used,
+# so `import app.main` stays cheap and unused backends are never loaded.
+
+@lru_cache(maxsize=None)
+def optional_import(name: str) -> ModuleType | None:
+    try:
+        return importlib.import_module(name)
+    except Exception:
+        return None
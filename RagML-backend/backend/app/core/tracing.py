@@ -0,0 +1,189 @@
+from __future__ import annotations
+from bisect import bisect_left
+from contextlib import nullcontext
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, ContextManager, Dict, List, Tuple
+import threading
+import time
+from .config import get_settings
+from ..evaluation.metrics import timeit
+
+# Per-stage spans for the chat and ingestion hot paths.
+#
+# Every span feeds a process-wide histogram rendered at /metrics in the
+# Prometheus text format, and is also appended to the current request's stage
+# list (a ContextVar) so TimingMiddleware can emit a Server-Timing header.
+# With TRACING_ENABLED off, span() hands back one shared no-op context manager.
+
+settings = get_settings()
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[values] = self._values.get(values, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, v in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labels, key)} {v}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, buckets
+        self._series: Dict[Tuple[str, ...], List[float]] = {}  # per-bucket counts, then sum, count
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, *values: str) -> None:
+        i = bisect_left(self.buckets, seconds)
+        with self._lock:
+            s = self._series.get(values)
+            if s is None:
+                s = self._series[values] = [0.0] * (len(self.buckets) + 2)
+            if i < len(self.buckets):
+                s[i] += 1
+            s[-2] += seconds
+            s[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((k, list(v)) for k, v in self._series.items())
+        for key, s in series:
+            cumulative = 0.0
+            for le, n in zip(self.buckets, s):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{_labels(self.labels + ('le',), key + (repr(le),))} {cumulative:g}")
+            lines.append(f"{self.name}_bucket{_labels(self.labels + ('le',), key + ('+Inf',))} {s[-1]:g}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {s[-2]}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {s[-1]:g}")
+        return lines
+
+STAGE_SECONDS = Histogram("rag_stage_duration_seconds", "Time spent per pipeline stage.", ("stage", "backend"))
+STAGE_ERRORS = Counter("rag_stage_errors_total", "Stages that raised.", ("stage", "backend"))
+HTTP_SECONDS = Histogram("http_request_duration_seconds", "HTTP request latency.", ("method", "route", "status"))
+METRICS = [STAGE_SECONDS, STAGE_ERRORS, HTTP_SECONDS]
+
+def render_metrics() -> str:
+    return "\n".join(line for m in METRICS for line in m.render()) + "\n"
+
+class _RequestStages(list):
+    # background tasks spawned during a request inherit its context; once the
+    # response is sent they must stop appending to it
+    closed = False
+
+_request_stages: ContextVar[_RequestStages | None] = ContextVar("request_stages", default=None)
+_NULL = nullcontext()
+
+def record(stage: str, backend: str, seconds: float) -> None:
+    STAGE_SECONDS.observe(seconds, stage, backend)
+    stages = _request_stages.get()
+    if stages is not None and not stages.closed:
+        stages.append((f"{stage}-{backend}" if backend else stage, seconds))
+
+class _Span:
+    # a plain class is cheaper to enter and exit than a @contextmanager generator
+    __slots__ = ("stage", "backend", "t0")
+
+    def __init__(self, stage: str, backend: str):
+        self.stage, self.backend = stage, backend
+
+    def __enter__(self) -> None:
+        self.t0 = time.perf_counter()
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        if exc_type is not None:
+            STAGE_ERRORS.inc(self.stage, self.backend)
+        record(self.stage, self.backend, time.perf_counter() - self.t0)
+
+def span(stage: str, backend: str = "") -> ContextManager[None]:
+    return _Span(stage, backend) if settings.TRACING_ENABLED else _NULL
+
+def traced(stage: str, backend: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    if not settings.TRACING_ENABLED:
+        return fn(*args, **kwargs)
+    try:
+        out, ms = timeit(fn, *args, **kwargs)
+    except BaseException:
+        STAGE_ERRORS.inc(stage, backend)
+        raise
+    record(stage, backend, ms / 1000)
+    return out
+
+def server_timing(stages: List[Tuple[str, float]], total: float) -> str:
+    # repeated stages (e.g. one upsert per batch) are summed
+    merged: Dict[str, float] = {}
+    for stage, seconds in stages:
+        merged[stage] = merged.get(stage, 0.0) + seconds
+    parts = [f"{stage};dur={1000 * s:.2f}" for stage, s in merged.items()]
+    parts.append(f"total;dur={1000 * total:.2f}")
+    return ", ".join(parts)
+
+class TimingMiddleware:
+    """Times every HTTP request and optionally reports its stages in a Server-Timing header."""
+
+    def __init__(self, app: Any, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        stages = _RequestStages()
+        token = _request_stages.set(stages)
+        t0 = time.perf_counter()
+        status = 500
+
+        async def _send(message: dict) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    header = server_timing(stages, time.perf_counter() - t0).encode()
+                    message = {**message, "headers": [*message.get("headers", []), (b"server-timing", header)]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            stages.closed = True
+            _request_stages.reset(token)
+            route = scope.get("route")
+            # the route template, never the raw path, keeps label cardinality bounded
+            HTTP_SECONDS.observe(time.perf_counter() - t0, scope["method"],
+                                 getattr(route, "path", "unmatched"), str(status))
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        body = render_metrics().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+def start_metrics_server(port: int) -> ThreadingHTTPServer:
+    """Serves /metrics from a daemon thread, for processes without the API (ingestion workers)."""
+    server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
@@ -1,15 +1,64 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Dict, Sequence
 from ..core.config import get_settings
-from motor.motor_asyncio import AsyncIOMotorClient
+
+if TYPE_CHECKING:
+    from motor.motor_asyncio import AsyncIOMotorClient
 
 settings = get_settings()
 _client: AsyncIOMotorClient | None = None
+_migrated = False
 
 def _mongo() -> AsyncIOMotorClient:
     global _client
     if _client is None:
+        from motor.motor_asyncio import AsyncIOMotorClient
         _client = AsyncIOMotorClient(settings.MONGODB_URI)
     return _client
 
-async def save_metadata(filename: str, strategy: str, backend: str) -> None:
+def close_client() -> None:
+    global _client, _migrated
+    if _client is not None:
+        _client.close()
+        _client = None
+    _migrated = False
+
+async def migrate() -> int:
+    # create_index is idempotent; run once per process instead of per write
+    global _migrated
+    if _migrated:
+        return 0
+    db = _mongo()[settings.MONGODB_DB]
+    await db.ingestions.create_index([("doc_id", 1), ("created_at", -1)], name="ix_ingestions_doc_id")
+    await db.documents.create_index([("tenant_id", 1), ("vector_backend", 1)], name="ix_documents_tenant")
+    _migrated = True
+    return 2
+
+async def insert_ingestions(rows: Sequence[Dict]) -> None:
+    await migrate()
+    db = _mongo()[settings.MONGODB_DB]
+    # copies: insert_many writes the generated _id into each document
+    await db.ingestions.insert_many([dict(r) for r in rows], ordered=False)
+
+async def load_manifest(doc_id: str, backend: str) -> Dict | None:
+    db = _mongo()[settings.MONGODB_DB]
+    doc = await db.documents.find_one({"_id": f"{backend}:{doc_id}"})
+    if doc is None:
+        return None
+    doc.pop("_id")
+    return doc
+
+async def save_manifest(manifest: Dict) -> None:
+    db = _mongo()[settings.MONGODB_DB]
+    await db.documents.replace_one({"_id": f"{manifest['vector_backend']}:{manifest['doc_id']}"}, manifest, upsert=True)
+
+async def delete_manifests(backend: str, tenant_id: str | None, doc_id: str | None = None) -> int:
     db = _mongo()[settings.MONGODB_DB]
-    await db.ingestions.insert_one({"filename": filename, "strategy": strategy, "vector_backend": backend})
+    if doc_id is not None:
+        res = await db.documents.delete_one({"_id": f"{backend}:{doc_id}"})
+    elif tenant_id is None:
+        raise ValueError("The default tenant cannot be dropped")
+    else:
+        await migrate()
+        res = await db.documents.delete_many({"tenant_id": tenant_id, "vector_backend": backend})
+    return res.deleted_count
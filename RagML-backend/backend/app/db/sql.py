@@ -1,21 +1,144 @@
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
+from __future__ import annotations
+from typing import TYPE_CHECKING, Dict, Sequence
+import asyncio
+import json
 from ..core.config import get_settings
 
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
 settings = get_settings()
-_engine = create_engine(settings.POSTGRES_DSN, future=True, pool_pre_ping=True)
-SessionLocal = sessionmaker(bind=_engine, autoflush=False, autocommit=False, future=True)
-
-def save_metadata(filename: str, strategy: str, backend: str) -> None:
-    with _engine.begin() as conn:
-        conn.execute(text("""
-            CREATE TABLE IF NOT EXISTS ingestions (
-                id SERIAL PRIMARY KEY,
-                filename TEXT,
-                strategy TEXT,
-                vector_backend TEXT,
-                created_at TIMESTAMP DEFAULT NOW()
-            );
-        """))
-        conn.execute(text("INSERT INTO ingestions(filename, strategy, vector_backend) VALUES (:f,:s,:b)"),
-                     {"f": filename, "s": strategy, "b": backend})
+_engine: AsyncEngine | None = None
+_migrated = False
+_migrate_lock: asyncio.Lock | None = None
+
+def _get_engine() -> AsyncEngine:
+    # created on first use: importing this module must not load a DB driver
+    global _engine
+    if _engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine
+        _engine = create_async_engine(settings.POSTGRES_DSN, pool_pre_ping=True)
+    return _engine
+
+async def dispose_engine() -> None:
+    global _engine, _migrated, _migrate_lock
+    if _engine is not None:
+        await _engine.dispose()
+        _engine = None
+    _migrated, _migrate_lock = False, None
+
+# Applied in order, once per database; the index of the last one applied is
+# kept in schema_version. Never edit an entry, append a new one.
+_MIGRATIONS = [
+    # 1: the table earlier releases created on every insert
+    """CREATE TABLE IF NOT EXISTS ingestions (
+        id {serial} PRIMARY KEY,
+        filename TEXT,
+        strategy TEXT,
+        vector_backend TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""",
+    "ALTER TABLE ingestions ADD COLUMN doc_id TEXT",
+    "ALTER TABLE ingestions ADD COLUMN pages INTEGER",
+    "ALTER TABLE ingestions ADD COLUMN chunks INTEGER",
+    "ALTER TABLE ingestions ADD COLUMN timings TEXT",
+    "CREATE INDEX IF NOT EXISTS ix_ingestions_doc_id ON ingestions (doc_id, created_at)",
+    """CREATE TABLE IF NOT EXISTS documents (
+        doc_id TEXT,
+        vector_backend TEXT,
+        strategy TEXT,
+        content_hash TEXT,
+        chunk_ids TEXT,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (doc_id, vector_backend)
+    )""",
+    # documents.doc_id holds the tenant-scoped key, see manifest.document_key
+    "ALTER TABLE ingestions ADD COLUMN tenant_id TEXT",
+    "ALTER TABLE documents ADD COLUMN tenant_id TEXT",
+    "CREATE INDEX IF NOT EXISTS ix_documents_tenant ON documents (tenant_id, vector_backend)",
+    "ALTER TABLE documents ADD COLUMN config TEXT",
+]
+
+async def _apply(conn: AsyncConnection) -> int:
+    from sqlalchemy import text
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        # API and worker processes may start together; DDL is transactional here
+        await conn.execute(text("SELECT pg_advisory_xact_lock(724301)"))
+    await conn.execute(text("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)"))
+    current = (await conn.execute(text("SELECT MAX(version) FROM schema_version"))).scalar() or 0
+    serial = "INTEGER" if dialect == "sqlite" else "SERIAL"  # sqlite: INTEGER PRIMARY KEY autoincrements
+    for stmt in _MIGRATIONS[current:]:
+        await conn.execute(text(stmt.format(serial=serial)))
+    if current < len(_MIGRATIONS):
+        await conn.execute(text("DELETE FROM schema_version"))
+        await conn.execute(text("INSERT INTO schema_version(version) VALUES (:v)"), {"v": len(_MIGRATIONS)})
+    return len(_MIGRATIONS) - current
+
+async def migrate() -> int:
+    """Brings the schema up to date once per process; returns how many migrations ran."""
+    global _migrated, _migrate_lock
+    if _migrated:
+        return 0
+    if _migrate_lock is None:
+        _migrate_lock = asyncio.Lock()
+    async with _migrate_lock:
+        if _migrated:
+            return 0
+        async with _get_engine().begin() as conn:
+            applied = await _apply(conn)
+        _migrated = True
+    return applied
+
+_INSERT_INGESTION = """
+    INSERT INTO ingestions(filename, doc_id, tenant_id, strategy, vector_backend, pages, chunks, timings, created_at)
+    VALUES (:filename, :doc_id, :tenant_id, :strategy, :vector_backend, :pages, :chunks, :timings, :created_at)
+"""
+
+async def insert_ingestions(rows: Sequence[Dict]) -> None:
+    # one transaction, one executemany for the whole batch
+    from sqlalchemy import text
+    await migrate()
+    params = [{**r, "timings": json.dumps(r.get("timings") or {})} for r in rows]
+    async with _get_engine().begin() as conn:
+        await conn.execute(text(_INSERT_INGESTION), params)
+
+async def load_manifest(doc_id: str, backend: str) -> Dict | None:
+    from sqlalchemy import text
+    await migrate()
+    async with _get_engine().connect() as conn:
+        row = (await conn.execute(text("SELECT strategy, content_hash, chunk_ids, tenant_id, config FROM documents WHERE doc_id = :d AND vector_backend = :b"),
+                                  {"d": doc_id, "b": backend})).first()
+    if row is None:
+        return None
+    return {"doc_id": doc_id, "vector_backend": backend, "strategy": row[0], "content_hash": row[1],
+            "chunk_ids": json.loads(row[2]), "tenant_id": row[3], "config": row[4] or ""}
+
+async def save_manifest(manifest: Dict) -> None:
+    from sqlalchemy import text
+    await migrate()
+    async with _get_engine().begin() as conn:
+        await conn.execute(text("""
+            INSERT INTO documents(doc_id, vector_backend, strategy, content_hash, chunk_ids, tenant_id, config)
+            VALUES (:d, :b, :s, :h, :c, :t, :g)
+            ON CONFLICT (doc_id, vector_backend) DO UPDATE SET
+                strategy = excluded.strategy, content_hash = excluded.content_hash,
+                chunk_ids = excluded.chunk_ids, config = excluded.config, updated_at = CURRENT_TIMESTAMP
+        """), {"d": manifest["doc_id"], "b": manifest["vector_backend"], "s": manifest["strategy"],
+               "h": manifest["content_hash"], "c": json.dumps(manifest["chunk_ids"]), "t": manifest.get("tenant_id"),
+               "g": manifest.get("config", "")})
+
+async def delete_manifests(backend: str, tenant_id: str | None, doc_id: str | None = None) -> int:
+    # one document by its scoped key, or every document of a tenant
+    from sqlalchemy import text
+    await migrate()
+    async with _get_engine().begin() as conn:
+        if doc_id is not None:
+            res = await conn.execute(text("DELETE FROM documents WHERE doc_id = :d AND vector_backend = :b"),
+                                     {"d": doc_id, "b": backend})
+        elif tenant_id is None:
+            raise ValueError("The default tenant cannot be dropped")
+        else:
+            res = await conn.execute(text("DELETE FROM documents WHERE tenant_id = :t AND vector_backend = :b"),
+                                     {"t": tenant_id, "b": backend})
+    return res.rowcount
@@ -1,8 +1,7 @@
 from dataclasses import dataclass
-from typing import List, Dict
+from typing import Dict, List, Sequence, Set
 import time
 import numpy as np
-from sklearn.metrics import precision_recall_fscore_support, accuracy_score
 
 @dataclass
 class EvalResult:
@@ -13,6 +12,7 @@ class EvalResult:
     latency_ms: Dict[str, float]
 
 def compute_classification_metrics(y_true: List[int], y_pred: List[int]) -> Dict[str, float]:
+    from sklearn.metrics import precision_recall_fscore_support, accuracy_score
     p, r, f1, _ = precision_recall_fscore_support(y_true, y_pred, average='binary')
     acc = accuracy_score(y_true, y_pred)
     return {"accuracy": acc, "precision": p, "recall": r, "f1": f1}
@@ -22,3 +22,34 @@ def timeit(fn, *args, **kwargs):
     out = fn(*args, **kwargs)
     dt = (time.perf_counter() - t0) * 1000
     return out, dt
+
+def recall_at_k(ranked: Sequence[str], relevant: Set[str], k: int) -> float:
+    if not relevant:
+        return 0.0
+    return len(set(ranked[:k]) & relevant) / len(relevant)
+
+def reciprocal_rank(ranked: Sequence[str], relevant: Set[str]) -> float:
+    for i, id_ in enumerate(ranked, 1):
+        if id_ in relevant:
+            return 1.0 / i
+    return 0.0
+
+def ndcg_at_k(ranked: Sequence[str], relevant: Set[str], k: int) -> float:
+    # binary gains
+    dcg = sum(1.0 / np.log2(i + 2) for i, id_ in enumerate(ranked[:k]) if id_ in relevant)
+    ideal = sum(1.0 / np.log2(i + 2) for i in range(min(len(relevant), k)))
+    return dcg / ideal if ideal else 0.0
+
+def compute_retrieval_metrics(rankings: List[Sequence[str]], relevant: List[Set[str]], k: int) -> Dict[str, float]:
+    return {
+        f"recall@{k}": float(np.mean([recall_at_k(r, g, k) for r, g in zip(rankings, relevant)])),
+        "mrr": float(np.mean([reciprocal_rank(r, g) for r, g in zip(rankings, relevant)])),
+        f"ndcg@{k}": float(np.mean([ndcg_at_k(r, g, k) for r, g in zip(rankings, relevant)])),
+    }
+
+def latency_summary(samples_ms: Sequence[float]) -> Dict[str, float]:
+    arr = np.asarray(samples_ms, dtype=np.float64)
+    if not len(arr):
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "mean_ms": 0.0}
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+    return {"p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99), "mean_ms": float(arr.mean())}
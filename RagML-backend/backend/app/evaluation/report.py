@@ -1,12 +1,17 @@
 from __future__ import annotations
 from .metrics import compute_classification_metrics
 from pathlib import Path
-import pandas as pd
+from typing import Dict, List
+import csv
+import json
+import time
+import uuid
 
 REPORTS_DIR = Path("reports")
-REPORTS_DIR.mkdir(exist_ok=True)
 
 def generate_report(metrics: dict, filename: str = "report") -> dict:
+    import pandas as pd
+    REPORTS_DIR.mkdir(exist_ok=True)
     md = f"# Evaluation Report\n\n" \
          f"- Accuracy: {metrics['accuracy']:.3f}\n" \
          f"- Precision: {metrics['precision']:.3f}\n" \
@@ -18,3 +23,24 @@ def generate_report(metrics: dict, filename: str = "report") -> dict:
     df = pd.DataFrame([metrics])
     df.to_csv(REPORTS_DIR / f"{filename}.csv", index=False)
     return {"markdown": str(mdfile), "html": str(mdfile.with_suffix('.html')), "csv": str(mdfile.with_suffix('.csv'))}
+
+def write_results(rows: List[Dict], name: str = "retrieval", config: Dict | None = None) -> dict:
+    """Appends one run to reports/<name>.csv (one table across runs) and writes reports/<name>-<run_id>.json."""
+    REPORTS_DIR.mkdir(exist_ok=True)
+    run_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    rows = [{"run_id": run_id, **r} for r in rows]
+    csv_path = REPORTS_DIR / f"{name}.csv"
+    old: List[Dict] = []
+    fields = list(dict.fromkeys(k for r in rows for k in r))
+    if csv_path.exists():
+        with open(csv_path, newline="") as f:
+            reader = csv.DictReader(f)
+            old = list(reader)
+            fields = list(dict.fromkeys([*(reader.fieldnames or []), *fields]))
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(old + rows)
+    json_path = REPORTS_DIR / f"{name}-{run_id}.json"
+    json_path.write_text(json.dumps({"run_id": run_id, "config": config or {}, "results": rows}, indent=2))
+    return {"run_id": run_id, "csv": str(csv_path), "json": str(json_path)}
@@ -0,0 +1,171 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Sequence, Set
+import tempfile
+import time
+import tracemalloc
+import zlib
+import numpy as np
+from ..services.chunking import stream_chunks
+from ..services.lexical import LexicalIndex, reciprocal_rank_fusion, tokenize
+from ..services.local_index import LocalIndex
+from .metrics import compute_retrieval_metrics, latency_summary
+
+# Offline retrieval benchmark. A synthetic corpus has facts ("The renewal date
+# of Varneklo Logistics is ren000017.") planted among filler and near-miss
+# sentences; every query paraphrases one fact, and the chunks that contain its
+# value are the relevant ones. Each chunking strategy is ingested into the
+# embedded vector index and the BM25 index, then queried in every retrieval mode.
+
+Encoder = Callable[[List[str]], np.ndarray]
+
+ATTRIBUTES = ["renewal date", "support email", "refund window", "account manager", "billing code",
+              "warehouse location", "contract owner", "shipping carrier", "discount tier", "tax region",
+              "escalation contact", "invoice prefix", "service level", "onboarding date", "api quota"]
+TEMPLATES = ["What is the {a} of {e}?", "Tell me the {a} for {e}.", "{e}: which {a} applies?",
+             "Do you know {e}'s {a}?", "Look up the {a} that {e} uses."]
+FILLER = ("team customer order policy update process request system report quarter review product "
+          "service plan note meeting budget hiring audit migration roadmap launch pricing partner "
+          "training security outage backlog forecast inventory vendor survey feedback release "
+          "compliance analytics dashboard staffing travel office marketing campaign renewal").split()
+STOPWORDS = "the a of to and in for is on with that this our".split()
+_SYLLABLES = ["var", "nek", "lo", "tri", "sam", "dor", "qui", "ben", "ta", "mor", "zel", "pa", "rin", "cos", "vel"]
+_KINDS = ["Logistics", "Systems", "Labs", "Holdings", "Foods", "Energy", "Health", "Media"]
+
+
+@dataclass
+class Corpus:
+    docs: List[List[str]]    # pages per document
+    queries: List[str]
+    answers: List[str]       # value token marking the chunks relevant to each query
+
+
+@dataclass
+class RunResult:
+    strategy: str
+    backend: str
+    mode: str
+    metrics: Dict[str, float] = field(default_factory=dict)
+
+    def as_row(self) -> Dict:
+        return {"strategy": self.strategy, "backend": self.backend, "mode": self.mode, **self.metrics}
+
+
+def synthetic_corpus(docs: int = 40, pages_per_doc: int = 4, sentences_per_page: int = 40,
+                     facts_per_doc: int = 8, queries: int = 200, seed: int = 0) -> Corpus:
+    rng = np.random.default_rng(seed)
+    entities: List[str] = []
+    while len(entities) < docs * 2:
+        name = "".join(rng.choice(_SYLLABLES, size=3)).capitalize() + " " + str(rng.choice(_KINDS))
+        if name not in entities:
+            entities.append(name)
+    facts = []
+    pages_out: List[List[str]] = []
+    for d in range(docs):
+        sentences = []
+        for _ in range(pages_per_doc):
+            # each page sticks to a few topic words, so semantic splitting has boundaries to find
+            topic = list(rng.choice(FILLER, size=4, replace=False)) + list(rng.choice(STOPWORDS, size=3, replace=False))
+            sentences += [" ".join(rng.choice(topic, size=int(rng.integers(10, 18)))).capitalize() + "."
+                          for _ in range(sentences_per_page)]
+        for _ in range(facts_per_doc):
+            # a document mostly talks about two entities, which makes near misses likely
+            e = entities[2 * d + int(rng.integers(0, 2))]
+            a = str(rng.choice(ATTRIBUTES))
+            value = f"{a.split()[0][:3]}{len(facts):06d}"  # fixed width: never a substring of another
+            sentences[int(rng.integers(0, len(sentences)))] = f"The {a} of {e} is {value}."
+            facts.append((e, a, value))
+        pages_out.append([" ".join(sentences[p * sentences_per_page:(p + 1) * sentences_per_page])
+                          for p in range(pages_per_doc)])
+    # facts overwritten by a later one at the same position have no chunk; drop them
+    text = " ".join(p for doc in pages_out for p in doc)
+    facts = [f for f in facts if f"The {f[1]} of {f[0]} is {f[2]}." in text]
+    picks = rng.choice(len(facts), size=min(queries, len(facts)), replace=False)
+    qs, ans = [], []
+    for i in picks:
+        e, a, value = facts[int(i)]
+        qs.append(str(rng.choice(TEMPLATES)).format(a=a, e=e))
+        ans.append(value)
+    return Corpus(pages_out, qs, ans)
+
+
+def hashing_encoder(dim: int = 384) -> Encoder:
+    """Bag-of-words hashing embedder: deterministic across processes and fully offline."""
+    def encode(texts: List[str]) -> np.ndarray:
+        out = np.zeros((len(texts), dim), dtype=np.float32)
+        for i, t in enumerate(texts):
+            for tok in tokenize(t):
+                h = zlib.crc32(tok.encode())
+                out[i, h % dim] += 1.0 if h & 1 << 31 else -1.0
+        return out / np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-9)
+    return encode
+
+
+def _ingest(corpus: Corpus, strategy: str, encode: Encoder, path: Path, batch: int) -> tuple[LocalIndex, LexicalIndex, Dict[str, str]]:
+    index = LocalIndex(path / "vectors")
+    lexical = LexicalIndex(path / "lexical")
+    texts: Dict[str, str] = {}
+    for d, pages in enumerate(corpus.docs):
+        chunks = list(stream_chunks(pages, strategy, encode))
+        for s in range(0, len(chunks), batch):
+            part = chunks[s:s + batch]
+            ids = [f"{d}/{c.id}" for c in part]
+            body = [c.text for c in part]
+            payloads = [{"text": t} for t in body]
+            index.upsert(ids, encode(body), payloads)
+            lexical.add(ids, body, payloads)
+            texts.update(zip(ids, body))
+    return index, lexical, texts
+
+
+def _peak_ingest_bytes(corpus: Corpus, strategy: str, encode: Encoder, batch: int) -> int:
+    # separate pass: tracemalloc slows allocation-heavy code enough to skew timings
+    with tempfile.TemporaryDirectory() as tmp:
+        tracemalloc.start()
+        try:
+            _, lexical, _ = _ingest(corpus, strategy, encode, Path(tmp), batch)
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+            lexical.close()
+
+
+def evaluate(corpus: Corpus, encode: Encoder, strategies: Sequence[str] = ("sliding_window", "semantic_split"),
+             modes: Sequence[str] = ("dense", "lexical", "hybrid"), k: int = 5, batch: int = 256,
+             rrf_k: int = 60, candidates: int = 20, memory: bool = True) -> List[RunResult]:
+    results: List[RunResult] = []
+    for strategy in strategies:
+        peak = _peak_ingest_bytes(corpus, strategy, encode, batch) if memory else 0
+        with tempfile.TemporaryDirectory() as tmp:
+            t0 = time.perf_counter()
+            index, lexical, texts = _ingest(corpus, strategy, encode, Path(tmp), batch)
+            ingest_s = time.perf_counter() - t0
+            relevant: List[Set[str]] = [{i for i, t in texts.items() if value in t} for value in corpus.answers]
+            ingest = {"chunks": len(texts), "ingest_s": ingest_s, "ingest_chunks_per_s": len(texts) / ingest_s,
+                      "peak_ingest_mb": peak / 2**20}
+            for mode in modes:
+                rankings, lat = [], []
+                t_all = time.perf_counter()
+                for q in corpus.queries:
+                    t0 = time.perf_counter()
+                    rankings.append([hit[0] for hit in _search(q, mode, encode, index, lexical, k, rrf_k, candidates)])
+                    lat.append((time.perf_counter() - t0) * 1000)
+                qps = len(corpus.queries) / (time.perf_counter() - t_all)
+                metrics = {**ingest, **compute_retrieval_metrics(rankings, relevant, k), **latency_summary(lat), "qps": qps}
+                results.append(RunResult(strategy, "local", mode, metrics))
+            lexical.close()
+    return results
+
+
+def _search(query: str, mode: str, encode: Encoder, index: LocalIndex, lexical: LexicalIndex,
+            k: int, rrf_k: int, candidates: int) -> Iterable:
+    if mode == "lexical":
+        return lexical.search(query, k)
+    qvec = encode([query])[0]
+    if mode == "dense":
+        return index.search(qvec, top_k=k)
+    if mode == "hybrid":
+        depth = max(candidates, k)
+        return reciprocal_rank_fusion(index.search(qvec, top_k=depth), lexical.search(query, depth), k=rrf_k, top_k=k)
+    raise ValueError(f"Unsupported retrieval mode: {mode}")
@@ -1,11 +1,47 @@
+from contextlib import asynccontextmanager
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from .api import ingestion, rag
 from .core.config import get_settings
+from .core.concurrency import shutdown_executors
+from .core.tracing import TimingMiddleware, render_metrics
+from .services.vector_store import init_stores, close_stores, stores_health
+from .services.memory import close_redis
+from .services.jobs import close_job_queue
+from .services.lexical import close_lexical_index
+from .services.answer_cache import answer_cache_stats
+from .services.outbox import outbox_health, start_senders, stop_senders
+from .services.metadata_writer import close_metadata_writers, metadata_writer_stats, migrate_metadata
+from .services.embedding import close_batcher, batcher_stats, cache_stats, warm_up
+from .db.sql import dispose_engine
+from .db.nosql import close_client
 
 settings = get_settings()
 
-app = FastAPI(title=settings.APP_NAME)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await init_stores([settings.VECTOR_BACKEND])
+    migrations = asyncio.create_task(migrate_metadata(filter(None, settings.METADATA_MIGRATE_ON_STARTUP.split(","))))
+    if settings.WARMUP_ON_STARTUP:
+        await warm_up()
+    if settings.EMAIL_OUTBOX_ENABLED:
+        start_senders(settings.EMAIL_SENDERS)
+    yield
+    await stop_senders()
+    await close_job_queue()
+    migrations.cancel()
+    await close_metadata_writers()
+    await close_stores()
+    close_lexical_index()
+    await close_batcher()
+    await close_redis()
+    await dispose_engine()
+    close_client()
+    shutdown_executors()
+
+app = FastAPI(title=settings.APP_NAME, lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -14,6 +50,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.TRACING_ENABLED:
+    app.add_middleware(TimingMiddleware, server_timing=settings.SERVER_TIMING_ENABLED)
+
 app.include_router(ingestion.router)
 app.include_router(rag.router)
 
@@ -22,6 +61,30 @@ def health():
     return {"status": "ok"} # this is a simple health check endpoint that should return a 200 OK response for the API to be consideread the healthy and operational 
 def read_root():
     return {"message": "Welcome to the RAG ML API. Use the /docs endpoint to explore the API."}
+
+@app.get("/health/vector-store")
+async def vector_store_health():
+    return await stores_health()
+
+@app.get("/health/embedding")
+def embedding_health():
+    return {"batcher": batcher_stats(), "cache": cache_stats()}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/health/metadata")
+def metadata_health():
+    return metadata_writer_stats()
+
+@app.get("/health/answer-cache")
+def answer_cache_health():
+    return answer_cache_stats()
+
+@app.get("/health/email")
+async def email_health():
+    return await outbox_health()
   # fast aip automatically gives your swagger docs at /docs
 @app.get("/docs", include_in_schema=False)
 def get_docs():
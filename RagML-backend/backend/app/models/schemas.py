@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field, EmailStr
 from enum import Enum
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 class ChunkStrategy(str, Enum):
     sliding_window = "sliding_window"
@@ -11,25 +11,71 @@ class VectorBackend(str, Enum):
     pinecone = "pinecone"
     weaviate = "weaviate"
     milvus = "milvus"
+    local = "local"
+
+class RetrievalMode(str, Enum):
+    dense = "dense"
+    lexical = "lexical"
+    hybrid = "hybrid"  # reciprocal rank fusion of dense + BM25
 
 class DBBackend(str, Enum):
     postgres = "postgres"
     mongodb = "mongodb"
 
-class IngestResponse(BaseModel):
-    status: str = "success"
-    chunks: int
+class JobState(str, Enum):
+    queued = "queued"
+    running = "running"
+    retrying = "retrying"
+    succeeded = "succeeded"
+    failed = "failed"
+
+class IngestJobResponse(BaseModel):
+    job_id: str
+    status: JobState
+
+class IngestJobStatus(BaseModel):
+    job_id: str
+    status: JobState
+    filename: str
+    doc_id: str
+    tenant_id: Optional[str] = None
+    strategy: ChunkStrategy
     vector_backend: VectorBackend
+    attempts: int
+    pages: int
+    chunks: int
+    skipped: int = 0  # unchanged chunks carried over from the previous ingest
+    deleted: int = 0  # chunks of the previous ingest no longer in the document
+    error: Optional[str] = None
+    timings: Dict[str, float] = {}
 
 class ChatQuery(BaseModel):
     session_id: str = Field(..., description="Chat session key")
     query: str
     top_k: int = 4
+    retrieval: RetrievalMode = RetrievalMode.dense
+    tenant_id: Optional[str] = Field(None, max_length=128, description="Search only this tenant's documents")
+    doc_ids: Optional[List[str]] = Field(None, description="Further restrict the search to these documents")
 
 class ChatResponse(BaseModel):
     response: str
     context: List[str]
 
+class DocumentDeleted(BaseModel):
+    doc_id: str
+    tenant_id: Optional[str] = None
+    chunks: int  # per the document's manifest
+
+class TenantDropped(BaseModel):
+    tenant_id: str
+    documents: int
+
+class ChatBatchRequest(BaseModel):
+    queries: List[ChatQuery]
+
+class ChatBatchResponse(BaseModel):
+    results: List[ChatResponse]
+
 class BookingDetails(BaseModel):
     name: str
     email: EmailStr
@@ -38,3 +84,13 @@ class BookingDetails(BaseModel):
 
 class BookingResponse(BaseModel):
     status: str
+    email_id: Optional[str] = None  # outbox message; poll /api/book/email/{email_id}
+
+class EmailStatus(BaseModel):
+    email_id: str
+    status: str
+    attempts: int
+    error: Optional[str] = None
+    created_at: float
+    sent_at: Optional[float] = None
+    senders: int = 0  # live outbox senders; 0 while queued/retrying means nothing will deliver it
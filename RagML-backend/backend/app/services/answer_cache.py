@@ -0,0 +1,173 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Dict, List
+import time
+import numpy as np
+from ..core.config import get_settings
+from .memory import get_redis
+
+# Semantic cache for /api/chat: paraphrases of a recent question land within
+# `threshold` cosine of its query vector and reuse its retrieval (and answer).
+# Entries live in one preallocated matrix so a lookup is a single mat-vec.
+# Ingestion bumps a corpus generation counter in Redis; every API process polls
+# it and drops its cache when it moves.
+
+settings = get_settings()
+
+GENERATION_KEY = "rag:corpus:generation"
+
+@dataclass
+class CachedAnswer:
+    query: str
+    context: List[str]
+    answer: str | None = None  # only cached for history-free turns
+
+@dataclass
+class AnswerCacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+    lookup_s: float = 0.0
+    hit_s: float = 0.0
+    miss_s: float = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def observe(self, hit: bool, seconds: float) -> None:
+        if hit:
+            self.hit_s += seconds
+        else:
+            self.miss_s += seconds
+
+    def as_dict(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hit_rate,
+            "avg_lookup_ms": 1000 * self.lookup_s / total if total else 0.0,
+            "avg_hit_ms": 1000 * self.hit_s / self.hits if self.hits else 0.0,
+            "avg_miss_ms": 1000 * self.miss_s / self.misses if self.misses else 0.0,
+        }
+
+class SemanticCache:
+    def __init__(self, max_items: int = 2048, ttl_s: float = 600.0, threshold: float = 0.92, sync_s: float = 1.0):
+        self.max_items = max_items
+        self.ttl_s = ttl_s
+        self.threshold = threshold
+        self.sync_s = sync_s
+        self.generation = 0
+        self.stats = AnswerCacheStats()
+        self._vecs: np.ndarray | None = None
+        self._scope = np.full(max_items, -1, dtype=np.int32)  # -1 = free slot
+        self._expires = np.zeros(max_items)
+        self._used = np.zeros(max_items)
+        self._values: List[CachedAnswer | None] = [None] * max_items
+        self._scopes: Dict[str, int] = {}
+        self._synced = 0.0
+
+    def __len__(self) -> int:
+        return int((self._scope >= 0).sum())
+
+    def _best(self, code: int, q: np.ndarray, now: float) -> tuple[int, float]:
+        live = (self._scope == code) & (self._expires > now)
+        if self._vecs is None or not live.any():
+            return -1, -1.0
+        scores = self._vecs @ q
+        scores[~live] = -np.inf
+        i = int(np.argmax(scores))
+        return i, float(scores[i])
+
+    @staticmethod
+    def _unit(vec: np.ndarray) -> np.ndarray:
+        q = np.asarray(vec, dtype=np.float32).reshape(-1)
+        n = np.linalg.norm(q)
+        return q / n if n else q
+
+    def _code(self, scope: str) -> int:
+        code = self._scopes.get(scope)
+        if code is None:
+            if len(self._scopes) >= self.max_items:
+                # forget scopes with no live entry, so distinct tenant/doc filters cannot grow this forever
+                live = set(np.unique(self._scope[(self._scope >= 0) & (self._expires > time.time())]).tolist())
+                self._scopes = {s: c for s, c in self._scopes.items() if c in live}
+            used = set(self._scopes.values())
+            code = self._scopes[scope] = next(c for c in range(len(used) + 1) if c not in used)
+        return code
+
+    def lookup(self, scope: str, vec: np.ndarray) -> CachedAnswer | None:
+        t0 = time.perf_counter()
+        now = time.time()
+        code = self._scopes.get(scope)
+        slot, score = (-1, -1.0) if code is None else self._best(code, self._unit(vec), now)
+        hit = slot >= 0 and score >= self.threshold
+        if hit:
+            self._used[slot] = now
+            self.stats.hits += 1
+        else:
+            self.stats.misses += 1
+        self.stats.lookup_s += time.perf_counter() - t0
+        return self._values[slot] if hit else None
+
+    def store(self, scope: str, vec: np.ndarray, entry: CachedAnswer) -> None:
+        q = self._unit(vec)
+        now = time.time()
+        if self._vecs is None:
+            self._vecs = np.zeros((self.max_items, len(q)), dtype=np.float32)
+        code = self._code(scope)
+        slot, score = self._best(code, q, now)
+        if slot < 0 or score < self.threshold:
+            free = np.flatnonzero((self._scope < 0) | (self._expires <= now))
+            if len(free):
+                slot = int(free[0])
+            else:
+                slot = int(np.argmin(self._used))  # least recently used
+                self.stats.evictions += 1
+        self._vecs[slot] = q
+        self._scope[slot] = code
+        self._expires[slot] = now + self.ttl_s
+        self._used[slot] = now
+        self._values[slot] = entry
+
+    def invalidate(self, generation: int | None = None) -> None:
+        self._scope[:] = -1
+        self._values = [None] * self.max_items
+        self._scopes.clear()
+        self.generation = self.generation + 1 if generation is None else generation
+        self.stats.invalidations += 1
+
+    async def sync(self) -> None:
+        """Drops the cache if another process ingested documents; reads Redis at most every `sync_s`."""
+        now = time.monotonic()
+        if now - self._synced < self.sync_s:
+            return
+        self._synced = now
+        generation = int(await get_redis().get(GENERATION_KEY) or 0)
+        if generation != self.generation:
+            self.invalidate(generation)
+
+_cache: SemanticCache | None = None
+
+def get_answer_cache() -> SemanticCache:
+    global _cache
+    if _cache is None:
+        _cache = SemanticCache(settings.ANSWER_CACHE_SIZE, settings.ANSWER_CACHE_TTL_S,
+                               settings.ANSWER_CACHE_THRESHOLD, settings.ANSWER_CACHE_SYNC_S)
+    return _cache
+
+async def invalidate_answer_cache() -> None:
+    generation = await get_redis().incr(GENERATION_KEY)
+    if _cache is not None:
+        _cache.invalidate(generation)
+
+def answer_cache_stats() -> dict:
+    if _cache is None:
+        return {"enabled": settings.ANSWER_CACHE_ENABLED}
+    return {"enabled": settings.ANSWER_CACHE_ENABLED, "entries": len(_cache),
+            "generation": _cache.generation, **_cache.stats.as_dict()}
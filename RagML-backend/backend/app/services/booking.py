@@ -1,11 +1,16 @@
 from .memory import append_message
+from .outbox import OutboxMessage, enqueue
+from ..core.config import get_settings
 from ..core.email import send_email
+from ..core.concurrency import run_io
 from ..models.schemas import BookingDetails
 
-def save_booking(details: BookingDetails) -> None:
-    append_message(details.email, "system", f"BOOKED {details.datetime_iso} : {details.notes or ''}")
+settings = get_settings()
 
-def send_confirmation(details: BookingDetails) -> None:
+async def save_booking(details: BookingDetails) -> None:
+    await append_message(details.email, "system", f"BOOKED {details.datetime_iso} : {details.notes or ''}")
+
+async def send_confirmation(details: BookingDetails) -> OutboxMessage | None:
     subject = "Interview Booking Confirmed"
     html = f"""
     <h3>Hi {details.name},</h3>
@@ -13,4 +18,7 @@ def send_confirmation(details: BookingDetails) -> None:
     <p>Notes: {details.notes or '-' }.</p>
     <p>— RAG Bot</p>
     """
-    send_email([details.email], subject, html)
+    if settings.EMAIL_OUTBOX_ENABLED:
+        return await enqueue([details.email], subject, html)
+    await run_io(send_email, [details.email], subject, html)
+    return None
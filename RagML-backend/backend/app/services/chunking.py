@@ -1,7 +1,9 @@
 from __future__ import annotations
-from typing import List
+from typing import Callable, Iterable, Iterator, List
 from pydantic import BaseModel
+import numpy as np
 from ..core.config import get_settings
+from .embedding import get_local_model  # share the embedder's loaded model
 
 settings = get_settings()
 
@@ -24,36 +26,119 @@ def sliding_window(text: str, max_tokens: int, overlap: int) -> List[Chunk]:
         i += step
     return chunks
 
-from sentence_transformers import SentenceTransformer, util
-_model: SentenceTransformer | None = None
+def adjacent_similarities(embeds: np.ndarray, window: int = 1) -> np.ndarray:
+    """Cosine similarity across every sentence boundary, in one pass.
 
-def _get_model() -> SentenceTransformer:
-    global _model
-    if _model is None:
-        _model = SentenceTransformer(settings.ST_MODEL_NAME)
-    return _model
+    With window > 1 each side of boundary i is the sum of up to `window`
+    sentences (i-window+1..i vs i+1..i+window), which smooths out short or
+    noisy sentences.
+    """
+    e = np.asarray(embeds, dtype=np.float32)
+    if len(e) < 2:
+        return np.zeros(0, dtype=np.float32)
+    n = len(e) - 1
+    if window <= 1:
+        left, right = e[:-1], e[1:]
+    else:
+        # window sums as a few shifted contiguous adds (cumsum over axis 0 is far slower)
+        left, right = e[:-1].copy(), e[1:].copy()
+        for k in range(1, min(window, n)):  # wider windows only add past the ends
+            left[k:] += e[:n - k]
+            right[:n - k] += e[1 + k:]
+    num = np.einsum("ij,ij->i", left, right)
+    den = np.sqrt(np.einsum("ij,ij->i", left, left) * np.einsum("ij,ij->i", right, right))
+    return num / np.maximum(den, 1e-12)
 
-def semantic_split(text: str, target_tokens: int) -> List[Chunk]:
+def group_sentences(sentences: List[str], embeds: np.ndarray, target_tokens: int,
+                    threshold: float = 0.55, percentile: float | None = None,
+                    window: int = 1) -> List[List[str]]:
+    sims = adjacent_similarities(embeds, window)
+    if percentile is not None and len(sims):
+        # break at the largest (100 - percentile)% of semantic distances; comparing
+        # distances keeps the one at the cutoff itself from flipping on rounding
+        dist = 1.0 - sims
+        breaks = dist > np.percentile(dist, percentile)
+    else:
+        breaks = sims < threshold
+    lengths = [len(s.split()) for s in sentences]
+    groups: List[List[str]] = []
+    start, tokens = 0, lengths[0]
+    for i in range(1, len(sentences)):
+        if breaks[i - 1] or tokens >= target_tokens:
+            groups.append(sentences[start:i])
+            start, tokens = i, 0
+        tokens += lengths[i]
+    groups.append(sentences[start:])
+    return groups
+
+Encoder = Callable[[List[str]], np.ndarray]
+
+def semantic_split(text: str, target_tokens: int, encode: Encoder | None = None) -> List[Chunk]:
     sentences = re.split(r"(?<=[.!?])\s+", text)
     sentences = [s.strip() for s in sentences if s.strip()]
     if not sentences:
         return []
-    model = _get_model()
-    embeds = model.encode(sentences, convert_to_tensor=True, show_progress_bar=False)
-    groups: List[List[str]] = []
-    current = [sentences[0]]
-    for i in range(1, len(sentences)):
-        sim = util.cos_sim(embeds[i-1], embeds[i]).item()
-        if sim >= 0.55 and sum(len(w.split()) for w in current) < target_tokens:
-            current.append(sentences[i])
-        else:
-            groups.append(current)
-            current = [sentences[i]]
-    groups.append(current)
-    chunks = [Chunk(id=f"s{i}", text=" ".join(g)) for i, g in enumerate(groups)]
-    return chunks
+    if encode is not None:
+        embeds = encode(sentences)
+    else:
+        embeds = get_local_model().encode(sentences, normalize_embeddings=True, show_progress_bar=False)
+    groups = group_sentences(
+        sentences, embeds, target_tokens,
+        threshold=settings.SEMANTIC_THRESHOLD,
+        percentile=settings.SEMANTIC_BREAKPOINT_PERCENTILE,
+        window=settings.SEMANTIC_WINDOW,
+    )
+    return [Chunk(id=f"s{i}", text=" ".join(g)) for i, g in enumerate(groups)]
 
 def chunk_text(text: str, strategy: str) -> List[Chunk]:
     if strategy == "semantic_split":
         return semantic_split(text, settings.MAX_CHUNK_TOKENS)
     return sliding_window(text, settings.MAX_CHUNK_TOKENS, settings.SLIDING_OVERLAP)
+
+def _stream_sliding_window(pages: Iterable[str], max_tokens: int, overlap: int) -> Iterator[str]:
+    # same windows as sliding_window(), holding at most one window of words
+    step = max(max_tokens - overlap, 1)
+    buf: List[str] = []
+    for page in pages:
+        buf.extend(page.split())
+        while len(buf) >= max_tokens:
+            yield " ".join(buf[:max_tokens])
+            del buf[:step]
+    while buf:
+        yield " ".join(buf[:max_tokens])
+        del buf[:step]
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+def _stream_semantic_split(pages: Iterable[str], target_tokens: int, window_sentences: int,
+                           encode: Encoder | None = None) -> Iterator[str]:
+    # split fixed-size runs of sentences; the last (still open) group of every
+    # run is carried into the next one so groups can span page boundaries
+    carry = ""
+    buf: List[str] = []
+    pending = 0
+    for page in pages:
+        buf.append(page)
+        pending += len(_SENTENCE_END.findall(page)) + 1
+        if pending < window_sentences:
+            continue
+        groups = semantic_split(carry + " " + " ".join(buf), target_tokens, encode)
+        for g in groups[:-1]:
+            yield g.text
+        carry = groups[-1].text if groups else ""
+        buf, pending = [], 0
+    tail = (carry + " " + " ".join(buf)).strip()
+    if tail:
+        for g in semantic_split(tail, target_tokens, encode):
+            yield g.text
+
+def stream_chunks(pages: Iterable[str], strategy: str, encode: Encoder | None = None) -> Iterator[Chunk]:
+    # `encode` overrides the configured model for semantic splitting (evaluation, benchmarks)
+    if strategy == "semantic_split":
+        texts = _stream_semantic_split(pages, settings.MAX_CHUNK_TOKENS, settings.SEMANTIC_STREAM_SENTENCES, encode)
+        prefix = "s"
+    else:
+        texts = _stream_sliding_window(pages, settings.MAX_CHUNK_TOKENS, settings.SLIDING_OVERLAP)
+        prefix = "c"
+    for i, t in enumerate(texts):
+        yield Chunk(id=f"{prefix}{i}", text=t)
@@ -1,31 +1,253 @@
 from __future__ import annotations
-from typing import List
+from dataclasses import dataclass, asdict
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, List, Tuple
+import asyncio
 import numpy as np
 from ..core.config import get_settings
+from ..core.concurrency import run_cpu, run_io
+from ..core.lazy import optional_import
+from ..core.tracing import span
+from .embedding_cache import EmbeddingCache, CacheStats, cache_key
+from .onnx_embedder import OnnxEmbedder, load_onnx_embedder
 
-try:
-    from openai import OpenAI
-except Exception:
-    OpenAI = None
-
-from sentence_transformers import SentenceTransformer
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
 
 settings = get_settings()
 
 _st_model: SentenceTransformer | None = None
+_onnx_model: OnnxEmbedder | None = None
 
 def _st() -> SentenceTransformer:
     global _st_model
     if _st_model is None:
+        # torch is only imported when the PyTorch runtime is actually used
+        from sentence_transformers import SentenceTransformer
         _st_model = SentenceTransformer(settings.ST_MODEL_NAME)
     return _st_model
 
-def encode_texts(texts: List[str]) -> np.ndarray:
+def _onnx() -> OnnxEmbedder:
+    global _onnx_model
+    if _onnx_model is None:
+        _onnx_model = load_onnx_embedder(
+            settings.ST_MODEL_NAME,
+            settings.ONNX_CACHE_DIR,
+            quantize=settings.ONNX_QUANTIZE,
+            threads=settings.ONNX_THREADS,
+            batch_size=settings.ONNX_BATCH_SIZE,
+            min_cosine=settings.ONNX_MIN_COSINE,
+        )
+    return _onnx_model
+
+def get_local_model() -> SentenceTransformer | OnnxEmbedder:
+    """The configured local embedder (ONNX or sentence-transformers), loaded once per process."""
+    return _onnx() if settings.EMBEDDING_PROVIDER == "onnx" else _st()
+
+async def warm_up() -> None:
+    """Loads the configured local model and runs one forward pass before traffic arrives."""
+    if settings.EMBEDDING_PROVIDER == "openai":
+        return
+    await run_cpu(get_local_model().encode, ["warm-up"], normalize_embeddings=True)
+
+OPENAI_EMBED_MODEL = "text-embedding-3-small"
+OPENAI_EMBED_DIM = 1536
+
+def embedding_dim() -> int:
+    """Width of the vectors this process stores and queries with, after truncation."""
+    if settings.EMBEDDING_PROVIDER == "openai":
+        native = OPENAI_EMBED_DIM
+    else:
+        model = get_local_model()
+        native = model.dim if isinstance(model, OnnxEmbedder) else model.get_sentence_embedding_dimension()
+    return min(native, settings.EMBEDDING_DIM) if settings.EMBEDDING_DIM > 0 else native
+
+def _truncate(vecs: np.ndarray) -> np.ndarray:
+    # Matryoshka-trained models (text-embedding-3, nomic, mxbai, ...) front-load
+    # information, so a renormalized prefix is a smaller embedding of the same text.
+    # The cache keeps full vectors; EMBEDDING_DIM can change without invalidating it.
+    dim = settings.EMBEDDING_DIM
+    if dim <= 0 or vecs.shape[-1] <= dim:
+        return vecs
+    out = np.ascontiguousarray(vecs[..., :dim], dtype=np.float32)
+    out /= np.maximum(np.linalg.norm(out, axis=-1, keepdims=True), 1e-12)
+    return out
+
+def model_id() -> Tuple[str, str]:
+    if settings.EMBEDDING_PROVIDER == "openai":
+        return "openai", OPENAI_EMBED_MODEL
+    if settings.EMBEDDING_PROVIDER == "onnx":
+        # int8 vectors differ slightly from fp32 ones, so they get their own cache keys
+        return ("onnx-int8" if settings.ONNX_QUANTIZE else "onnx"), settings.ST_MODEL_NAME
+    return "sentence_transformers", settings.ST_MODEL_NAME
+
+def _encode_uncached(texts: List[str]) -> np.ndarray:
     if settings.EMBEDDING_PROVIDER == "openai":
-        if OpenAI is None or not settings.OPENAI_API_KEY:
+        openai = optional_import("openai")
+        if openai is None or not settings.OPENAI_API_KEY:
             raise RuntimeError("OpenAI embeddings requested but OPENAI_API_KEY not set")
-        client = OpenAI(api_key=settings.OPENAI_API_KEY)
-        resp = client.embeddings.create(model="text-embedding-3-small", input=texts)
+        client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
+        resp = client.embeddings.create(model=OPENAI_EMBED_MODEL, input=texts)
         return np.array([d.embedding for d in resp.data], dtype=np.float32)
-    vecs = _st().encode(texts, normalize_embeddings=True)
+    vecs = get_local_model().encode(texts, normalize_embeddings=True)
     return np.array(vecs, dtype=np.float32)
+
+_cache: EmbeddingCache | None = None
+
+def _get_cache() -> EmbeddingCache | None:
+    global _cache
+    if _cache is None and settings.EMBED_CACHE_ENABLED:
+        _cache = EmbeddingCache(max_items=settings.EMBED_CACHE_SIZE, path=settings.EMBED_CACHE_PATH)
+    return _cache
+
+def cache_stats() -> dict:
+    return _cache.stats.as_dict() if _cache is not None else CacheStats().as_dict()
+
+def encode_texts(texts: List[str]) -> np.ndarray:
+    cache = _get_cache()
+    if cache is None or not texts:
+        return _truncate(_encode_uncached(texts))
+    provider, model = model_id()
+    keys = [cache_key(provider, model, t) for t in texts]
+    found = cache.get_many(keys)
+    missing: Dict[str, str] = {}
+    for k, t, v in zip(keys, texts, found):
+        if v is None:
+            missing.setdefault(k, t)
+    if missing:
+        fresh = _encode_uncached(list(missing.values()))
+        cache.put_many(list(missing), fresh)
+        computed = dict(zip(missing, fresh))
+        found = [v if v is not None else computed[k] for k, v in zip(keys, found)]
+    return _truncate(np.stack(found).astype(np.float32, copy=False))
+
+async def _encode_offloaded(texts: List[str]) -> np.ndarray:
+    if settings.EMBEDDING_PROVIDER == "openai":
+        return await run_io(encode_texts, texts)
+    return await run_cpu(encode_texts, texts)
+
+@dataclass
+class BatcherStats:
+    requests: int = 0
+    items: int = 0
+    batches: int = 0
+    full_batches: int = 0
+    max_batch: int = 0
+
+    @property
+    def mean_batch(self) -> float:
+        return self.items / self.batches if self.batches else 0.0
+
+    @property
+    def fill_ratio(self) -> float:
+        return self.mean_batch / self.max_batch if self.max_batch else 0.0
+
+    def as_dict(self) -> dict:
+        return {**asdict(self), "mean_batch": self.mean_batch, "fill_ratio": self.fill_ratio}
+
+class EmbeddingBatcher:
+    """Coalesces concurrent small encode calls into one forward pass.
+
+    Each caller's texts are queued with a future; a collector task drains the
+    queue until `max_batch` texts or `max_wait_ms` have accumulated, encodes
+    them together and hands every caller back its own rows. A lone request
+    hitting an idle encoder is dispatched straight away.
+    """
+
+    def __init__(self, encode: Callable[[List[str]], Awaitable[np.ndarray]],
+                 max_batch: int = 64, max_wait_ms: float = 5.0, concurrency: int = 1):
+        self._encode = encode
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._slots = asyncio.Semaphore(concurrency)
+        self._queue: asyncio.Queue[Tuple[List[str], asyncio.Future]] = asyncio.Queue()
+        self._worker: asyncio.Task | None = None
+        self._inflight: set[asyncio.Task] = set()
+        self.stats = BatcherStats(max_batch=max_batch)
+
+    async def encode(self, texts: List[str]) -> np.ndarray:
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._collect())
+        fut = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((texts, fut))
+        self.stats.requests += 1
+        return await fut
+
+    async def _collect(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self._queue.get()]
+            size = len(pending[0][0])
+            deadline = loop.time() + self.max_wait
+            # an idle encoder with nothing else queued gains nothing from waiting
+            idle = not self._inflight and self._queue.empty()
+            while size < self.max_batch and not idle:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                pending.append(item)
+                size += len(item[0])
+            await self._slots.acquire()
+            task = asyncio.create_task(self._run(pending))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _run(self, pending: List[Tuple[List[str], asyncio.Future]]) -> None:
+        try:
+            batch = [t for texts, _ in pending for t in texts]
+            self.stats.batches += 1
+            self.stats.items += len(batch)
+            self.stats.full_batches += len(batch) >= self.max_batch
+            try:
+                vecs = await self._encode(batch)
+            except Exception as e:
+                for _, fut in pending:
+                    if not fut.done():
+                        fut.set_exception(e)
+                return
+            offset = 0
+            for texts, fut in pending:
+                if not fut.done():
+                    fut.set_result(vecs[offset:offset + len(texts)])
+                offset += len(texts)
+        finally:
+            self._slots.release()
+
+    async def close(self) -> None:
+        tasks = [t for t in (self._worker, *self._inflight) if t is not None]
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._worker = None
+
+_batcher: EmbeddingBatcher | None = None
+
+def _get_batcher() -> EmbeddingBatcher:
+    global _batcher
+    if _batcher is None:
+        _batcher = EmbeddingBatcher(
+            _encode_offloaded,
+            max_batch=settings.EMBED_BATCH_MAX_SIZE,
+            max_wait_ms=settings.EMBED_BATCH_MAX_WAIT_MS,
+            concurrency=settings.EMBED_BATCH_CONCURRENCY,
+        )
+    return _batcher
+
+async def close_batcher() -> None:
+    global _batcher
+    if _batcher is not None:
+        await _batcher.close()
+        _batcher = None
+
+def batcher_stats() -> dict:
+    return _batcher.stats.as_dict() if _batcher is not None else BatcherStats().as_dict()
+
+async def aencode_texts(texts: List[str]) -> np.ndarray:
+    # bulk calls (ingestion) are already batched; only small ones get coalesced
+    with span("embed", settings.EMBEDDING_PROVIDER):
+        if not settings.EMBED_BATCH_ENABLED or len(texts) >= settings.EMBED_BATCH_MAX_SIZE:
+            return await _encode_offloaded(texts)
+        return await _get_batcher().encode(texts)
@@ -0,0 +1,111 @@
+from __future__ import annotations
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, List, Sequence
+import hashlib
+import sqlite3
+import threading
+import numpy as np
+
+# Content-addressed cache for embeddings. Keys hash (provider, model, text) so a
+# model or provider switch never serves stale vectors; the persistent tier is a
+# single SQLite table of raw float32 blobs shared across restarts and workers.
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.split())
+
+def cache_key(provider: str, model: str, text: str) -> str:
+    h = hashlib.sha256()
+    h.update(f"{provider}\0{model}\0".encode())
+    h.update(normalize_text(text).encode("utf-8"))
+    return h.hexdigest()
+
+@dataclass
+class CacheStats:
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / total if total else 0.0
+
+    def as_dict(self) -> dict:
+        return {**asdict(self), "hit_rate": self.hit_rate}
+
+class EmbeddingCache:
+    def __init__(self, max_items: int = 20000, path: str | None = None):
+        self.max_items = max_items
+        self._lru: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        self.stats = CacheStats()
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vec BLOB NOT NULL)")
+            self._db.commit()
+
+    def _remember(self, key: str, vec: np.ndarray) -> None:
+        self._lru[key] = vec
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_items:
+            self._lru.popitem(last=False)
+
+    def get_many(self, keys: Sequence[str]) -> List[np.ndarray | None]:
+        out: List[np.ndarray | None] = [None] * len(keys)
+        cold: Dict[str, List[int]] = {}
+        with self._lock:
+            for i, k in enumerate(keys):
+                v = self._lru.get(k)
+                if v is not None:
+                    self._lru.move_to_end(k)
+                    out[i] = v
+                    self.stats.memory_hits += 1
+                else:
+                    cold.setdefault(k, []).append(i)
+            if cold and self._db is not None:
+                found = {}
+                ks = list(cold)
+                for s in range(0, len(ks), 500):
+                    part = ks[s:s + 500]
+                    rows = self._db.execute(
+                        f"SELECT key, vec FROM embeddings WHERE key IN ({','.join('?' * len(part))})", part
+                    ).fetchall()
+                    found.update((k, np.frombuffer(b, dtype=np.float32)) for k, b in rows)
+                for k, v in found.items():
+                    self._remember(k, v)
+                    for i in cold.pop(k):
+                        out[i] = v
+                        self.stats.disk_hits += 1
+            self.stats.misses += sum(len(ix) for ix in cold.values())
+        return out
+
+    def put_many(self, keys: Sequence[str], vecs: np.ndarray) -> None:
+        vecs = np.asarray(vecs, dtype=np.float32)
+        with self._lock:
+            for k, v in zip(keys, vecs):
+                self._remember(k, v.copy())
+            if self._db is not None:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings(key, vec) VALUES (?, ?)",
+                    [(k, v.tobytes()) for k, v in zip(keys, vecs)],
+                )
+                self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._lru.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM embeddings")
+                self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,205 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import AbstractSet, Awaitable, BinaryIO, Callable, Dict, Iterable, Iterator, List, Tuple
+import asyncio
+import codecs
+import inspect
+import itertools
+import os
+import time
+import uuid
+from ..core.config import get_settings
+from ..core.concurrency import process_pool, run_cpu
+from ..core.tracing import record, span
+from .chunking import Chunk, stream_chunks
+from .embedding import aencode_texts
+from .lexical import get_lexical_index
+from .manifest import chunk_id, document_key, embedder_config
+from .pdf_extract import extract_pages
+from .vector_store import VectorBatch, upsert_vectors
+
+# page stream -> incremental chunker -> embedding batches -> upsert batches.
+# Stages are connected by bounded queues, so a slow vector store stalls the
+# embedder, which stalls the parser: memory stays at ~INGEST_QUEUE_DEPTH
+# batches no matter how large the document is.
+
+settings = get_settings()
+
+_TEXT_BLOCK = 1 << 20
+
+def iter_pages(filename: str, fp: BinaryIO) -> Iterator[str]:
+    name = filename.lower()
+    if name.endswith(".txt"):
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        tail = ""
+        while True:
+            block = fp.read(_TEXT_BLOCK)
+            text = tail + decoder.decode(block, final=not block)
+            if not block:
+                if text:
+                    yield text
+                return
+            # never cut a word in half between blocks
+            cut = max(text.rfind(" "), text.rfind("\n"))
+            if cut < 0:
+                tail = text
+                continue
+            tail = text[cut + 1:]
+            yield text[:cut]
+    if name.endswith(".pdf"):
+        # pool processes reopen the file by path; in-memory uploads are extracted here
+        path = getattr(fp, "name", None)
+        path = path if isinstance(path, str) and os.path.isfile(path) else None
+        yield from extract_pages(fp, path, process_pool(), settings.PDF_PAGES_PER_TASK,
+                                 settings.PDF_PARALLEL_MIN_PAGES, settings.PROCESS_EXECUTOR_WORKERS)
+        return
+    raise ValueError("Only .pdf and .txt supported")
+
+@dataclass
+class IngestProgress:
+    pages: int = 0
+    chunks: int = 0
+    embedded: int = 0
+    upserted: int = 0
+    skipped: int = 0  # already stored by an earlier ingest of the same document
+    seconds: float = 0.0
+    chunk_ids: List[str] = field(default_factory=list, repr=False)
+
+    def as_dict(self) -> dict:
+        return {"pages": self.pages, "chunks": self.chunks, "embedded": self.embedded, "upserted": self.upserted,
+                "skipped": self.skipped, "seconds": self.seconds}
+
+ProgressCallback = Callable[[IngestProgress], Awaitable[None] | None]
+
+class _Counted:
+    def __init__(self, pages: Iterable[str], progress: IngestProgress):
+        self._pages = iter(pages)
+        self._progress = progress
+        self.extract_s = 0.0  # time spent inside the page parser
+
+    def __iter__(self) -> Iterator[str]:
+        while True:
+            t0 = time.perf_counter()
+            page = next(self._pages, None)
+            self.extract_s += time.perf_counter() - t0
+            if page is None:
+                return
+            self._progress.pages += 1
+            yield page
+
+def _take(it: Iterator[Chunk], n: int) -> Tuple[List[Chunk], float]:
+    t0 = time.perf_counter()
+    return list(itertools.islice(it, n)), time.perf_counter() - t0
+
+_DONE = object()
+
+async def run_ingest(
+    pages: Iterable[str],
+    strategy: str,
+    backend: str,
+    metadata: Dict[str, str] | None = None,
+    on_progress: ProgressCallback | None = None,
+    doc_id: str | None = None,
+    known_ids: AbstractSet[str] = frozenset(),
+    tenant_id: str | None = None,
+) -> IngestProgress:
+    # with a doc_id, chunk ids hash the embedder and chunk text: a retried or
+    # re-uploaded document maps unchanged chunks to the same ids, and those in
+    # `known_ids` (or repeated within the document) are neither embedded nor
+    # upserted again; everything lands in the tenant's partition
+    key = document_key(tenant_id, doc_id) if doc_id else None
+    embedder = embedder_config()
+    def make_id(c: Chunk) -> str:
+        return chunk_id(key, c.text, embedder) if key else str(uuid.uuid4())
+    seen: set[str] = set()
+
+    progress = IngestProgress()
+    t0 = time.perf_counter()
+    counted = _Counted(pages, progress)
+    chunks = stream_chunks(counted, strategy)
+    to_embed: asyncio.Queue = asyncio.Queue(maxsize=settings.INGEST_QUEUE_DEPTH)
+    to_upsert: asyncio.Queue = asyncio.Queue(maxsize=settings.INGEST_QUEUE_DEPTH)
+
+    async def report() -> None:
+        progress.seconds = time.perf_counter() - t0
+        if on_progress is not None:
+            res = on_progress(progress)
+            if inspect.isawaitable(res):
+                await res
+
+    async def produce() -> None:
+        try:
+            while True:
+                # parsing + chunking is CPU work: pull one batch at a time off-loop
+                extracted = counted.extract_s
+                batch, seconds = await run_cpu(_take, chunks, settings.INGEST_EMBED_BATCH)
+                if settings.TRACING_ENABLED:
+                    # the parser runs lazily inside the chunker; split the time between them
+                    record("extract", "", counted.extract_s - extracted)
+                    record("chunk", strategy, seconds - (counted.extract_s - extracted))
+                if not batch:
+                    break
+                progress.chunks += len(batch)
+                fresh: List[Tuple[str, Chunk]] = []
+                for c in batch:
+                    cid = make_id(c)
+                    if cid in seen:
+                        continue
+                    seen.add(cid)
+                    progress.chunk_ids.append(cid)
+                    if cid in known_ids:
+                        progress.skipped += 1
+                    else:
+                        fresh.append((cid, c))
+                if fresh:
+                    await to_embed.put(fresh)
+        finally:
+            await to_embed.put(_DONE)
+
+    async def embed() -> None:
+        try:
+            while (batch := await to_embed.get()) is not _DONE:
+                texts = [c.text for _, c in batch]
+                vecs = await aencode_texts(texts)
+                # metadata dict is shared by every row, not copied per chunk
+                vb = VectorBatch([cid for cid, _ in batch], vecs, texts, [metadata] * len(batch))
+                progress.embedded += len(vb)
+                await to_upsert.put(vb)
+        finally:
+            await to_upsert.put(_DONE)
+
+    async def upsert() -> None:
+        size = settings.INGEST_UPSERT_BATCH
+        pending: List[VectorBatch] = []
+        buffered = 0
+        while True:
+            vb = await to_upsert.get()
+            if vb is not _DONE:
+                pending.append(vb)
+                buffered += len(vb)
+            if buffered and (buffered >= size or vb is _DONE):
+                merged = VectorBatch.concat(pending)
+                cut = len(merged) if vb is _DONE else len(merged) - len(merged) % size
+                for s in range(0, cut, size):
+                    part = merged[s:min(s + size, cut)]
+                    await upsert_vectors(part, backend=backend, tenant_id=tenant_id)
+                    if settings.LEXICAL_ENABLED:
+                        with span("upsert", "lexical"):
+                            await run_cpu(get_lexical_index(tenant_id).add, part.ids, part.texts, part.payloads())
+                    progress.upserted += len(part)
+                    await report()
+                pending = [merged[cut:]] if cut < len(merged) else []
+                buffered = len(merged) - cut
+            if vb is _DONE:
+                return
+
+    tasks = [asyncio.create_task(f()) for f in (produce, embed, upsert)]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    await report()
+    return progress
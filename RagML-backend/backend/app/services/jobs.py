@@ -0,0 +1,342 @@
+from __future__ import annotations
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Protocol
+import asyncio
+import json
+import logging
+import shutil
+import time
+import uuid
+from redis import asyncio as aioredis
+from redis import exceptions as redis_exc
+from ..core.config import get_settings
+from ..core.concurrency import run_cpu, run_io
+from ..core.tracing import span
+from .ingest_pipeline import IngestProgress, iter_pages, run_ingest
+from .answer_cache import invalidate_answer_cache
+from .lexical import get_lexical_index
+from .manifest import DocumentManifest, document_key, file_sha256, ingest_config, load_manifest, save_manifest
+from .memory import get_redis
+from .metadata_writer import IngestRecord, get_metadata_writer
+from .vector_store import delete_vectors
+
+try:
+    import httpx
+    _HTTPX_ERRORS: tuple = (httpx.TransportError,)
+except Exception:
+    _HTTPX_ERRORS = ()
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# errors worth retrying: the backend was unreachable, not the document broken
+TRANSIENT_ERRORS = (ConnectionError, TimeoutError, asyncio.TimeoutError,
+                    redis_exc.ConnectionError, redis_exc.TimeoutError, *_HTTPX_ERRORS)
+
+@dataclass
+class IngestJob:
+    id: str
+    filename: str
+    path: str
+    strategy: str
+    vector_backend: str
+    db_backend: str
+    doc_id: str | None = None  # re-uploads with the same id are diffed; omitted = a new document (the job id)
+    tenant_id: str | None = None  # partition the document is stored and searched in
+    status: str = "queued"
+    attempts: int = 0
+    pages: int = 0
+    chunks: int = 0
+    skipped: int = 0
+    deleted: int = 0
+    error: str | None = None
+    submitted_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def from_json(cls, raw: str | bytes) -> "IngestJob":
+        return cls(**json.loads(raw))
+
+
+class JobQueue(Protocol):
+    async def submit(self, job: IngestJob) -> None: ...
+    async def get(self, job_id: str) -> IngestJob | None: ...
+    async def save(self, job: IngestJob) -> None: ...
+
+
+class RedisJobQueue:
+    """Jobs live in Redis; any number of `python -m app.worker` processes drain them.
+
+    Workers move ids from the pending list onto a processing list atomically and
+    hold a lease on each (a score in LEASES) that they renew while the job runs.
+    A worker that dies mid-job leaves the id behind; `recover()` requeues it once
+    the lease has run out, so it is safe to call while other workers are busy.
+    """
+
+    QUEUE = "ingest:queue"
+    PROCESSING = "ingest:processing"
+    LEASES = "ingest:leases"
+
+    def __init__(self, url: str):
+        self._r = aioredis.from_url(url)
+
+    def _key(self, job_id: str) -> str:
+        return f"ingest:job:{job_id}"
+
+    async def submit(self, job: IngestJob) -> None:
+        async with self._r.pipeline(transaction=True) as pipe:
+            pipe.set(self._key(job.id), job.to_json(), ex=settings.INGEST_JOB_TTL_S)
+            pipe.lpush(self.QUEUE, job.id)
+            await pipe.execute()
+
+    async def get(self, job_id: str) -> IngestJob | None:
+        raw = await self._r.get(self._key(job_id))
+        return IngestJob.from_json(raw) if raw else None
+
+    async def save(self, job: IngestJob) -> None:
+        await self._r.set(self._key(job.id), job.to_json(), ex=settings.INGEST_JOB_TTL_S)
+
+    async def next(self, timeout: float = 5.0) -> str | None:
+        job_id = await self._r.blmove(self.QUEUE, self.PROCESSING, timeout, "RIGHT", "LEFT")
+        if not job_id:
+            return None
+        await self._r.zadd(self.LEASES, {job_id: time.time() + settings.INGEST_LEASE_S})
+        return job_id.decode()
+
+    async def hold(self, job_id: str) -> None:
+        """Renews the lease on `job_id` until cancelled."""
+        while True:
+            await asyncio.sleep(settings.INGEST_LEASE_S / 3)
+            try:
+                # xx: a lease recover() already took back is not revived
+                await self._r.zadd(self.LEASES, {job_id: time.time() + settings.INGEST_LEASE_S}, xx=True)
+            except Exception:
+                logger.warning("Could not renew lease on ingest job %s", job_id, exc_info=True)
+
+    async def ack(self, job_id: str) -> None:
+        async with self._r.pipeline(transaction=True) as pipe:
+            pipe.lrem(self.PROCESSING, 1, job_id)
+            pipe.zrem(self.LEASES, job_id)
+            await pipe.execute()
+
+    async def requeue(self, job_id: str) -> None:
+        async with self._r.pipeline(transaction=True) as pipe:
+            pipe.lrem(self.PROCESSING, 1, job_id)
+            pipe.zrem(self.LEASES, job_id)
+            pipe.lpush(self.QUEUE, job_id)
+            await pipe.execute()
+
+    async def recover(self) -> int:
+        """Requeues in-flight jobs whose lease has expired; returns how many."""
+        now = time.time()
+        # an id with no lease (its worker died between next() and the zadd) gets one now and expires with it
+        held = await self._r.lrange(self.PROCESSING, 0, -1)
+        if held:
+            await self._r.zadd(self.LEASES, {job_id: now + settings.INGEST_LEASE_S for job_id in held}, nx=True)
+        moved = 0
+        for job_id in await self._r.zrangebyscore(self.LEASES, "-inf", now):
+            async with self._r.pipeline(transaction=True) as pipe:
+                # ack/requeue/renewal all touch LEASES, so a live worker racing us aborts the move
+                await pipe.watch(self.LEASES)
+                score = await pipe.zscore(self.LEASES, job_id)
+                if score is None or score > now:
+                    continue
+                in_flight = await pipe.lpos(self.PROCESSING, job_id) is not None
+                pipe.multi()
+                pipe.zrem(self.LEASES, job_id)
+                if in_flight:
+                    pipe.lrem(self.PROCESSING, 1, job_id)
+                    pipe.lpush(self.QUEUE, job_id)
+                try:
+                    await pipe.execute()
+                except redis_exc.WatchError:
+                    continue
+                moved += in_flight
+        return moved
+
+    async def close(self) -> None:
+        await self._r.aclose()
+
+
+class LocalJobQueue:
+    """In-process fallback: jobs run on asyncio tasks inside the API process."""
+
+    def __init__(self, workers: int):
+        self._jobs: Dict[str, IngestJob] = {}
+        self._queue: asyncio.Queue[str] = asyncio.Queue()
+        self._workers = workers
+        self._tasks: List[asyncio.Task] = []
+
+    async def submit(self, job: IngestJob) -> None:
+        self._jobs[job.id] = job
+        self._start()
+        await self._queue.put(job.id)
+
+    async def get(self, job_id: str) -> IngestJob | None:
+        return self._jobs.get(job_id)
+
+    async def save(self, job: IngestJob) -> None:
+        self._jobs[job.id] = job
+
+    def _start(self) -> None:
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._work()) for _ in range(self._workers)]
+
+    async def _work(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            job = self._jobs[job_id]
+            if not await process_job(self, job):
+                await self._queue.put(job_id)
+
+    async def close(self) -> None:
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+async def process_job(queue: JobQueue, job: IngestJob) -> bool:
+    """Runs one attempt. Returns False when the job should be retried."""
+    job.status = "running"
+    job.attempts += 1
+    job.started_at = job.started_at or time.time()
+    job.timings.setdefault("queued_s", job.started_at - job.submitted_at)
+    await queue.save(job)
+
+    async def on_progress(p: IngestProgress) -> None:
+        job.pages, job.chunks = p.pages, p.chunks
+        await queue.save(job)
+
+    doc_id = job.doc_id or job.id
+    key = document_key(job.tenant_id, doc_id)
+    t0 = time.perf_counter()
+    try:
+        # a second upload of the same document waits here, so the manifest it loads is never stale
+        async with _document_lock(f"{job.vector_backend}:{key}"):
+            content_hash = await run_io(file_sha256, job.path)
+            config = ingest_config(job.strategy)
+            with span("manifest", job.db_backend):
+                old = await load_manifest(job.db_backend, key, job.vector_backend)
+            if old is not None and old.content_hash == content_hash and old.config == config:
+                job.chunks = job.skipped = len(old.chunk_ids)
+                job.timings.update(ingest_s=time.perf_counter() - t0)
+                await _record(job, doc_id)
+                return await _finish(queue, job, "succeeded", None)
+            known = set(old.chunk_ids) if old is not None else set()
+            metadata = {"filename": job.filename, "doc_id": doc_id}
+            if job.tenant_id:
+                metadata["tenant_id"] = job.tenant_id
+            with open(job.path, "rb") as fp:
+                progress = await run_ingest(
+                    iter_pages(job.filename, fp),
+                    job.strategy,
+                    job.vector_backend,
+                    metadata=metadata,
+                    on_progress=on_progress,
+                    doc_id=doc_id,
+                    known_ids=known,
+                    tenant_id=job.tenant_id,
+                )
+            removed = list(known.difference(progress.chunk_ids))
+            await delete_vectors(removed, backend=job.vector_backend, tenant_id=job.tenant_id)
+            if removed and settings.LEXICAL_ENABLED:
+                with span("delete", "lexical"):
+                    await run_cpu(get_lexical_index(job.tenant_id).delete, removed)
+            with span("manifest", job.db_backend):
+                await save_manifest(job.db_backend, DocumentManifest(key, job.vector_backend, job.strategy, content_hash,
+                                                                     progress.chunk_ids, job.tenant_id, config))
+        t1 = time.perf_counter()
+    except TRANSIENT_ERRORS as e:
+        if job.attempts < settings.INGEST_MAX_ATTEMPTS:
+            job.status = "retrying"
+            job.error = f"{type(e).__name__}: {e}"
+            await queue.save(job)
+            delay = settings.INGEST_RETRY_BACKOFF_S * 2 ** (job.attempts - 1)
+            logger.warning("Ingest job %s failed transiently, retrying in %.1fs", job.id, delay, exc_info=True)
+            await asyncio.sleep(delay)
+            return False
+        return await _finish(queue, job, "failed", f"{type(e).__name__}: {e}")
+    except Exception as e:
+        logger.exception("Ingest job %s failed", job.id)
+        return await _finish(queue, job, "failed", f"{type(e).__name__}: {e}")
+    job.pages, job.chunks, job.skipped, job.deleted = progress.pages, progress.chunks, progress.skipped, len(removed)
+    try:
+        await invalidate_answer_cache()
+    except Exception:
+        # stale answers expire with ANSWER_CACHE_TTL_S; not worth failing the job over
+        logger.warning("Could not invalidate answer cache after job %s", job.id, exc_info=True)
+    job.timings.update(ingest_s=t1 - t0)
+    await _record(job, doc_id)
+    return await _finish(queue, job, "succeeded", None)
+
+@asynccontextmanager
+async def _document_lock(key: str) -> AsyncIterator[None]:
+    # held for the whole job and renewed like a job lease; a dead holder's lock
+    # runs out after INGEST_LEASE_S
+    lock = get_redis().lock(f"ingest:lock:{key}", timeout=settings.INGEST_LEASE_S, sleep=0.2)
+    await lock.acquire()
+    renew = asyncio.create_task(_renew_lock(lock))
+    try:
+        yield
+    finally:
+        renew.cancel()
+        try:
+            await lock.release()
+        except redis_exc.LockError:
+            logger.warning("Document lock %s expired before its ingest job finished", key)
+
+async def _renew_lock(lock) -> None:
+    while True:
+        await asyncio.sleep(settings.INGEST_LEASE_S / 3)
+        try:
+            await lock.reacquire()
+        except Exception:
+            logger.warning("Could not renew document lock %s", lock.name, exc_info=True)
+
+async def _record(job: IngestJob, doc_id: str) -> None:
+    # buffered: written in bulk with other jobs' records, never fails the job
+    await get_metadata_writer(job.db_backend).add(IngestRecord(
+        job.filename, doc_id, job.strategy, job.vector_backend, job.pages, job.chunks, dict(job.timings),
+        tenant_id=job.tenant_id))
+
+async def _finish(queue: JobQueue, job: IngestJob, status: str, error: str | None) -> bool:
+    job.status, job.error = status, error
+    job.finished_at = time.time()
+    job.timings["total_s"] = job.finished_at - job.submitted_at
+    await queue.save(job)
+    shutil.rmtree(Path(job.path).parent, ignore_errors=True)
+    return True
+
+
+def spool_path(job_id: str, filename: str) -> Path:
+    d = Path(settings.INGEST_SPOOL_DIR) / job_id
+    d.mkdir(parents=True, exist_ok=True)
+    return d / Path(filename).name
+
+def new_job_id() -> str:
+    return uuid.uuid4().hex
+
+_queue: RedisJobQueue | LocalJobQueue | None = None
+
+def get_job_queue() -> RedisJobQueue | LocalJobQueue:
+    global _queue
+    if _queue is None:
+        if settings.INGEST_QUEUE_BACKEND == "redis":
+            _queue = RedisJobQueue(settings.REDIS_URL)
+        else:
+            _queue = LocalJobQueue(settings.INGEST_WORKERS)
+    return _queue
+
+async def close_job_queue() -> None:
+    global _queue
+    if _queue is not None:
+        await _queue.close()
+        _queue = None
@@ -0,0 +1,375 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from functools import cached_property
+from pathlib import Path
+from typing import Collection, Dict, List, Sequence, Tuple
+import fcntl
+import json
+import math
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+import numpy as np
+from ..core.config import get_settings
+from .manifest import partition_name
+
+settings = get_settings()
+
+# In-process BM25 index, log-structured so that API and worker processes can
+# share one directory:
+#
+#   segments/*.npz  immutable postings segments, one per upsert batch; small
+#                   segments are merged in tiers so a query touches few files
+#   docs.sqlite     id -> payload (text + metadata); deleting a row hides the
+#                   chunk immediately, merges then drop its postings. A re-added
+#                   id is scored from its newest segment only
+#
+# A segment stores a sorted UTF-8 vocabulary and CSR postings (uint32 row,
+# uint16 term frequency), so lookups are a searchsorted plus a slice.
+#
+# Each tenant has its own index under tenants/, next to the default one, so
+# BM25 statistics and candidates never mix tenants.
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+_MAX_TOKEN = 32
+
+def tokenize(text: str) -> List[str]:
+    return [t[:_MAX_TOKEN] for t in _TOKEN.findall(text.lower())]
+
+
+@dataclass
+class Segment:
+    name: str
+    vocab: np.ndarray    # (V,) bytes, sorted
+    offsets: np.ndarray  # (V+1,) int64
+    rows: np.ndarray     # (P,) uint32
+    tfs: np.ndarray      # (P,) uint16
+    doc_len: np.ndarray  # (D,) uint32
+    ids: np.ndarray      # (D,) bytes
+
+    @property
+    def docs(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.vocab, self.offsets, self.rows, self.tfs, self.doc_len, self.ids))
+
+    @cached_property
+    def _sorted_ids(self) -> np.ndarray:
+        return np.sort(self.ids)
+
+    def contains(self, ids: np.ndarray) -> np.ndarray:
+        """Mask of `ids` that have a row in this segment."""
+        s = self._sorted_ids
+        if not len(s):
+            return np.zeros(len(ids), dtype=bool)
+        i = np.minimum(np.searchsorted(s, ids), len(s) - 1)
+        return s[i] == ids
+
+    def postings(self, term: bytes) -> Tuple[np.ndarray, np.ndarray]:
+        i = int(np.searchsorted(self.vocab, term))
+        if i == len(self.vocab) or self.vocab[i] != term:
+            return self.rows[:0], self.tfs[:0]
+        lo, hi = self.offsets[i], self.offsets[i + 1]
+        return self.rows[lo:hi], self.tfs[lo:hi]
+
+    def save(self, path: Path) -> None:
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, vocab=self.vocab, offsets=self.offsets, rows=self.rows, tfs=self.tfs,
+                     doc_len=self.doc_len, ids=self.ids)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "Segment":
+        with np.load(path, allow_pickle=False) as z:
+            return cls(path.stem, z["vocab"], z["offsets"], z["rows"], z["tfs"], z["doc_len"], z["ids"])
+
+
+def _build(name: str, ids: np.ndarray, term_ids: np.ndarray, doc_rows: np.ndarray,
+           vocab: np.ndarray, doc_len: np.ndarray, counts: np.ndarray | None = None) -> Segment:
+    # (term, doc) pairs -> per-term postings sorted by row; without `counts`
+    # every pair is one occurrence and frequencies come from collapsing repeats
+    key = term_ids.astype(np.int64) * max(len(ids), 1) + doc_rows
+    if counts is None:
+        key, counts = np.unique(key, return_counts=True)
+    else:
+        order = np.argsort(key, kind="stable")
+        key, counts = key[order], counts[order]
+    t, rows = np.divmod(key, max(len(ids), 1))
+    offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(t, minlength=len(vocab)), out=offsets[1:])
+    return Segment(name, vocab, offsets, rows.astype(np.uint32),
+                   np.minimum(counts, np.iinfo(np.uint16).max).astype(np.uint16),
+                   doc_len.astype(np.uint32), ids)
+
+def build_segment(name: str, ids: Sequence[str], texts: Sequence[str]) -> Segment:
+    toks = [tokenize(t) for t in texts]
+    doc_len = np.array([len(t) for t in toks], dtype=np.uint32)
+    flat = np.array([w.encode() for t in toks for w in t], dtype="S")
+    if len(flat):
+        vocab, term_ids = np.unique(flat, return_inverse=True)
+    else:
+        vocab, term_ids = np.array([], dtype="S1"), np.array([], dtype=np.int64)
+    doc_rows = np.repeat(np.arange(len(toks), dtype=np.int64), doc_len)
+    return _build(name, np.array([i.encode() for i in ids], dtype="S"), term_ids, doc_rows, vocab, doc_len)
+
+def merge_segments(name: str, segments: Sequence[Segment], keep: set[bytes] | None = None) -> Segment:
+    """Merges segments given oldest-first. A re-added id keeps only its newest
+    version; ids outside `keep` (deleted) are dropped."""
+    vocab = np.unique(np.concatenate([s.vocab for s in segments]))
+    ids: List[bytes] = []
+    doc_len: List[int] = []
+    term_ids, doc_rows, counts = [], [], []
+    taken: set[bytes] = set()
+    for s in reversed(segments):
+        remap = np.full(s.docs, -1, dtype=np.int64)
+        for i, id_ in enumerate(s.ids):
+            if id_ in taken or (keep is not None and id_ not in keep):
+                continue
+            taken.add(id_)
+            remap[i] = len(ids)
+            ids.append(id_)
+            doc_len.append(int(s.doc_len[i]))
+        local_terms = np.repeat(np.arange(len(s.vocab)), np.diff(s.offsets))
+        rows = remap[s.rows]
+        live = rows >= 0
+        term_ids.append(np.searchsorted(vocab, s.vocab)[local_terms[live]])
+        doc_rows.append(rows[live])
+        counts.append(s.tfs[live])
+    return _build(name, np.array(ids, dtype="S"), np.concatenate(term_ids), np.concatenate(doc_rows),
+                  vocab, np.array(doc_len, dtype=np.uint32), np.concatenate(counts))
+
+
+class LexicalIndex:
+    def __init__(self, path: str | Path, k1: float = 1.2, b: float = 0.75,
+                 merge_factor: int = 8, refresh_s: float = 1.0):
+        self.path = Path(path)
+        self.seg_dir = self.path / "segments"
+        self.seg_dir.mkdir(parents=True, exist_ok=True)
+        self.k1, self.b = k1, b
+        self.merge_factor = merge_factor
+        self.refresh_s = refresh_s
+        self._segments: Dict[str, Segment] = {}
+        self._refreshed = 0.0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path / "docs.sqlite", check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS docs (id TEXT PRIMARY KEY, payload TEXT NOT NULL)")
+        self._db.commit()
+        self.refresh(force=True)
+
+    # -- segments ----------------------------------------------------------
+
+    def refresh(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._refreshed < self.refresh_s:
+            return
+        with self._lock:
+            names = {p.stem for p in self.seg_dir.glob("*.npz")}
+            for name in list(self._segments):
+                if name not in names:
+                    del self._segments[name]
+            for name in sorted(names - self._segments.keys()):
+                try:
+                    self._segments[name] = Segment.load(self.seg_dir / f"{name}.npz")
+                except FileNotFoundError:  # merged away since the listing
+                    pass
+            self._refreshed = now
+
+    def _ordered(self) -> List[Segment]:
+        return [self._segments[n] for n in sorted(self._segments)]
+
+    @staticmethod
+    def _new_name() -> str:
+        # sortable by creation time across processes
+        return f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}"
+
+    def add(self, ids: Sequence[str], texts: Sequence[str], payloads: Sequence[Dict]) -> None:
+        if not ids:
+            return
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO docs(id, payload) VALUES (?, ?)",
+                                 [(i, json.dumps(p)) for i, p in zip(ids, payloads)])
+            self._db.commit()
+        seg = build_segment(self._new_name(), ids, texts)
+        seg.save(self.seg_dir / f"{seg.name}.npz")
+        with self._lock:
+            self._segments[seg.name] = seg
+        self.maybe_merge()
+
+    def delete(self, ids: Sequence[str]) -> None:
+        with self._lock:
+            self._db.executemany("DELETE FROM docs WHERE id = ?", [(i,) for i in ids])
+            self._db.commit()
+
+    def delete_documents(self, doc_ids: Sequence[str]) -> int:
+        with self._lock:
+            cur = self._db.executemany("DELETE FROM docs WHERE json_extract(payload, '$.doc_id') = ?", [(d,) for d in doc_ids])
+            self._db.commit()
+        return cur.rowcount
+
+    def _live_ids(self, ids: np.ndarray) -> set[bytes]:
+        live: set[bytes] = set()
+        keys = [i.decode() for i in ids]
+        with self._lock:
+            for s in range(0, len(keys), 900):
+                part = keys[s:s + 900]
+                rows = self._db.execute(f"SELECT id FROM docs WHERE id IN ({','.join('?' * len(part))})", part)
+                live.update(r[0].encode() for r in rows)
+        return live
+
+    def maybe_merge(self) -> bool:
+        """Tiered merge: once `merge_factor` segments share a size tier, fold them into one."""
+        with open(self.path / "merge.lock", "w") as lockf:
+            try:
+                fcntl.flock(lockf, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False  # another process is merging
+            self.refresh(force=True)
+            tiers: Dict[int, List[Segment]] = {}
+            for s in self._ordered():
+                tiers.setdefault(int(math.log(max(s.docs, 1), self.merge_factor)), []).append(s)
+            group = next((g for _, g in sorted(tiers.items()) if len(g) >= self.merge_factor), None)
+            if group is None:
+                return False
+            keep = self._live_ids(np.concatenate([s.ids for s in group]))
+            # the merged segment takes the newest input's timestamp slot so ordering still holds
+            merged = merge_segments(f"{group[-1].name}m", group, keep)
+            merged.save(self.seg_dir / f"{merged.name}.npz")
+            for s in group:
+                (self.seg_dir / f"{s.name}.npz").unlink(missing_ok=True)
+            self.refresh(force=True)
+            return True
+
+    # -- query -------------------------------------------------------------
+
+    def size_bytes(self) -> int:
+        return sum(s.nbytes for s in self._segments.values())
+
+    def search(self, query: str, top_k: int = 4, doc_ids: Collection[str] | None = None) -> List[Tuple[str, float, Dict]]:
+        self.refresh()
+        terms = sorted({t.encode() for t in tokenize(query)})
+        segments = self._ordered()
+        if not terms or not segments or top_k <= 0:
+            return []
+        n_docs = sum(s.docs for s in segments)
+        avgdl = sum(float(s.doc_len.sum()) for s in segments) / max(n_docs, 1)
+        hits = [[s.postings(t) for t in terms] for s in segments]
+        df = [sum(len(h[j][0]) for h in hits) for j in range(len(terms))]
+        idf = [math.log(1 + (n_docs - d + 0.5) / (d + 0.5)) for d in df]
+        scored: List[Tuple[int, np.ndarray, np.ndarray]] = []
+        for i, (s, seg_hits) in enumerate(zip(segments, hits)):
+            rows = np.concatenate([r for r, _ in seg_hits])
+            if not len(rows):
+                continue
+            tf = np.concatenate([t for _, t in seg_hits]).astype(np.float32)
+            w = np.concatenate([np.full(len(r), idf[j], dtype=np.float32) for j, (r, _) in enumerate(seg_hits)])
+            norm = self.k1 * (1 - self.b + self.b * s.doc_len[rows] / avgdl)
+            uniq, inv = np.unique(rows, return_inverse=True)
+            scored.append((i, np.bincount(inv, weights=w * tf * (self.k1 + 1) / (tf + norm)), s.ids[uniq]))
+        # take each segment's best k, drop rows a newer segment re-added, deleted
+        # chunks and other documents, and fetch deeper until the top_k survivors
+        # outscore everything not fetched yet
+        payloads: Dict[bytes, Dict | None] = {}
+        k = 2 * top_k
+        while True:
+            cands: List[Tuple[float, bytes]] = []
+            unseen: float | None = None
+            for i, scores, ids in scored:
+                if len(scores) > k:
+                    part = np.argpartition(-scores, k)
+                    top = part[:k]
+                    unseen = max(unseen or 0.0, float(scores[part[k]]))
+                else:
+                    top = np.arange(len(scores))
+                top_ids = ids[top]
+                current = np.ones(len(top), dtype=bool)
+                for newer in segments[i + 1:]:
+                    current &= ~newer.contains(top_ids)
+                cands.extend(zip(scores[top][current].tolist(), top_ids[current]))
+            cands.sort(key=lambda c: -c[0])
+            out: List[Tuple[str, float, Dict]] = []
+            for n, (score, id_) in enumerate(cands):
+                if id_ not in payloads:
+                    # read ahead only as far as the hits still missing
+                    ahead = [c for _, c in cands[n:n + 2 * (top_k - len(out))] if c not in payloads]
+                    self._load_payloads(ahead, payloads)
+                payload = payloads[id_]
+                if payload is None or (doc_ids is not None and payload.get("doc_id") not in doc_ids):
+                    continue
+                out.append((id_.decode(), score, payload))
+                if len(out) == top_k:
+                    break
+            if unseen is None or (len(out) == top_k and out[-1][1] >= unseen):
+                return out
+            k *= 4
+
+    def _load_payloads(self, ids: List[bytes], into: Dict[bytes, Dict | None]) -> None:
+        # None marks a deleted chunk
+        into.update(dict.fromkeys(ids))
+        keys = [i.decode() for i in ids]
+        with self._lock:
+            for s in range(0, len(keys), 900):
+                part = keys[s:s + 900]
+                rows = self._db.execute(f"SELECT id, payload FROM docs WHERE id IN ({','.join('?' * len(part))})", part)
+                into.update((i.encode(), json.loads(p)) for i, p in rows)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def reciprocal_rank_fusion(*rankings: List[Tuple[str, float, Dict]], k: int = 60,
+                           top_k: int = 4) -> List[Tuple[str, float, Dict]]:
+    scores: Dict[str, float] = {}
+    payloads: Dict[str, Dict] = {}
+    for ranking in rankings:
+        for rank, (id_, _, payload) in enumerate(ranking):
+            scores[id_] = scores.get(id_, 0.0) + 1.0 / (k + rank + 1)
+            payloads.setdefault(id_, payload)
+    best = sorted(scores.items(), key=lambda kv: -kv[1])[:top_k]
+    return [(id_, s, payloads[id_]) for id_, s in best]
+
+
+_indexes: Dict[str | None, LexicalIndex] = {}
+_index_lock = threading.Lock()
+
+def _tenant_path(tenant_id: str) -> Path:
+    return Path(settings.LEXICAL_INDEX_PATH) / "tenants" / partition_name(tenant_id)
+
+def get_lexical_index(tenant_id: str | None = None, create: bool = True) -> LexicalIndex | None:
+    # None only with create=False, for a tenant that has never been indexed
+    index = _indexes.get(tenant_id)
+    if index is None:
+        with _index_lock:
+            index = _indexes.get(tenant_id)
+            if index is None:
+                path = Path(settings.LEXICAL_INDEX_PATH) if not tenant_id else _tenant_path(tenant_id)
+                if not create and tenant_id and not (path / "docs.sqlite").exists():
+                    return None
+                index = _indexes[tenant_id] = LexicalIndex(path, merge_factor=settings.LEXICAL_MERGE_FACTOR)
+    return index
+
+def search_lexical(query: str, top_k: int = 4, tenant_id: str | None = None,
+                   doc_ids: Collection[str] | None = None) -> List[Tuple[str, float, Dict]]:
+    index = get_lexical_index(tenant_id, create=False)
+    return index.search(query, top_k, doc_ids) if index is not None else []
+
+def drop_lexical_tenant(tenant_id: str) -> None:
+    with _index_lock:
+        index = _indexes.pop(tenant_id, None)
+        if index is not None:
+            index.close()
+    shutil.rmtree(_tenant_path(tenant_id), ignore_errors=True)
+
+def close_lexical_index() -> None:
+    with _index_lock:
+        for index in _indexes.values():
+            index.close()
+        _indexes.clear()
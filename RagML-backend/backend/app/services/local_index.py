@@ -0,0 +1,439 @@
+from __future__ import annotations
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Sequence, Tuple
+import fcntl
+import json
+import math
+import os
+import threading
+import numpy as np
+
+# Embedded IVF-flat index over a memory-mapped vector matrix.
+#
+# Layout of an index directory:
+#   meta.json     dim / dtype / count / capacity / nlist / rescore / epoch / trained_at;
+#                 rewritten after every change, so its stat tells readers to reload
+#   vectors.npy   (capacity, dim) float32|float16 memmap, rows are unit-norm;
+#                 int8: per-row scaled codes, binary: sign bits packed 8 per byte
+#   scales.npy    (capacity,) float32 memmap, int8 only: code * scale = component
+#   full.npy      (capacity, dim) float32 memmap, quantized indexes with rescoring:
+#                 scans read only the codes, the top candidates are rescored here
+#   assign.npy    (capacity,) int32 memmap, inverted list of every row (-1 = untrained)
+#   centroids.npy (nlist, dim) float32, present once the index is trained
+#   log.jsonl     append-only upsert/delete log holding ids and payloads
+#   write.lock    flock'd by the one process writing at a time (API or worker)
+#
+# Other processes may write the same directory: a writer first catches up with
+# the log under the lock, and searches reload whatever meta.json says changed.
+
+_MIN_CAPACITY = 1024
+_QUANTIZED = ("int8", "binary")
+
+
+def _normalize(m: np.ndarray) -> np.ndarray:
+    m = np.asarray(m, dtype=np.float32)
+    norms = np.linalg.norm(m, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return m / norms
+
+
+def _kmeans(data: np.ndarray, k: int, iters: int = 10, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), size=k, replace=False)].copy()
+    for _ in range(iters):
+        assign = _nearest(data, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, data)
+        counts = np.bincount(assign, minlength=k)
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = data[rng.choice(len(data), size=int(empty.sum()), replace=False)]
+        centroids = _normalize(sums)
+    return centroids
+
+
+def _nearest(data: np.ndarray, centroids: np.ndarray, batch: int = 8192) -> np.ndarray:
+    out = np.empty(len(data), dtype=np.int32)
+    for s in range(0, len(data), batch):
+        block = np.asarray(data[s:s + batch], dtype=np.float32)
+        out[s:s + batch] = np.argmax(block @ centroids.T, axis=1)
+    return out
+
+
+class LocalIndex:
+    def __init__(self, path: str | Path, dtype: str = "float32", nlist: int = 0,
+                 nprobe: int = 16, train_size: int = 20000, oversampling: float = 4.0,
+                 retrain_factor: float = 4.0):
+        if dtype not in ("float32", "float16", *_QUANTIZED):
+            raise ValueError(f"Unsupported local index dtype: {dtype}")
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.nprobe = nprobe
+        self.train_size = train_size
+        # retrain once the live rows reach retrain_factor x the count the centroids were fit on,
+        # so lists (and the nprobe scan) stay about the same size as the index grows; 0 = never
+        self.retrain_factor = retrain_factor
+        self._fixed_nlist = nlist  # 0: 4 * sqrt(n) at every training
+        self._trained_at = 0
+        self._lock = threading.RLock()
+        self.dim: int | None = None
+        self.dtype = dtype
+        self.nlist = nlist
+        # a new quantized index keeps full-precision rows only if it will rescore with them
+        self.oversampling = oversampling
+        self.rescore = dtype in _QUANTIZED and oversampling > 0
+        self.count = 0
+        self.capacity = 0
+        self._vectors: np.ndarray | None = None
+        self._assign: np.ndarray | None = None
+        self._scales: np.ndarray | None = None
+        self._full: np.ndarray | None = None
+        self._centroids: np.ndarray | None = None
+        self._lists: List[np.ndarray] = []
+        self._ids: List[str] = []
+        self._payloads: List[Dict] = []
+        self._rows: Dict[str, int] = {}
+        self._doc_rows: Dict[str, List[int]] = {}  # payload doc_id -> rows, for filtered search
+        self._deleted = np.zeros(0, dtype=bool)
+        self._stamp: Tuple[int, int] | None = None  # meta.json (inode, mtime) last loaded
+        self._log_pos = 0  # bytes of log.jsonl applied
+        self._epoch = 0  # bumped by every train()
+        self._writer: object | None = None
+        self._refresh()
+
+    # -- persistence -------------------------------------------------------
+
+    def _meta_path(self) -> Path:
+        return self.path / "meta.json"
+
+    def _meta_stamp(self) -> Tuple[int, int] | None:
+        try:
+            st = self._meta_path().stat()
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns
+
+    def _refresh(self) -> None:
+        # apply whatever other processes wrote since the last look; cheap when nothing did
+        stamp = self._meta_stamp()
+        if stamp is None or stamp == self._stamp:
+            return
+        meta = json.loads(self._meta_path().read_text())
+        self._stamp = stamp
+        self.dim, self.dtype, self.nlist = meta["dim"], meta["dtype"], meta["nlist"]
+        self.rescore = meta.get("rescore", False)
+        self._trained_at = meta.get("trained_at", meta["count"])
+        if meta["capacity"] != self.capacity:
+            for name in self._files():
+                setattr(self, f"_{name}", np.load(self.path / f"{name}.npy", mmap_mode="r+"))
+            deleted = np.zeros(meta["capacity"], dtype=bool)
+            deleted[:len(self._deleted)] = self._deleted
+            self._deleted, self.capacity = deleted, meta["capacity"]
+        start = len(self._ids)
+        with open(self.path / "log.jsonl", "rb") as f:
+            f.seek(self._log_pos)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # a writer is mid-line
+                rec = json.loads(line)
+                if rec["op"] == "put":
+                    row = len(self._ids)
+                    if row >= meta["count"]:
+                        break  # vectors for this record are not on disk (yet)
+                    self._tombstone(rec["id"])
+                    self._append(rec["id"], rec["payload"], row)
+                else:
+                    self._tombstone(rec["id"])
+                self._log_pos += len(line)
+        self.count = len(self._ids)
+        # indexes written before epochs existed are trained iff they have centroids
+        epoch = meta.get("epoch", int((self.path / "centroids.npy").exists()))
+        if epoch != self._epoch:
+            self._epoch = epoch
+            self._centroids = np.load(self.path / "centroids.npy")
+            self._rebuild_lists()
+        elif self._centroids is not None:
+            self._extend_lists(start)
+
+    @contextmanager
+    def _writing(self) -> Iterator[None]:
+        # one writer per directory across processes; it starts from the latest state on disk
+        with self._lock:
+            if self._writer is not None:  # re-entered, e.g. upsert -> train
+                yield
+                return
+            with open(self.path / "write.lock", "w") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                self._writer = f
+                try:
+                    self._refresh()
+                    log = self.path / "log.jsonl"
+                    if log.exists() and log.stat().st_size > self._log_pos:
+                        os.truncate(log, self._log_pos)  # left by a writer that died mid-upsert
+                    yield
+                finally:
+                    self._writer = None
+
+    def _save_meta(self) -> None:
+        meta = {"dim": self.dim, "dtype": self.dtype, "count": self.count, "capacity": self.capacity,
+                "nlist": self.nlist, "rescore": self.rescore, "epoch": self._epoch,
+                "trained_at": self._trained_at}
+        tmp = self._meta_path().with_suffix(".tmp")
+        tmp.write_text(json.dumps(meta))
+        os.replace(tmp, self._meta_path())
+        self._stamp = self._meta_stamp()
+
+    def _files(self) -> Dict[str, Tuple[np.dtype, Tuple[int, ...]]]:
+        # memmapped per-row arrays: name -> (dtype, row shape)
+        if self.dtype == "binary":
+            files = {"vectors": (np.dtype(np.uint8), ((self.dim + 7) // 8,))}
+        else:
+            files = {"vectors": (np.dtype(self.dtype), (self.dim,))}
+        files["assign"] = (np.dtype(np.int32), ())
+        if self.dtype == "int8":
+            files["scales"] = (np.dtype(np.float32), ())
+        if self.rescore:
+            files["full"] = (np.dtype(np.float32), (self.dim,))
+        return files
+
+    def bytes_per_vector(self) -> Dict[str, int]:
+        """Bytes per row a scan reads ("index") and kept only for rescoring ("rescore")."""
+        files = {name: dt.itemsize * math.prod(shape) for name, (dt, shape) in self._files().items()}
+        return {"index": files["vectors"] + files.get("scales", 0), "rescore": files.get("full", 0)}
+
+    def _grow(self, needed: int) -> None:
+        if needed <= self.capacity:
+            return
+        capacity = max(needed, 2 * self.capacity, _MIN_CAPACITY)
+        for name, (dt, shape) in self._files().items():
+            arr = np.lib.format.open_memmap(self.path / f"{name}.npy.tmp", mode="w+", dtype=dt, shape=(capacity, *shape))
+            if name == "assign":
+                arr[:] = -1
+            old = getattr(self, f"_{name}")
+            if old is not None:
+                arr[:self.count] = old[:self.count]
+            arr.flush()
+            del arr
+            setattr(self, f"_{name}", None)
+            os.replace(self.path / f"{name}.npy.tmp", self.path / f"{name}.npy")
+            setattr(self, f"_{name}", np.load(self.path / f"{name}.npy", mmap_mode="r+"))
+        deleted = np.zeros(capacity, dtype=bool)
+        deleted[:len(self._deleted)] = self._deleted
+        self._deleted = deleted
+        self.capacity = capacity
+
+    # -- codecs ------------------------------------------------------------
+
+    def _encode(self, vecs: np.ndarray) -> Tuple[np.ndarray, np.ndarray | None]:
+        if self.dtype == "int8":
+            scale = np.abs(vecs).max(axis=1) / 127.0
+            scale[scale == 0] = 1.0
+            return np.rint(vecs / scale[:, None]).astype(np.int8), scale.astype(np.float32)
+        if self.dtype == "binary":
+            return np.packbits(vecs > 0, axis=1), None
+        return vecs.astype(self.dtype), None
+
+    def _decode(self, sel: slice | np.ndarray) -> np.ndarray:
+        # approximate unit vectors; a scan scores these against the float query
+        codes = np.asarray(self._vectors[sel])
+        if self.dtype == "int8":
+            return codes.astype(np.float32) * np.asarray(self._scales[sel])[:, None]
+        if self.dtype == "binary":
+            bits = np.unpackbits(codes, axis=1, count=self.dim).astype(np.float32)
+            return (2 * bits - 1) / np.float32(np.sqrt(self.dim))
+        return codes.astype(np.float32, copy=False)
+
+    def _exact(self, sel: slice | np.ndarray) -> np.ndarray:
+        return np.asarray(self._full[sel]) if self._full is not None else self._decode(sel)
+
+    # -- mutation ----------------------------------------------------------
+
+    def _append(self, id_: str, payload: Dict, row: int) -> None:
+        self._ids.append(id_)
+        self._payloads.append(payload)
+        self._rows[id_] = row
+        doc_id = payload.get("doc_id")
+        if doc_id is not None:
+            self._doc_rows.setdefault(doc_id, []).append(row)
+
+    def _tombstone(self, id_: str) -> None:
+        row = self._rows.pop(id_, None)
+        if row is not None:
+            self._deleted[row] = True
+
+    def upsert(self, ids: List[str], vectors: np.ndarray, payloads: List[Dict]) -> None:
+        if not ids:
+            return
+        vecs = _normalize(vectors)
+        with self._writing():
+            if self.dim is None:
+                self.dim = int(vecs.shape[1])
+            elif vecs.shape[1] != self.dim:
+                raise ValueError(f"Vector dimension {vecs.shape[1]} does not match index dimension {self.dim}")
+            start = self.count
+            self._grow(start + len(ids))
+            codes, scales = self._encode(vecs)
+            self._vectors[start:start + len(ids)] = codes
+            self._vectors.flush()
+            if scales is not None:
+                self._scales[start:start + len(ids)] = scales
+                self._scales.flush()
+            if self._full is not None:
+                self._full[start:start + len(ids)] = vecs
+                self._full.flush()
+            with open(self.path / "log.jsonl", "a", encoding="utf-8") as f:
+                for i, (id_, payload) in enumerate(zip(ids, payloads)):
+                    self._tombstone(id_)
+                    self._append(id_, payload, start + i)
+                    f.write(json.dumps({"op": "put", "id": id_, "payload": payload}) + "\n")
+                self._log_pos = f.tell()
+            self.count = start + len(ids)
+            if self._centroids is not None:
+                self._assign[start:self.count] = _nearest(vecs, self._centroids)
+                self._assign.flush()
+                self._extend_lists(start)
+            self._save_meta()
+            live = len(self._rows)
+            if self._centroids is None:
+                if live >= self.train_size:
+                    self.train()
+            elif self.retrain_factor > 0 and live >= self._trained_at * self.retrain_factor:
+                self.train()
+
+    def delete(self, ids: List[str]) -> None:
+        with self._writing():
+            ids = [i for i in ids if i in self._rows]
+            if not ids:
+                return
+            with open(self.path / "log.jsonl", "a", encoding="utf-8") as f:
+                for id_ in ids:
+                    self._tombstone(id_)
+                    f.write(json.dumps({"op": "del", "id": id_}) + "\n")
+                self._log_pos = f.tell()
+            self._save_meta()
+
+    def _live_doc_rows(self, doc_ids: Sequence[str]) -> np.ndarray:
+        rows = np.fromiter((r for d in doc_ids for r in self._doc_rows.get(d, ())), dtype=np.int64)
+        return rows[~self._deleted[rows]]
+
+    def delete_documents(self, doc_ids: Sequence[str]) -> int:
+        with self._writing():
+            ids = [self._ids[r] for r in self._live_doc_rows(doc_ids)]
+            self.delete(ids)
+            for d in doc_ids:
+                self._doc_rows.pop(d, None)
+            return len(ids)
+
+    def live_count(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._rows)
+
+    # -- IVF ---------------------------------------------------------------
+
+    def train(self, nlist: int | None = None) -> None:
+        with self._writing():
+            live = np.flatnonzero(~self._deleted[:self.count])
+            if len(live) == 0:
+                return
+            k = nlist or self._fixed_nlist or int(4 * np.sqrt(len(live)))
+            k = max(1, min(k, len(live)))
+            rng = np.random.default_rng(0)
+            sample = live if len(live) <= k * 64 else np.sort(rng.choice(live, size=k * 64, replace=False))
+            self._centroids = _kmeans(self._exact(sample), k)
+            self.nlist = k
+            self._trained_at = len(live)
+            for s in range(0, self.count, 8192):
+                e = min(s + 8192, self.count)
+                self._assign[s:e] = _nearest(self._exact(slice(s, e)), self._centroids)
+            self._assign.flush()
+            with open(self.path / "centroids.npy.tmp", "wb") as f:
+                np.save(f, self._centroids)
+            os.replace(self.path / "centroids.npy.tmp", self.path / "centroids.npy")
+            self._epoch += 1
+            self._rebuild_lists()
+            self._save_meta()
+
+    def _rebuild_lists(self) -> None:
+        assign = np.asarray(self._assign[:self.count])
+        order = np.argsort(assign, kind="stable")
+        bounds = np.searchsorted(assign[order], np.arange(self.nlist + 1))
+        self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(self.nlist)]
+
+    def _extend_lists(self, start: int) -> None:
+        assign = np.asarray(self._assign[start:self.count])
+        for lst in np.unique(assign[assign >= 0]):
+            self._lists[lst] = np.concatenate([self._lists[lst], start + np.flatnonzero(assign == lst)])
+
+    # -- query -------------------------------------------------------------
+
+    def _candidates(self, q: np.ndarray, nprobe: int) -> np.ndarray | None:
+        if self._centroids is None:
+            return None
+        probe = np.argpartition(-(self._centroids @ q), min(nprobe, self.nlist) - 1)[:nprobe]
+        return np.concatenate([self._lists[i] for i in probe])
+
+    def _fetch(self, top_k: int) -> int:
+        # quantized scores only pick candidates; the full-precision rows order them
+        if self._full is None or self.oversampling <= 0:
+            return top_k
+        return max(top_k, math.ceil(top_k * self.oversampling))
+
+    def _brute(self, q: np.ndarray, k: int, block: int) -> Tuple[np.ndarray, np.ndarray]:
+        # one (rows x queries) product per block instead of a mat-vec per query
+        best_scores = np.full((len(q), 0), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(q), 0), dtype=np.int64)
+        for s in range(0, self.count, block):
+            e = min(s + block, self.count)
+            scores = (self._decode(slice(s, e)) @ q.T).T
+            scores[:, self._deleted[s:e]] = -np.inf
+            scores = np.concatenate([best_scores, scores], axis=1)
+            rows = np.concatenate([best_rows, np.broadcast_to(np.arange(s, e), (len(q), e - s))], axis=1)
+            kk = min(k, scores.shape[1])
+            top = np.argpartition(-scores, kk - 1, axis=1)[:, :kk]
+            best_scores = np.take_along_axis(scores, top, axis=1)
+            best_rows = np.take_along_axis(rows, top, axis=1)
+        return best_scores, best_rows
+
+    def _finish(self, q: np.ndarray, scores: np.ndarray, rows: np.ndarray, top_k: int) -> List[Tuple[str, float, Dict]]:
+        live = scores != -np.inf
+        scores, rows = scores[live], rows[live]
+        if self._full is not None and self.oversampling > 0 and len(rows):
+            scores = np.asarray(self._full[np.sort(rows)]) @ q
+            rows = np.sort(rows)
+        order = np.argsort(-scores)[:top_k]
+        return [(self._ids[int(rows[i])], float(scores[i]), self._payloads[int(rows[i])]) for i in order]
+
+    def search_batch(self, queries: np.ndarray, top_k: int = 4, nprobe: int | None = None,
+                     block: int = 65536, doc_ids: Sequence[str] | None = None) -> List[List[Tuple[str, float, Dict]]]:
+        q = _normalize(queries)
+        with self._lock:
+            self._refresh()
+            if self.count == 0:
+                return [[] for _ in range(len(queries))]
+            if self._centroids is not None or doc_ids is not None:
+                return [self.search(v, top_k, nprobe, doc_ids=doc_ids) for v in q]
+            scores, rows = self._brute(q, min(self._fetch(top_k), self.count), block)
+            return [self._finish(v, sc, rw, top_k) for v, sc, rw in zip(q, scores, rows)]
+
+    def search(self, query: np.ndarray, top_k: int = 4, nprobe: int | None = None,
+               block: int = 65536, doc_ids: Sequence[str] | None = None) -> List[Tuple[str, float, Dict]]:
+        q = _normalize(query).reshape(-1)
+        with self._lock:
+            self._refresh()
+            if self.count == 0 or top_k <= 0:
+                return []
+            fetch = self._fetch(top_k)
+            # a document filter selects few rows: scan exactly those instead of probing lists
+            cand = self._live_doc_rows(doc_ids) if doc_ids is not None else self._candidates(q, nprobe or self.nprobe)
+            if cand is None:
+                scores, rows = self._brute(q[None], min(fetch, self.count), block)
+                return self._finish(q, scores[0], rows[0], top_k)
+            if len(cand) == 0:
+                return []
+            scores = self._decode(cand) @ q
+            scores[self._deleted[cand]] = -np.inf
+            k = min(fetch, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            return self._finish(q, scores[top], cand[top], top_k)
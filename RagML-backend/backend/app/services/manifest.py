@@ -0,0 +1,79 @@
+from __future__ import annotations
+from dataclasses import dataclass, asdict, field
+from typing import List
+import hashlib
+import re
+import uuid
+from ..core.config import get_settings
+from ..db import sql as sql_db
+from ..db import nosql as nosql_db
+from .embedding import model_id
+
+settings = get_settings()
+
+# A document's manifest records what the last successful ingest left in a
+# vector backend: the file hash, the settings it was chunked and embedded with,
+# and the id of every chunk. Chunk ids are a function of (doc_id, embedder,
+# chunk text), so a re-upload only has to embed the chunks whose id is not in
+# the manifest and delete the ids that are gone; switching models re-embeds all.
+# Documents of a tenant are keyed "<tenant>/<doc_id>", so tenants may reuse
+# doc ids; documents outside any tenant keep their plain doc_id.
+
+_HASH_BLOCK = 1 << 20
+
+@dataclass
+class DocumentManifest:
+    doc_id: str
+    vector_backend: str
+    strategy: str
+    content_hash: str
+    chunk_ids: List[str] = field(default_factory=list)
+    tenant_id: str | None = None
+    config: str = ""  # ingest_config() of the run that wrote it
+
+def document_key(tenant_id: str | None, doc_id: str) -> str:
+    return f"{tenant_id}/{doc_id}" if tenant_id else doc_id
+
+def partition_name(tenant_id: str) -> str:
+    # a name every backend accepts for a collection, partition, tenant or directory;
+    # the hash keeps distinct tenant ids distinct after sanitizing
+    safe = re.sub(r"[^A-Za-z0-9_]", "_", tenant_id)[:48]
+    return f"t_{safe}_{hashlib.sha1(tenant_id.encode('utf-8')).hexdigest()[:8]}"
+
+def _fingerprint(*parts) -> str:
+    return hashlib.sha256("\0".join(map(str, parts)).encode("utf-8")).hexdigest()[:16]
+
+def embedder_config() -> str:
+    # everything a stored vector depends on besides its text
+    provider, model = model_id()
+    return _fingerprint(provider, model, settings.EMBEDDING_DIM, settings.VECTOR_QUANTIZATION)
+
+def ingest_config(strategy: str) -> str:
+    # ... plus what decides the chunk boundaries
+    return _fingerprint(embedder_config(), strategy, settings.MAX_CHUNK_TOKENS, settings.SLIDING_OVERLAP,
+                        settings.SEMANTIC_THRESHOLD, settings.SEMANTIC_BREAKPOINT_PERCENTILE, settings.SEMANTIC_WINDOW)
+
+def chunk_id(doc_id: str, text: str, embedder: str = "") -> str:
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{doc_id}/{embedder}/{digest}"))
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(_HASH_BLOCK):
+            h.update(block)
+    return h.hexdigest()
+
+def _db(db_backend: str):
+    return sql_db if db_backend == "postgres" else nosql_db
+
+async def load_manifest(db_backend: str, doc_id: str, vector_backend: str) -> DocumentManifest | None:
+    raw = await _db(db_backend).load_manifest(doc_id, vector_backend)
+    return DocumentManifest(**raw) if raw else None
+
+async def save_manifest(db_backend: str, manifest: DocumentManifest) -> None:
+    await _db(db_backend).save_manifest(asdict(manifest))
+
+async def delete_manifests(db_backend: str, vector_backend: str, tenant_id: str | None, doc_id: str | None = None) -> int:
+    key = document_key(tenant_id, doc_id) if doc_id is not None else None
+    return await _db(db_backend).delete_manifests(vector_backend, tenant_id, key)
@@ -1,27 +1,102 @@
 import json
-from typing import List, Tuple
-import redis
+import zlib
+from typing import Dict, Iterable, List, Sequence, Tuple
+from redis import asyncio as aioredis
 from ..core.config import get_settings
+from ..core.tracing import span
 
 settings = get_settings()
 
-_r: redis.Redis | None = None
+# Messages are stored as one header byte followed by the UTF-8 content:
+#   bits 0-6  role code (index into ROLES)
+#   bit 7     content is zlib-compressed
+# Legacy JSON entries (first byte "{") are still readable.
+ROLES = ("user", "assistant", "system")
+_COMPRESSED = 0x80
 
-def _redis() -> redis.Redis:
+_r: aioredis.Redis | None = None
+
+def get_redis() -> aioredis.Redis:
+    # one pool per process, shared by chat memory, the answer cache and the email outbox
     global _r
     if _r is None:
-        _r = redis.from_url(settings.REDIS_URL)
+        _r = aioredis.from_url(settings.REDIS_URL)
     return _r
 
-def append_message(session_id: str, role: str, content: str) -> None:
-    key = f"chat:{session_id}"
-    _redis().rpush(key, json.dumps({"role": role, "content": content}))
-
-def get_history(session_id: str, limit: int = 10) -> List[Tuple[str, str]]:
-    key = f"chat:{session_id}"
-    vals = _redis().lrange(key, -limit, -1)
-    out: List[Tuple[str, str]] = []
-    for v in vals:
-        d = json.loads(v)
-        out.append((d["role"], d["content"]))
-    return out
+async def close_redis() -> None:
+    global _r
+    if _r is not None:
+        await _r.aclose()
+        _r = None
+
+def _key(session_id: str) -> str:
+    return f"chat:{session_id}"
+
+def encode_message(role: str, content: str) -> bytes:
+    try:
+        header = ROLES.index(role)
+    except ValueError:
+        raise ValueError(f"Unsupported chat role: {role}")
+    body = content.encode("utf-8")
+    if len(body) >= settings.CHAT_COMPRESS_MIN_BYTES:
+        packed = zlib.compress(body, 6)
+        if len(packed) < len(body):
+            header, body = header | _COMPRESSED, packed
+    return bytes([header]) + body
+
+def decode_message(raw: bytes) -> Tuple[str, str]:
+    if raw[:1] == b"{":
+        d = json.loads(raw)
+        return d["role"], d["content"]
+    header, body = raw[0], raw[1:]
+    if header & _COMPRESSED:
+        body = zlib.decompress(body)
+    return ROLES[header & ~_COMPRESSED], body.decode("utf-8")
+
+async def append_messages(session_id: str, messages: Iterable[Tuple[str, str]]) -> None:
+    # push + trim + ttl in a single round trip
+    key = _key(session_id)
+    with span("history_write", "redis"):
+        async with get_redis().pipeline(transaction=False) as pipe:
+            pipe.rpush(key, *[encode_message(role, content) for role, content in messages])
+            pipe.ltrim(key, -settings.CHAT_HISTORY_MAX, -1)
+            pipe.expire(key, settings.CHAT_TTL_S)
+            await pipe.execute()
+
+async def append_many(messages: Dict[str, List[Tuple[str, str]]]) -> None:
+    # several sessions in one pipeline: one round trip for a whole batch
+    if not messages:
+        return
+    with span("history_write", "redis"):
+        async with get_redis().pipeline(transaction=False) as pipe:
+            for session_id, msgs in messages.items():
+                key = _key(session_id)
+                pipe.rpush(key, *[encode_message(role, content) for role, content in msgs])
+                pipe.ltrim(key, -settings.CHAT_HISTORY_MAX, -1)
+                pipe.expire(key, settings.CHAT_TTL_S)
+            await pipe.execute()
+
+async def append_message(session_id: str, role: str, content: str) -> None:
+    await append_messages(session_id, [(role, content)])
+
+async def get_history(session_id: str, limit: int = 10) -> List[Tuple[str, str]]:
+    # reading a session keeps it alive, in the same round trip
+    key = _key(session_id)
+    with span("history_read", "redis"):
+        async with get_redis().pipeline(transaction=False) as pipe:
+            pipe.lrange(key, -limit, -1)
+            pipe.expire(key, settings.CHAT_TTL_S)
+            vals, _ = await pipe.execute()
+    return [decode_message(v) for v in vals]
+
+async def get_histories(session_ids: Sequence[str], limit: int = 10) -> Dict[str, List[Tuple[str, str]]]:
+    unique = list(dict.fromkeys(session_ids))
+    if not unique:
+        return {}
+    with span("history_read", "redis"):
+        async with get_redis().pipeline(transaction=False) as pipe:
+            for session_id in unique:
+                pipe.lrange(_key(session_id), -limit, -1)
+                pipe.expire(_key(session_id), settings.CHAT_TTL_S)
+            res = await pipe.execute()
+    return {sid: [decode_message(v) for v in res[2 * i]] for i, sid in enumerate(unique)}
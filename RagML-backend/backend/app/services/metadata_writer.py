@@ -0,0 +1,133 @@
+from __future__ import annotations
+from dataclasses import dataclass, asdict, field
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Iterable, List
+import asyncio
+import logging
+from ..core.config import get_settings
+from ..core.tracing import span
+from ..db import sql as sql_db
+from ..db import nosql as nosql_db
+
+# Ingestion metadata is an audit trail, not something a job has to wait on:
+# records are buffered per metadata backend and written in bulk when
+# METADATA_FLUSH_ROWS accumulate or METADATA_FLUSH_S after the first one,
+# whichever comes first. A failed flush keeps its rows for the next one.
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+@dataclass
+class IngestRecord:
+    filename: str
+    doc_id: str | None
+    strategy: str
+    vector_backend: str
+    pages: int
+    chunks: int
+    timings: Dict[str, float] = field(default_factory=dict)
+    created_at: datetime = field(default_factory=datetime.now)
+    tenant_id: str | None = None
+
+@dataclass
+class WriterStats:
+    rows: int = 0
+    flushes: int = 0
+    errors: int = 0
+    dropped: int = 0
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+FlushFn = Callable[[List[Dict]], Awaitable[None]]
+
+class MetadataWriter:
+    def __init__(self, name: str, flush: FlushFn, max_rows: int = 200, max_delay_s: float = 1.0,
+                 max_pending: int = 10_000):
+        self.name = name
+        self._flush_fn = flush
+        self.max_rows, self.max_delay_s, self.max_pending = max_rows, max_delay_s, max_pending
+        self._rows: List[Dict] = []
+        self._lock = asyncio.Lock()
+        self._timer: asyncio.Task | None = None
+        self.stats = WriterStats()
+
+    def pending(self) -> int:
+        return len(self._rows)
+
+    async def add(self, record: IngestRecord) -> None:
+        self._rows.append(asdict(record))
+        if len(self._rows) >= self.max_rows:
+            await self.flush()
+        else:
+            self._schedule()
+
+    def _schedule(self) -> None:
+        if self._timer is None and self._rows:
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.max_delay_s)
+        self._timer = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        async with self._lock:
+            rows, self._rows = self._rows, []
+            if not rows:
+                return
+            try:
+                with span("metadata", self.name):
+                    await self._flush_fn(rows)
+            except Exception:
+                self.stats.errors += 1
+                logger.warning("Metadata flush of %d rows to %s failed; will retry", len(rows), self.name, exc_info=True)
+                self._rows[:0] = rows
+                overflow = len(self._rows) - self.max_pending
+                if overflow > 0:
+                    del self._rows[:overflow]
+                    self.stats.dropped += overflow
+                self._schedule()
+                return
+            self.stats.rows += len(rows)
+            self.stats.flushes += 1
+
+    async def close(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        await self.flush()
+
+_FLUSH: Dict[str, FlushFn] = {
+    "postgres": sql_db.insert_ingestions,
+    "mongodb": nosql_db.insert_ingestions,
+}
+
+_writers: Dict[str, MetadataWriter] = {}
+
+def get_metadata_writer(db_backend: str) -> MetadataWriter:
+    if db_backend not in _FLUSH:
+        raise ValueError(f"Unsupported metadata backend: {db_backend}")
+    if db_backend not in _writers:
+        _writers[db_backend] = MetadataWriter(db_backend, _FLUSH[db_backend], settings.METADATA_FLUSH_ROWS,
+                                              settings.METADATA_FLUSH_S, settings.METADATA_MAX_PENDING)
+    return _writers[db_backend]
+
+async def close_metadata_writers() -> None:
+    for w in list(_writers.values()):
+        await w.close()
+    _writers.clear()
+
+def metadata_writer_stats() -> dict:
+    return {name: {**w.stats.as_dict(), "pending": w.pending()} for name, w in _writers.items()}
+
+async def migrate_metadata(backends: Iterable[str]) -> None:
+    # run in the background at startup: an unreachable store must not hold up the app,
+    # and writes migrate lazily anyway
+    for name in backends:
+        try:
+            applied = await (sql_db.migrate() if name == "postgres" else nosql_db.migrate())
+            if applied:
+                logger.info("Applied %d %s metadata migrations", applied, name)
+        except Exception:
+            logger.warning("Could not migrate %s metadata store at startup", name, exc_info=True)
@@ -0,0 +1,181 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import List
+import json
+import logging
+import os
+import re
+import shutil
+import numpy as np
+from ..core.lazy import optional_import
+
+# CPU embedding runtime: the sentence-transformers model is exported to ONNX
+# once (optionally int8 dynamic-quantized) and cached on disk. Serving only
+# needs onnxruntime + tokenizers; torch is imported for the export alone.
+#
+# Artifact directory (one per model and precision):
+#   model.onnx        transformer body, inputs input_ids/attention_mask[/token_type_ids]
+#   tokenizer.json    fast tokenizer
+#   config.json       pooling / normalize / max_length / export agreement
+
+logger = logging.getLogger(__name__)
+
+PROBE_TEXTS = [
+    "How do I reset my password?",
+    "The invoice total includes VAT at the standard rate.",
+    "Refunds are processed within 30 days of the request.",
+    "Qdrant, Pinecone, Weaviate and Milvus are supported vector stores.",
+    "a",
+]
+
+
+def artifact_dir(cache_dir: str | Path, model_name: str, quantize: bool) -> Path:
+    slug = re.sub(r"[^A-Za-z0-9_.-]+", "--", model_name).strip("-")
+    return Path(cache_dir) / slug / ("int8" if quantize else "fp32")
+
+
+def _cosines(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return (a * b).sum(axis=1)
+
+
+def _pooling_mode(st) -> str:
+    pooling = next((m for m in st if type(m).__name__ == "Pooling"), None)
+    if pooling is None:
+        return "mean"
+    cfg = pooling.get_config_dict()
+    # older sentence-transformers spell the mode as one boolean flag per mode
+    mode = cfg.get("pooling_mode") or next((k[len("pooling_mode_"):] for k, v in cfg.items()
+                                            if k.startswith("pooling_mode_") and v is True), "mean")
+    mode = {"cls_token": "cls", "mean_tokens": "mean"}.get(mode, mode)
+    if mode not in ("mean", "cls"):
+        raise ValueError(f"Unsupported pooling mode for ONNX export: {mode}")
+    return mode
+
+
+def export_model(model_name: str, out: Path, quantize: bool = False, min_cosine: float = 0.98) -> Path:
+    """Exports `model_name` to `out`, checking it against the PyTorch model on PROBE_TEXTS."""
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    st = SentenceTransformer(model_name, device="cpu")
+    body = st[0].auto_model.eval()
+    mode = _pooling_mode(st)
+    normalize = any(type(m).__name__ == "Normalize" for m in st)
+
+    tmp = out.with_name(out.name + f".tmp{os.getpid()}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    st.tokenizer.backend_tokenizer.save(str(tmp / "tokenizer.json"))
+
+    sample = st.tokenizer(PROBE_TEXTS[:2], padding=True, return_tensors="pt")
+    names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in sample]
+    axes = {n: {0: "batch", 1: "seq"} for n in names}
+    axes["last_hidden_state"] = {0: "batch", 1: "seq"}
+
+    class Body(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.body = body
+
+        def forward(self, *inputs):
+            return self.body(**dict(zip(names, inputs))).last_hidden_state
+
+    fp32 = tmp / "model.fp32.onnx"
+    with torch.no_grad():
+        torch.onnx.export(Body(), tuple(sample[n] for n in names), str(fp32), input_names=names,
+                          output_names=["last_hidden_state"], dynamic_axes=axes, opset_version=17,
+                          dynamo=False)
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(str(fp32), str(tmp / "model.onnx"), weight_type=QuantType.QInt8)
+        fp32.unlink()
+    else:
+        fp32.rename(tmp / "model.onnx")
+
+    config = {"model": model_name, "pooling": mode, "normalize": normalize, "dim": int(body.config.hidden_size),
+              "max_length": int(st.max_seq_length or 512), "quantized": quantize}
+    (tmp / "config.json").write_text(json.dumps(config))
+    agreement = _cosines(OnnxEmbedder(tmp, threads=0).encode(PROBE_TEXTS, normalize_embeddings=False),
+                         st.encode(PROBE_TEXTS, normalize_embeddings=False, convert_to_numpy=True))
+    config["min_cosine"] = float(agreement.min())
+    if config["min_cosine"] < min_cosine:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise RuntimeError(f"ONNX export of {model_name} disagrees with PyTorch "
+                           f"(min cosine {config['min_cosine']:.4f} < {min_cosine})")
+    (tmp / "config.json").write_text(json.dumps(config))
+    if out.exists():
+        shutil.rmtree(tmp, ignore_errors=True)  # another process won the race
+    else:
+        out.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp, out)
+    logger.info("Exported %s to %s (min cosine vs PyTorch %.4f)", model_name, out, config["min_cosine"])
+    return out
+
+
+class OnnxEmbedder:
+    """Drop-in for SentenceTransformer.encode backed by an exported ONNX artifact."""
+
+    def __init__(self, path: str | Path, threads: int = 0, batch_size: int = 32):
+        ort, tokenizers = optional_import("onnxruntime"), optional_import("tokenizers")
+        if ort is None or tokenizers is None:
+            raise RuntimeError("onnx embeddings requested but onnxruntime/tokenizers not installed")
+        self.path = Path(path)
+        self.config = json.loads((self.path / "config.json").read_text())
+        self.batch_size = batch_size
+        self.tokenizer = tokenizers.Tokenizer.from_file(str(self.path / "tokenizer.json"))
+        self.tokenizer.enable_truncation(self.config["max_length"])
+        self.tokenizer.no_padding()
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = threads
+        opts.inter_op_num_threads = 1
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(str(self.path / "model.onnx"), opts,
+                                            providers=["CPUExecutionProvider"])
+        self._inputs = {i.name for i in self.session.get_inputs()}
+
+    def _forward(self, texts: List[str]) -> np.ndarray:
+        enc = self.tokenizer.encode_batch(texts)
+        seq = max(len(e.ids) for e in enc)
+        ids = np.zeros((len(enc), seq), dtype=np.int64)
+        mask = np.zeros((len(enc), seq), dtype=np.int64)
+        for i, e in enumerate(enc):
+            ids[i, :len(e.ids)] = e.ids
+            mask[i, :len(e.ids)] = 1
+        feed = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self._inputs:
+            feed["token_type_ids"] = np.zeros_like(ids)
+        hidden = self.session.run(None, feed)[0]
+        if self.config["pooling"] == "cls":
+            return hidden[:, 0]
+        m = mask[..., None].astype(np.float32)
+        return (hidden * m).sum(axis=1) / np.maximum(m.sum(axis=1), 1e-9)
+
+    def encode(self, texts: List[str], normalize_embeddings: bool | None = None,
+               show_progress_bar: bool = False, batch_size: int | None = None) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        size = batch_size or self.batch_size
+        # sort by length so each batch pads to similar lengths
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        out = np.empty((len(texts), self.dim), dtype=np.float32)
+        for s in range(0, len(texts), size):
+            idx = order[s:s + size]
+            out[idx] = self._forward([texts[i] for i in idx])
+        normalize = self.config["normalize"] if normalize_embeddings is None else normalize_embeddings
+        if normalize:
+            out /= np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12)
+        return out
+
+    @property
+    def dim(self) -> int:
+        return self.config["dim"]
+
+
+def load_onnx_embedder(model_name: str, cache_dir: str | Path, quantize: bool = False,
+                       threads: int = 0, batch_size: int = 32, min_cosine: float = 0.98) -> OnnxEmbedder:
+    path = artifact_dir(cache_dir, model_name, quantize)
+    if not (path / "config.json").exists():
+        export_model(model_name, path, quantize, min_cosine)
+    return OnnxEmbedder(path, threads=threads, batch_size=batch_size)
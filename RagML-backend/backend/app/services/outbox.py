@@ -0,0 +1,257 @@
+from __future__ import annotations
+from dataclasses import dataclass, field, asdict
+from typing import List, Sequence
+import asyncio
+import json
+import logging
+import smtplib
+import time
+import uuid
+from ..core.config import get_settings
+from ..core.concurrency import run_io
+from ..core.email import SendGridSession, SmtpSession, open_session
+from ..core.tracing import span
+from .memory import get_redis
+
+# Durable email outbox. Callers enqueue and return; sender tasks claim due
+# messages in batches and deliver them over one long-lived SMTP/SendGrid
+# session each. A message is due when its score in the `due` sorted set has
+# passed: new messages are due immediately, retries after their backoff, and
+# claimed messages after EMAIL_LEASE_S, so a sender that dies mid-batch only
+# delays its messages. The lease key makes claiming exclusive across processes.
+# Running senders heartbeat into a sorted set, so any process can tell whether
+# queued mail is actually going out (/health/email, the email status endpoint).
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+DUE = "outbox:due"
+SENDERS = "outbox:senders"  # sender id -> last heartbeat
+
+_disabled: str | None = None  # why this process's senders could not start
+
+@dataclass
+class OutboxMessage:
+    id: str
+    to: List[str]
+    subject: str
+    html: str
+    status: str = "queued"  # queued | retrying | sent | failed
+    attempts: int = 0
+    error: str | None = None
+    created_at: float = field(default_factory=time.time)
+    sent_at: float | None = None
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def from_json(cls, raw: str | bytes) -> "OutboxMessage":
+        return cls(**json.loads(raw))
+
+def _msg_key(message_id: str) -> str:
+    return f"outbox:msg:{message_id}"
+
+def _lease_key(message_id: str) -> str:
+    return f"outbox:lease:{message_id}"
+
+_wake: asyncio.Event | None = None
+
+def _wakeup() -> asyncio.Event:
+    global _wake
+    if _wake is None:
+        _wake = asyncio.Event()
+    return _wake
+
+async def enqueue(to: Sequence[str], subject: str, html: str) -> OutboxMessage:
+    msg = OutboxMessage(id=uuid.uuid4().hex, to=list(to), subject=subject, html=html)
+    with span("email_enqueue", "redis"):
+        async with get_redis().pipeline(transaction=True) as pipe:
+            pipe.set(_msg_key(msg.id), msg.to_json(), ex=settings.EMAIL_RECORD_TTL_S)
+            pipe.zadd(DUE, {msg.id: msg.created_at})
+            await pipe.execute()
+    _wakeup().set()  # senders in this process start at once instead of at their next poll
+    return msg
+
+async def get_message(message_id: str) -> OutboxMessage | None:
+    raw = await get_redis().get(_msg_key(message_id))
+    return OutboxMessage.from_json(raw) if raw else None
+
+async def claim(limit: int, owner: str) -> List[OutboxMessage]:
+    r = get_redis()
+    now = time.time()
+    ids = [i.decode() for i in await r.zrangebyscore(DUE, "-inf", now, start=0, num=limit)]
+    if not ids:
+        return []
+    async with r.pipeline(transaction=False) as pipe:
+        for i in ids:
+            pipe.set(_lease_key(i), owner, nx=True, ex=max(int(settings.EMAIL_LEASE_S), 1))
+        won = await pipe.execute()
+    ids = [i for i, ok in zip(ids, won) if ok]
+    if not ids:
+        return []
+    async with r.pipeline(transaction=False) as pipe:
+        pipe.zadd(DUE, {i: now + settings.EMAIL_LEASE_S for i in ids}, xx=True)
+        pipe.mget([_msg_key(i) for i in ids])
+        _, raws = await pipe.execute()
+    out, expired = [], []
+    for i, raw in zip(ids, raws):
+        if raw is None:
+            expired.append(i)
+        else:
+            out.append(OutboxMessage.from_json(raw))
+    if expired:
+        await r.zrem(DUE, *expired)
+    return out
+
+async def _settle(messages: Sequence[OutboxMessage], retry_at: dict[str, float]) -> None:
+    # one round trip for a whole batch: records, schedule and leases
+    async with get_redis().pipeline(transaction=False) as pipe:
+        for m in messages:
+            pipe.set(_msg_key(m.id), m.to_json(), ex=settings.EMAIL_RECORD_TTL_S)
+            if m.id in retry_at:
+                pipe.zadd(DUE, {m.id: retry_at[m.id]})
+            else:
+                pipe.zrem(DUE, m.id)
+            pipe.delete(_lease_key(m.id))
+        await pipe.execute()
+
+def _session_broken(e: BaseException) -> bool:
+    # every message behind this one would fail the same way
+    if isinstance(e, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, smtplib.SMTPAuthenticationError)):
+        return True
+    # smtplib errors are OSErrors too; only socket-level ones mean the connection is gone
+    return isinstance(e, (OSError, RuntimeError)) and not isinstance(e, smtplib.SMTPException)
+
+def _permanent(e: BaseException) -> bool:
+    # rejected by the server, as opposed to unreachable, misconfigured or rate limited
+    if _session_broken(e):
+        return False
+    if isinstance(e, smtplib.SMTPRecipientsRefused):
+        return True
+    if isinstance(e, smtplib.SMTPResponseException):
+        return e.smtp_code >= 500
+    status = getattr(e, "status_code", None)
+    return isinstance(status, int) and 400 <= status < 500 and status != 429
+
+def _send_batch(session: SmtpSession | SendGridSession, batch: Sequence[OutboxMessage]) -> List[BaseException | None]:
+    results: List[BaseException | None] = []
+    for m in batch:
+        try:
+            session.send(m.to, m.subject, m.html)
+            results.append(None)
+        except Exception as e:
+            results.append(e)
+            if _session_broken(e):
+                session.close()
+                results += [e] * (len(batch) - len(results))
+                break
+    return results
+
+async def deliver(session: SmtpSession | SendGridSession, batch: Sequence[OutboxMessage]) -> None:
+    backend = "sendgrid" if isinstance(session, SendGridSession) else "smtp"
+    with span("email_send", backend):
+        results = await run_io(_send_batch, session, batch)
+    retry_at: dict[str, float] = {}
+    now = time.time()
+    for m, err in zip(batch, results):
+        m.attempts += 1
+        if err is None:
+            m.status, m.error, m.sent_at = "sent", None, now
+            continue
+        m.error = f"{type(err).__name__}: {err}"
+        if _permanent(err) or m.attempts >= settings.EMAIL_MAX_ATTEMPTS:
+            m.status = "failed"
+            logger.error("Email %s to %s failed: %s", m.id, m.to, m.error)
+        else:
+            m.status = "retrying"
+            retry_at[m.id] = now + settings.EMAIL_RETRY_BACKOFF_S * 2 ** (m.attempts - 1)
+    await _settle(batch, retry_at)
+
+async def _heartbeat(owner: str) -> None:
+    now = time.time()
+    async with get_redis().pipeline(transaction=False) as pipe:
+        pipe.zadd(SENDERS, {owner: now})
+        pipe.zremrangebyscore(SENDERS, "-inf", now - settings.EMAIL_HEARTBEAT_S)
+        await pipe.execute()
+
+async def live_senders() -> int:
+    return await get_redis().zcount(SENDERS, time.time() - settings.EMAIL_HEARTBEAT_S, "+inf")
+
+async def run_sender(stop: asyncio.Event) -> None:
+    global _disabled
+    owner = uuid.uuid4().hex
+    try:
+        session = open_session()  # connects lazily, on the first send
+    except RuntimeError as e:
+        # messages stay queued until a configured sender picks them up; /health/email says so
+        _disabled = str(e)
+        logger.error("Email sender not started", exc_info=True)
+        return
+    wake = _wakeup()
+    beat = 0.0
+    try:
+        while not stop.is_set():
+            try:
+                if time.monotonic() - beat >= settings.EMAIL_HEARTBEAT_S / 3:
+                    await _heartbeat(owner)
+                    beat = time.monotonic()
+                batch = await claim(settings.EMAIL_BATCH_SIZE, owner)
+                if batch:
+                    await deliver(session, batch)
+                    continue
+            except Exception:
+                # claimed messages come back after their lease
+                logger.warning("Email sender iteration failed", exc_info=True)
+            wake.clear()
+            try:
+                await asyncio.wait_for(wake.wait(), settings.EMAIL_POLL_S)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        await run_io(session.close)
+        try:
+            await get_redis().zrem(SENDERS, owner)
+        except Exception:
+            pass  # the entry ages out after EMAIL_HEARTBEAT_S
+
+_stop: asyncio.Event | None = None
+_senders: List[asyncio.Task] = []
+
+def start_senders(n: int) -> None:
+    global _stop
+    if _senders or n <= 0:
+        return
+    _stop = asyncio.Event()
+    _senders.extend(asyncio.create_task(run_sender(_stop)) for _ in range(n))
+
+async def stop_senders() -> None:
+    global _stop, _wake
+    if _stop is None:
+        return
+    _stop.set()
+    _wakeup().set()
+    await asyncio.gather(*_senders, return_exceptions=True)
+    _senders.clear()
+    _stop = None
+    _wake = None
+
+async def outbox_health() -> dict:
+    if not settings.EMAIL_OUTBOX_ENABLED:
+        return {"enabled": False}
+    now = time.time()
+    async with get_redis().pipeline(transaction=False) as pipe:
+        pipe.zcount(SENDERS, now - settings.EMAIL_HEARTBEAT_S, "+inf")
+        pipe.zcard(DUE)
+        pipe.zcount(DUE, "-inf", now)
+        senders, pending, due = await pipe.execute()
+    return {
+        "enabled": True,
+        # no_sender: bookings are accepted but nothing is delivering their mail
+        "status": "ok" if senders else "no_sender",
+        "senders": senders,
+        "local_senders": sum(not t.done() for t in _senders),
+        "disabled": _disabled,
+        "pending": pending,  # queued, retrying or leased
+        "due": due,  # waiting for a sender right now
+    }
@@ -0,0 +1,47 @@
+from __future__ import annotations
+from collections import deque
+from concurrent.futures import Executor, Future
+from typing import BinaryIO, Deque, Iterator, List
+
+# pypdf's extract_text is pure Python, so threads do not help. Large PDFs are
+# split into page ranges that pool processes extract independently (each opens
+# the file by path); results are yielded strictly in page order as soon as the
+# next range is done, so chunking starts long before the last page is parsed.
+
+def _extract_range(path: str, start: int, stop: int) -> List[str]:
+    from pypdf import PdfReader
+    reader = PdfReader(path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+def extract_pages(fp: BinaryIO, path: str | None = None, pool: Executor | None = None,
+                  pages_per_task: int = 16, min_pages: int = 32, workers: int = 1) -> Iterator[str]:
+    from pypdf import PdfReader
+    reader = PdfReader(fp)
+    total = len(reader.pages)
+    if pool is None or path is None or total < min_pages:
+        for p in reader.pages:
+            yield p.extract_text() or ""
+        return
+    ranges = iter(range(pages_per_task, total, pages_per_task))
+    # keep every worker (`workers` = the pool's size) busy plus one range queued each,
+    # not the whole document in flight
+    depth = 2 * max(workers, 1)
+    inflight: Deque[Future] = deque()
+    try:
+        for start in ranges:
+            inflight.append(pool.submit(_extract_range, path, start, min(start + pages_per_task, total)))
+            if len(inflight) >= depth:
+                break
+        # the first range is extracted right here while the pool works ahead,
+        # so the first page arrives as fast as with serial extraction
+        for i in range(min(pages_per_task, total)):
+            yield reader.pages[i].extract_text() or ""
+        while inflight:
+            pages = inflight.popleft().result()
+            start = next(ranges, None)
+            if start is not None:
+                inflight.append(pool.submit(_extract_range, path, start, min(start + pages_per_task, total)))
+            yield from pages
+    finally:
+        for f in inflight:
+            f.cancel()
@@ -0,0 +1,51 @@
+from __future__ import annotations
+import logging
+from ..core.concurrency import run_io
+from ..core.config import get_settings
+from ..core.tracing import span
+from .answer_cache import invalidate_answer_cache
+from .lexical import drop_lexical_tenant, get_lexical_index
+from .manifest import delete_manifests, document_key, load_manifest
+from .vector_store import delete_document_vectors, drop_tenant_vectors
+
+# Lifecycle of tenants and their documents. Both operations are cheap at any
+# size: a tenant is a partition that is dropped whole (or one filtered delete
+# in Qdrant), and a document is removed by a doc_id filter rather than chunk by
+# chunk. The lexical index is per tenant, not per vector backend, so dropping a
+# tenant clears its lexical data for every backend.
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+async def _invalidate() -> None:
+    try:
+        await invalidate_answer_cache()
+    except Exception:
+        logger.warning("Could not invalidate answer cache", exc_info=True)
+
+async def drop_tenant(tenant_id: str, vector_backend: str, db_backend: str) -> int:
+    """Removes every document of the tenant; returns how many manifests were dropped."""
+    if not tenant_id:
+        raise ValueError("The default tenant cannot be dropped")
+    await drop_tenant_vectors(tenant_id, backend=vector_backend)
+    if settings.LEXICAL_ENABLED:
+        with span("drop_tenant", "lexical"):
+            await run_io(drop_lexical_tenant, tenant_id)
+    with span("manifest", db_backend):
+        documents = await delete_manifests(db_backend, vector_backend, tenant_id)
+    await _invalidate()
+    return documents
+
+async def delete_document(doc_id: str, tenant_id: str | None, vector_backend: str, db_backend: str) -> int:
+    """Removes one document from a tenant; returns its chunk count per the manifest (0 if unknown)."""
+    with span("manifest", db_backend):
+        manifest = await load_manifest(db_backend, document_key(tenant_id, doc_id), vector_backend)
+    await delete_document_vectors([doc_id], backend=vector_backend, tenant_id=tenant_id)
+    index = get_lexical_index(tenant_id, create=False) if settings.LEXICAL_ENABLED else None
+    if index is not None:
+        with span("delete", "lexical"):
+            await run_io(index.delete_documents, [doc_id])
+    with span("manifest", db_backend):
+        await delete_manifests(db_backend, vector_backend, tenant_id, doc_id)
+    await _invalidate()
+    return len(manifest.chunk_ids) if manifest is not None else 0
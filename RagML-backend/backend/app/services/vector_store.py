@@ -1,11 +1,24 @@
 from __future__ import annotations
-from typing import List, Dict, Tuple
-import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Protocol, Sequence, Tuple
+import asyncio
+import json
+import logging
+import math
+import shutil
+import sys
 import numpy as np
 from ..core.config import get_settings
+from ..core.concurrency import run_cpu, run_io
+from ..core.lazy import optional_import
+from ..core.tracing import span
+from .embedding import embedding_dim
+from .manifest import partition_name
 from pydantic import BaseModel
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
 class VectorItem(BaseModel):
     id: str
@@ -13,108 +26,768 @@ class VectorItem(BaseModel):
     text: str
     metadata: Dict[str, str] | None = None
 
-from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, VectorParams, PointStruct
+@dataclass
+class VectorBatch:
+    """Columnar upsert payload: one float32 matrix plus parallel id/text/metadata columns.
 
-_qdrant: QdrantClient | None = None
+    Vectors stay a NumPy array from the embedder to the store; each backend
+    converts only at its client boundary, in the form its SDK wants.
+    """
 
-def _qdrant_client() -> QdrantClient:
-    global _qdrant
-    if _qdrant is None:
-        _qdrant = QdrantClient(url=settings.QDRANT_URL)
+    ids: List[str]
+    vectors: np.ndarray
+    texts: List[str]
+    metadata: List[Dict[str, str] | None]
+
+    def __post_init__(self) -> None:
+        self.vectors = np.ascontiguousarray(self.vectors, dtype=np.float32)
+        if not (len(self.ids) == len(self.vectors) == len(self.texts) == len(self.metadata)):
+            raise ValueError("VectorBatch columns must have equal length")
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, s: slice) -> "VectorBatch":
+        return VectorBatch(self.ids[s], self.vectors[s], self.texts[s], self.metadata[s])
+
+    def payloads(self) -> List[Dict[str, str]]:
+        return [{"text": t, **(m or {})} for t, m in zip(self.texts, self.metadata)]
+
+    @classmethod
+    def from_items(cls, items: Sequence[VectorItem]) -> "VectorBatch":
+        return cls(
+            [it.id for it in items],
+            np.array([it.vector for it in items], dtype=np.float32).reshape(len(items), -1),
+            [it.text for it in items],
+            [it.metadata for it in items],
+        )
+
+    @classmethod
+    def concat(cls, batches: Sequence["VectorBatch"]) -> "VectorBatch":
+        if len(batches) == 1:
+            return batches[0]
+        return cls(
+            [i for b in batches for i in b.ids],
+            np.concatenate([b.vectors for b in batches]),
+            [t for b in batches for t in b.texts],
+            [m for b in batches for m in b.metadata],
+        )
+
+QueryVector = np.ndarray | List[float]
+
+from .local_index import LocalIndex
+
+SearchHit = Tuple[str, float, Dict]
+
+@dataclass(frozen=True)
+class SearchFilter:
+    """Restricts a search to one tenant and, optionally, some of its documents.
+
+    Each tenant is its own partition (a Pinecone namespace, Milvus partition,
+    Weaviate tenant, local index directory, or a tenant-indexed payload field
+    in Qdrant), so a search never scans other tenants' vectors. tenant_id None
+    is the default partition, which holds everything ingested without a tenant.
+    """
+
+    tenant_id: str | None = None
+    doc_ids: Tuple[str, ...] | None = None
+
+# Compression (VECTOR_QUANTIZATION) is pushed to each backend's native
+# quantizer where it has one: Qdrant scalar/binary quantization with server-side
+# rescoring, Weaviate SQ/BQ, Milvus IVF_SQ8. The local index quantizes in-process
+# and rescores from a full-precision memmap. Milvus has no binary index over float
+# fields, so binary falls back to SQ8, and SQ8 does not rescore: Milvus returns
+# oversampled candidates with their raw vectors and they are rescored here.
+# Pinecone manages its own storage.
+
+def _quantization() -> str:
+    mode = settings.VECTOR_QUANTIZATION
+    if mode not in ("none", "int8", "binary"):
+        raise ValueError(f"Unsupported vector quantization: {mode}")
+    return mode
+
+def _fetch_k(top_k: int) -> int:
+    return max(top_k, math.ceil(top_k * settings.VECTOR_RESCORE_OVERSAMPLING))
+
+def _rescore(query: np.ndarray, hits: List[Tuple[SearchHit, Any]], top_k: int) -> List[SearchHit]:
+    # hits carry the stored full-precision vector; cosine against it replaces the quantized score
+    if not hits:
+        return []
+    q = query / max(float(np.linalg.norm(query)), 1e-12)
+    m = np.asarray([v for _, v in hits], dtype=np.float32)
+    scores = (m / np.maximum(np.linalg.norm(m, axis=1, keepdims=True), 1e-12)) @ q
+    order = np.argsort(-scores)[:top_k]
+    return [(hits[i][0][0], float(scores[i]), hits[i][0][2]) for i in order]
+
+
+class VectorStore(Protocol):
+    name: str
+
+    async def connect(self) -> None: ...
+    async def upsert(self, batch: VectorBatch, tenant_id: str | None = None) -> None: ...
+    async def search(self, query_vec: QueryVector, top_k: int = 4, where: SearchFilter | None = None) -> List[SearchHit]: ...
+    async def search_batch(self, query_vecs: np.ndarray, top_k: int = 4, where: SearchFilter | None = None) -> List[List[SearchHit]]: ...
+    async def delete(self, ids: List[str], tenant_id: str | None = None) -> None: ...
+    async def delete_documents(self, doc_ids: Sequence[str], tenant_id: str | None = None) -> None: ...
+    async def drop_tenant(self, tenant_id: str) -> None: ...
+    async def health(self) -> bool: ...
+    async def close(self) -> None: ...
+
+
+# Exceptions meaning the connection failed rather than the request, per SDK;
+# only looked up once that SDK has been imported.
+_TRANSPORT_ERRORS = [
+    ("httpx", "TransportError"),
+    ("urllib3.exceptions", "ProtocolError"),
+    ("urllib3.exceptions", "MaxRetryError"),
+    ("urllib3.exceptions", "TimeoutError"),
+    ("weaviate.exceptions", "WeaviateConnectionError"),
+    ("weaviate.exceptions", "WeaviateTimeoutError"),
+    ("pymilvus.exceptions", "MilvusUnavailableException"),
+]
+_GRPC_TRANSIENT = ("UNAVAILABLE", "DEADLINE_EXCEEDED")
+
+def _transport_error(e: BaseException | None) -> bool:
+    for _ in range(8):
+        if e is None:
+            return False
+        if isinstance(e, (OSError, asyncio.TimeoutError)):
+            return True
+        for module, name in _TRANSPORT_ERRORS:
+            cls = getattr(sys.modules.get(module), name, None)
+            if isinstance(cls, type) and isinstance(e, cls):
+                return True
+        grpc = sys.modules.get("grpc")
+        if grpc is not None and isinstance(e, grpc.RpcError) and callable(getattr(e, "code", None)):
+            return getattr(e.code(), "name", None) in _GRPC_TRANSIENT
+        # SDK wrappers: qdrant's ResponseHandlingException keeps the httpx error in .source
+        e = getattr(e, "source", None) or e.__cause__
+    return False
+
+
+class PooledStore:
+    """Owns one long-lived client; reconnects once and retries when the connection fails.
+
+    Backends without an asyncio SDK implement the underscore hooks synchronously
+    and have them run on the I/O executor via `_call`, so the event loop never
+    blocks on a network round trip.
+    """
+
+    name = ""
+
+    def __init__(self) -> None:
+        self._client: Any = None
+        self._lock = asyncio.Lock()
+
+    async def _connect(self) -> Any:
+        raise NotImplementedError
+
+    async def _disconnect(self, client: Any) -> None:
+        close = getattr(client, "close", None)
+        if close is not None:
+            await run_io(close)
+
+    async def _ping(self, client: Any) -> None:
+        pass
+
+    async def connect(self) -> None:
+        async with self._lock:
+            if self._client is None:
+                self._client = await self._connect()
+
+    async def close(self) -> None:
+        async with self._lock:
+            client, self._client = self._client, None
+        if client is not None:
+            try:
+                await self._disconnect(client)
+            except Exception:
+                logger.warning("Error closing %s client", self.name, exc_info=True)
+
+    async def reconnect(self) -> None:
+        await self.close()
+        await self.connect()
+
+    async def _get_client(self) -> Any:
+        if self._client is None:
+            await self.connect()
+        return self._client
+
+    async def _call(self, fn: Callable[[Any], Any]) -> Any:
+        async def attempt() -> Any:
+            client = await self._get_client()
+            if asyncio.iscoroutinefunction(fn):
+                return await fn(client)
+            return await run_io(fn, client)
+        try:
+            return await attempt()
+        except Exception as e:
+            if not _transport_error(e):
+                raise  # a bad request or a bug: a fresh connection would fail the same way
+            logger.warning("%s call failed, reconnecting", self.name, exc_info=True)
+            await self.reconnect()
+            return await attempt()
+
+    async def search_batch(self, query_vecs: np.ndarray, top_k: int = 4, where: SearchFilter | None = None) -> List[List[SearchHit]]:
+        # backends without a native multi-query API: concurrent single searches
+        return list(await asyncio.gather(*(self.search(q, top_k, where) for q in query_vecs)))
+
+    async def health(self) -> bool:
+        try:
+            await self._ping(await self._get_client())
+            return True
+        except Exception:
+            logger.warning("%s health check failed", self.name, exc_info=True)
+            return False
+
+
+class QdrantStore(PooledStore):
+    name = "qdrant"
+
+    async def _connect(self) -> Any:
+        qdrant = optional_import("qdrant_client")
+        if qdrant is None:
+            raise RuntimeError("Qdrant client missing")
+        from qdrant_client.http.models import Distance, VectorParams
+        dim = await run_cpu(embedding_dim)
+        client = qdrant.AsyncQdrantClient(url=settings.QDRANT_URL)
         try:
-            _qdrant.get_collection(settings.QDRANT_COLLECTION)
+            info = await client.get_collection(settings.QDRANT_COLLECTION)
         except Exception:
-            _qdrant.recreate_collection(
+            await client.create_collection(
                 collection_name=settings.QDRANT_COLLECTION,
-                vectors_config=VectorParams(size=384, distance=Distance.COSINE),
+                # quantized: codes stay in RAM, originals go to disk and are read only to rescore
+                vectors_config=VectorParams(size=dim, distance=Distance.COSINE, on_disk=_quantization() != "none"),
+                quantization_config=self._quantization_config(),
             )
-    return _qdrant
-
-try:
-    import pinecone
-except Exception:
-    pinecone = None
-
-try:
-    import weaviate
-except Exception:
-    weaviate = None
-
-try:
-    from pymilvus import MilvusClient
-except Exception:
-    MilvusClient = None
-
-def upsert_vectors(items: List[VectorItem], backend: str = "qdrant") -> None:
-    if backend == "qdrant":
-        cli = _qdrant_client()
-        points = [
-            PointStruct(id=item.id, vector=item.vector, payload={"text": item.text, **(item.metadata or {})})
-            for item in items
-        ]
-        cli.upsert(collection_name=settings.QDRANT_COLLECTION, points=points)
-        return
-    if backend == "pinecone":
+            await self._index_payload(client, set())
+            return client
+        size = info.config.params.vectors.size
+        if size != dim:
+            await client.close()
+            raise ValueError(f"Vector dimension {dim} does not match collection dimension {size}")
+        if info.config.quantization_config is None and _quantization() != "none":
+            # existing collections are quantized in place; Qdrant builds the codes in the background
+            await client.update_collection(collection_name=settings.QDRANT_COLLECTION,
+                                           quantization_config=self._quantization_config())
+        await self._index_payload(client, set(info.payload_schema or {}))
+        return client
+
+    @staticmethod
+    async def _index_payload(client: Any, existing: set[str]) -> None:
+        # is_tenant co-locates each tenant's points on disk, so a tenant filter reads only its own
+        from qdrant_client.http.models import KeywordIndexParams, KeywordIndexType
+        for field, is_tenant in (("tenant_id", True), ("doc_id", False)):
+            if field not in existing:
+                await client.create_payload_index(
+                    collection_name=settings.QDRANT_COLLECTION, field_name=field,
+                    field_schema=KeywordIndexParams(type=KeywordIndexType.KEYWORD, is_tenant=is_tenant))
+
+    @staticmethod
+    def _filter(tenant_id: str | None, doc_ids: Sequence[str] | None = None) -> Any:
+        from qdrant_client.http import models
+        if tenant_id:
+            must: List[Any] = [models.FieldCondition(key="tenant_id", match=models.MatchValue(value=tenant_id))]
+        else:
+            must = [models.IsEmptyCondition(is_empty=models.PayloadField(key="tenant_id"))]
+        if doc_ids is not None:
+            must.append(models.FieldCondition(key="doc_id", match=models.MatchAny(any=list(doc_ids))))
+        return models.Filter(must=must)
+
+    @staticmethod
+    def _quantization_config() -> Any:
+        from qdrant_client.http import models
+        mode = _quantization()
+        if mode == "int8":
+            return models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8, quantile=0.99, always_ram=True))
+        if mode == "binary":
+            return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+        return None
+
+    @staticmethod
+    def _search_params() -> Any:
+        if _quantization() == "none":
+            return None
+        from qdrant_client.http.models import QuantizationSearchParams, SearchParams
+        oversampling = settings.VECTOR_RESCORE_OVERSAMPLING
+        return SearchParams(quantization=QuantizationSearchParams(rescore=oversampling > 0, oversampling=max(oversampling, 1.0)))
+
+    async def _disconnect(self, client: Any) -> None:
+        await client.close()
+
+    async def _ping(self, client: Any) -> None:
+        await client.get_collections()
+
+    async def upsert(self, batch: VectorBatch, tenant_id: str | None = None) -> None:
+        from qdrant_client.http.models import Batch
+        payloads = batch.payloads()
+        if tenant_id:
+            for p in payloads:
+                p["tenant_id"] = tenant_id
+        # columns are already well-typed; skip pydantic re-validating every float
+        points = Batch.model_construct(ids=batch.ids, vectors=batch.vectors.tolist(), payloads=payloads)
+        async def _upsert(cli: Any) -> None:
+            await cli.upsert(collection_name=settings.QDRANT_COLLECTION, points=points)
+        await self._call(_upsert)
+
+    async def delete(self, ids: List[str], tenant_id: str | None = None) -> None:
+        # chunk ids are unique across tenants
+        from qdrant_client.http.models import PointIdsList
+        async def _delete(cli: Any) -> None:
+            await cli.delete(collection_name=settings.QDRANT_COLLECTION, points_selector=PointIdsList(points=ids))
+        await self._call(_delete)
+
+    async def _delete_where(self, flt: Any) -> None:
+        from qdrant_client.http.models import FilterSelector
+        async def _delete(cli: Any) -> None:
+            await cli.delete(collection_name=settings.QDRANT_COLLECTION, points_selector=FilterSelector(filter=flt))
+        await self._call(_delete)
+
+    async def delete_documents(self, doc_ids: Sequence[str], tenant_id: str | None = None) -> None:
+        await self._delete_where(self._filter(tenant_id, doc_ids))
+
+    async def drop_tenant(self, tenant_id: str) -> None:
+        await self._delete_where(self._filter(tenant_id))
+
+    async def search(self, query_vec: QueryVector, top_k: int = 4, where: SearchFilter | None = None) -> List[SearchHit]:
+        vec = np.asarray(query_vec, dtype=np.float32).tolist()
+        params = self._search_params()
+        where = where or SearchFilter()
+        flt = self._filter(where.tenant_id, where.doc_ids)
+        async def _search(cli: Any) -> Any:
+            return await cli.query_points(collection_name=settings.QDRANT_COLLECTION, query=vec, limit=top_k,
+                                          query_filter=flt, with_payload=True, search_params=params)
+        res = await self._call(_search)
+        return [(str(r.id), float(r.score), r.payload) for r in res.points]
+
+    async def search_batch(self, query_vecs: np.ndarray, top_k: int = 4, where: SearchFilter | None = None) -> List[List[SearchHit]]:
+        from qdrant_client.http.models import QueryRequest
+        params = self._search_params()
+        where = where or SearchFilter()
+        flt = self._filter(where.tenant_id, where.doc_ids)
+        requests = [QueryRequest(query=v, filter=flt, limit=top_k, with_payload=True, params=params)
+                    for v in np.asarray(query_vecs, dtype=np.float32).tolist()]
+        async def _search(cli: Any) -> Any:
+            return await cli.query_batch_points(collection_name=settings.QDRANT_COLLECTION, requests=requests)
+        res = await self._call(_search)
+        return [[(str(r.id), float(r.score), r.payload) for r in hits.points] for hits in res]
+
+
+class PineconeStore(PooledStore):
+    name = "pinecone"
+
+    async def _connect(self) -> Any:
+        pinecone = optional_import("pinecone")
         if pinecone is None or not settings.PINECONE_API_KEY:
             raise RuntimeError("Pinecone not configured")
-        pinecone.init(api_key=settings.PINECONE_API_KEY)
-        index = pinecone.Index(settings.PINECONE_INDEX)
-        index.upsert(vectors=[(it.id, it.vector, {"text": it.text, **(it.metadata or {})}) for it in items])
-        return
-    if backend == "weaviate":
+        if _quantization() != "none":
+            logger.warning("Pinecone manages vector storage itself; VECTOR_QUANTIZATION is ignored")
+        def _init() -> Any:
+            pinecone.init(api_key=settings.PINECONE_API_KEY)
+            return pinecone.Index(settings.PINECONE_INDEX)
+        return await run_io(_init)
+
+    async def _disconnect(self, client: Any) -> None:
+        pass
+
+    async def _ping(self, client: Any) -> None:
+        await run_io(client.describe_index_stats)
+
+    @staticmethod
+    def _namespace(tenant_id: str | None) -> str:
+        return tenant_id or ""
+
+    async def upsert(self, batch: VectorBatch, tenant_id: str | None = None) -> None:
+        vectors = list(zip(batch.ids, batch.vectors.tolist(), batch.payloads()))
+        ns = self._namespace(tenant_id)
+        await self._call(lambda index: index.upsert(vectors=vectors, namespace=ns))
+
+    async def delete(self, ids: List[str], tenant_id: str | None = None) -> None:
+        ns = self._namespace(tenant_id)
+        await self._call(lambda index: index.delete(ids=ids, namespace=ns))
+
+    async def delete_documents(self, doc_ids: Sequence[str], tenant_id: str | None = None) -> None:
+        ns, flt = self._namespace(tenant_id), {"doc_id": {"$in": list(doc_ids)}}
+        await self._call(lambda index: index.delete(filter=flt, namespace=ns))
+
+    async def drop_tenant(self, tenant_id: str) -> None:
+        ns = self._namespace(tenant_id)
+        await self._call(lambda index: index.delete(delete_all=True, namespace=ns))
+
+    async def search(self, query_vec: QueryVector, top_k: int = 4, where: SearchFilter | None = None) -> List[SearchHit]:
+        vec = np.asarray(query_vec, dtype=np.float32).tolist()
+        where = where or SearchFilter()
+        ns = self._namespace(where.tenant_id)
+        flt = {"doc_id": {"$in": list(where.doc_ids)}} if where.doc_ids is not None else None
+        res = await self._call(lambda index: index.query(vector=vec, top_k=top_k, namespace=ns, filter=flt, include_metadata=True))
+        return [(m["id"], float(m["score"]), m["metadata"]) for m in res["matches"]]
+
+
+class WeaviateStore(PooledStore):
+    name = "weaviate"
+    DEFAULT_TENANT = "default"  # partition names all start with "t_"
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._multi_tenant = False
+        self._tenants: set[str] = set()
+
+    async def _connect(self) -> Any:
+        weaviate = optional_import("weaviate")
         if weaviate is None:
             raise RuntimeError("Weaviate client missing")
-        client = weaviate.connect_to_custom(url=settings.WEAVIATE_URL, auth_client_secret=weaviate.auth.AuthApiKey(settings.WEAVIATE_API_KEY) if settings.WEAVIATE_API_KEY else None)
-        try:
-            client.collections.get(settings.WEAVIATE_COLLECTION)
-        except Exception:
-            client.collections.create(name=settings.WEAVIATE_COLLECTION)
+        def _open() -> Any:
+            from weaviate.classes.config import Configure
+            client = weaviate.connect_to_custom(url=settings.WEAVIATE_URL, auth_client_secret=weaviate.auth.AuthApiKey(settings.WEAVIATE_API_KEY) if settings.WEAVIATE_API_KEY else None)
+            if client.collections.exists(settings.WEAVIATE_COLLECTION):
+                config = client.collections.get(settings.WEAVIATE_COLLECTION).config.get()
+                self._multi_tenant = bool(config.multi_tenancy_config.enabled)
+            else:
+                client.collections.create(name=settings.WEAVIATE_COLLECTION, vector_index_config=self._index_config(),
+                                          multi_tenancy_config=Configure.multi_tenancy(enabled=True, auto_tenant_creation=True))
+                self._multi_tenant = True
+            self._tenants.clear()
+            return client
+        return await run_io(_open)
+
+    @staticmethod
+    def _index_config() -> Any:
+        # Weaviate rescores SQ/BQ candidates against the uncompressed vectors it keeps on disk
+        mode = _quantization()
+        if mode == "none":
+            return None
+        from weaviate.classes.config import Configure
+        quantizer = Configure.VectorIndex.Quantizer.sq() if mode == "int8" else Configure.VectorIndex.Quantizer.bq()
+        return Configure.VectorIndex.hnsw(quantizer=quantizer)
+
+    async def _ping(self, client: Any) -> None:
+        if not await run_io(client.is_ready):
+            raise ConnectionError("Weaviate not ready")
+
+    def _tenant(self, tenant_id: str | None) -> str | None:
+        if self._multi_tenant:
+            return partition_name(tenant_id) if tenant_id else self.DEFAULT_TENANT
+        if tenant_id:
+            raise ValueError(f"Weaviate collection {settings.WEAVIATE_COLLECTION} was created without multi-tenancy")
+        return None
+
+    def _coll(self, client: Any, tenant_id: str | None, create: bool = True) -> Any:
+        # None: the tenant does not exist yet, so there is nothing to read or delete
         coll = client.collections.get(settings.WEAVIATE_COLLECTION)
-        with coll.batch.dynamic() as batch:
-            for it in items:
-                batch.add_object(properties={"text": it.text, **(it.metadata or {})}, vector=it.vector)
-        client.close()
-        return
-    if backend == "milvus":
-        if MilvusClient is None:
+        tenant = self._tenant(tenant_id)
+        if tenant is None:
+            return coll
+        if not create and tenant not in self._tenants:
+            if not coll.tenants.exists(tenant):
+                return None
+            self._tenants.add(tenant)
+        return coll.with_tenant(tenant)
+
+    async def upsert(self, batch: VectorBatch, tenant_id: str | None = None) -> None:
+        def _upsert(client: Any) -> None:
+            coll = self._coll(client, tenant_id)  # auto_tenant_creation adds new tenants on write
+            with coll.batch.dynamic() as wb:
+                for id_, props, vec in zip(batch.ids, batch.payloads(), batch.vectors.tolist()):
+                    wb.add_object(properties=props, vector=vec, uuid=id_)
+        await self._call(_upsert)
+
+    async def _delete_where(self, tenant_id: str | None, where: Any) -> None:
+        def _delete(client: Any) -> None:
+            coll = self._coll(client, tenant_id, create=False)
+            if coll is not None:
+                coll.data.delete_many(where=where)
+        await self._call(_delete)
+
+    async def delete(self, ids: List[str], tenant_id: str | None = None) -> None:
+        from weaviate.classes.query import Filter
+        await self._delete_where(tenant_id, Filter.by_id().contains_any(ids))
+
+    async def delete_documents(self, doc_ids: Sequence[str], tenant_id: str | None = None) -> None:
+        from weaviate.classes.query import Filter
+        await self._delete_where(tenant_id, Filter.by_property("doc_id").contains_any(list(doc_ids)))
+
+    async def drop_tenant(self, tenant_id: str) -> None:
+        tenant = self._tenant(tenant_id)
+        def _drop(client: Any) -> None:
+            client.collections.get(settings.WEAVIATE_COLLECTION).tenants.remove([tenant])
+            self._tenants.discard(tenant)
+        await self._call(_drop)
+
+    async def search(self, query_vec: QueryVector, top_k: int = 4, where: SearchFilter | None = None) -> List[SearchHit]:
+        from weaviate.classes.query import Filter
+        vec = np.asarray(query_vec, dtype=np.float32).tolist()
+        where = where or SearchFilter()
+        flt = Filter.by_property("doc_id").contains_any(list(where.doc_ids)) if where.doc_ids is not None else None
+        def _search(client: Any) -> Any:
+            coll = self._coll(client, where.tenant_id, create=False)
+            if coll is None:
+                return []
+            return coll.query.near_vector(vec, limit=top_k, filters=flt, return_metadata=["distance"]).objects
+        return [(str(o.uuid), 1.0 - float(o.metadata.distance), {"text": o.properties.get("text", "")}) for o in await self._call(_search)]
+
+
+class MilvusStore(PooledStore):
+    name = "milvus"
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._partitions: set[str] = set()
+
+    async def _connect(self) -> Any:
+        pymilvus = optional_import("pymilvus")
+        if pymilvus is None:
             raise RuntimeError("Milvus client missing")
-        client = MilvusClient(uri=settings.MILVUS_URI, token=settings.MILVUS_TOKEN)
+        self._partitions.clear()
+        return await run_io(pymilvus.MilvusClient, uri=settings.MILVUS_URI, token=settings.MILVUS_TOKEN)
+
+    async def _ping(self, client: Any) -> None:
+        await run_io(client.list_collections)
+
+    @staticmethod
+    def _create(client: Any, dim: int) -> None:
+        name = settings.MILVUS_COLLECTION
+        # quick setup enables dynamic fields: doc_id, tenant_id and filename ride along with each row
+        client.create_collection(collection_name=name, dimension=dim, id_type="string", max_length=64)
+        if _quantization() == "none":
+            return
+        if _quantization() == "binary":
+            logger.warning("Milvus has no binary index over float vectors; using IVF_SQ8")
+        # swap the default index for an 8-bit scalar-quantized one
+        client.release_collection(collection_name=name)
+        client.drop_index(collection_name=name, index_name="vector")
+        params = client.prepare_index_params()
+        params.add_index(field_name="vector", index_name="vector", index_type="IVF_SQ8", metric_type="COSINE",
+                         params={"nlist": 1024})
+        client.create_index(collection_name=name, index_params=params)
+        client.load_collection(collection_name=name)
+
+    def _partition(self, client: Any, tenant_id: str | None, create: bool = False) -> str | None:
+        # None: the tenant has no partition yet
+        if not tenant_id:
+            return "_default"
+        name = partition_name(tenant_id)
+        if name not in self._partitions:
+            if not client.has_partition(collection_name=settings.MILVUS_COLLECTION, partition_name=name):
+                if not create:
+                    return None
+                client.create_partition(collection_name=settings.MILVUS_COLLECTION, partition_name=name)
+            self._partitions.add(name)
+        return name
+
+    def _search_kwargs(self, top_k: int, partition: str, doc_ids: Sequence[str] | None) -> Dict[str, Any]:
+        kwargs: Dict[str, Any] = {"partition_names": [partition]}
+        if doc_ids is not None:
+            kwargs["filter"] = f"doc_id in {json.dumps(list(doc_ids))}"
+        if _quantization() == "none" or settings.VECTOR_RESCORE_OVERSAMPLING <= 0:
+            return {**kwargs, "limit": top_k, "output_fields": ["text"]}
+        return {**kwargs, "limit": _fetch_k(top_k), "output_fields": ["text", "vector"]}
+
+    def _hits(self, query: np.ndarray, hits: Any, top_k: int) -> List[SearchHit]:
+        out = [(str(hit["id"]), float(hit["distance"]), {"text": hit["entity"]["text"]}) for hit in hits]
+        if "vector" not in (hits[0]["entity"] if len(hits) else {}):
+            return out
+        return _rescore(query, [(h, hit["entity"]["vector"]) for h, hit in zip(out, hits)], top_k)
+
+    async def upsert(self, batch: VectorBatch, tenant_id: str | None = None) -> None:
+        def _insert(client: Any) -> None:
+            if not client.has_collection(settings.MILVUS_COLLECTION):
+                self._create(client, batch.vectors.shape[1])
+            partition = self._partition(client, tenant_id, create=True)
+            # pymilvus takes NumPy rows directly; upsert keeps re-ingested ids unique
+            client.upsert(collection_name=settings.MILVUS_COLLECTION, partition_name=partition, data=[
+                {**(m or {}), "id": i, "vector": v, "text": t}
+                for i, v, t, m in zip(batch.ids, batch.vectors, batch.texts, batch.metadata)
+            ])
+        await self._call(_insert)
+
+    async def delete(self, ids: List[str], tenant_id: str | None = None) -> None:
+        def _delete(client: Any) -> None:
+            partition = self._partition(client, tenant_id)
+            if partition is not None:
+                client.delete(collection_name=settings.MILVUS_COLLECTION, ids=ids, partition_name=partition)
+        await self._call(_delete)
+
+    async def delete_documents(self, doc_ids: Sequence[str], tenant_id: str | None = None) -> None:
+        expr = f"doc_id in {json.dumps(list(doc_ids))}"
+        def _delete(client: Any) -> None:
+            partition = self._partition(client, tenant_id)
+            if partition is not None:
+                client.delete(collection_name=settings.MILVUS_COLLECTION, filter=expr, partition_name=partition)
+        await self._call(_delete)
+
+    async def drop_tenant(self, tenant_id: str) -> None:
+        def _drop(client: Any) -> None:
+            partition = self._partition(client, tenant_id)
+            if partition is None:
+                return
+            client.release_partitions(collection_name=settings.MILVUS_COLLECTION, partition_names=[partition])
+            client.drop_partition(collection_name=settings.MILVUS_COLLECTION, partition_name=partition)
+            self._partitions.discard(partition)
+        await self._call(_drop)
+
+    async def search(self, query_vec: QueryVector, top_k: int = 4, where: SearchFilter | None = None) -> List[SearchHit]:
+        return (await self.search_batch(np.asarray(query_vec, dtype=np.float32)[None], top_k, where))[0]
+
+    async def search_batch(self, query_vecs: np.ndarray, top_k: int = 4, where: SearchFilter | None = None) -> List[List[SearchHit]]:
+        data = list(np.asarray(query_vecs, dtype=np.float32))
+        where = where or SearchFilter()
+        def _search(client: Any) -> Any:
+            partition = self._partition(client, where.tenant_id)
+            if partition is None:
+                return [[] for _ in data]
+            return client.search(collection_name=settings.MILVUS_COLLECTION, data=data,
+                                 **self._search_kwargs(top_k, partition, where.doc_ids))
+        res = await self._call(_search)
+        return [self._hits(q, hits, top_k) for q, hits in zip(data, res)]
+
+
+class LocalStore(PooledStore):
+    """The default partition lives at LOCAL_INDEX_PATH, each tenant in its own index under tenants/."""
+
+    name = "local"
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._tenants: Dict[str, LocalIndex] = {}
+
+    @staticmethod
+    def _open(path: str | Path) -> LocalIndex:
+        return LocalIndex(
+            path,
+            dtype=settings.LOCAL_INDEX_DTYPE if _quantization() == "none" else _quantization(),
+            nlist=settings.LOCAL_INDEX_NLIST,
+            nprobe=settings.LOCAL_INDEX_NPROBE,
+            train_size=settings.LOCAL_INDEX_TRAIN_SIZE,
+            retrain_factor=settings.LOCAL_INDEX_RETRAIN_FACTOR,
+            oversampling=settings.VECTOR_RESCORE_OVERSAMPLING,
+        )
+
+    @staticmethod
+    def _tenant_path(tenant_id: str) -> Path:
+        return Path(settings.LOCAL_INDEX_PATH) / "tenants" / partition_name(tenant_id)
+
+    async def _connect(self) -> LocalIndex:
+        return await run_io(self._open, settings.LOCAL_INDEX_PATH)
+
+    async def _disconnect(self, client: LocalIndex) -> None:
+        self._tenants.clear()
+
+    async def _index(self, tenant_id: str | None, create: bool = False) -> LocalIndex | None:
+        # None: the tenant has no index yet
+        if not tenant_id:
+            return await self._get_client()
+        index = self._tenants.get(tenant_id)
+        if index is None:
+            path = self._tenant_path(tenant_id)
+            if not create and not (path / "meta.json").exists():
+                return None
+            index = self._tenants.setdefault(tenant_id, await run_io(self._open, path))
+        return index
+
+    async def upsert(self, batch: VectorBatch, tenant_id: str | None = None) -> None:
+        index = await self._index(tenant_id, create=True)
+        await run_cpu(index.upsert, batch.ids, batch.vectors, batch.payloads())
+
+    async def delete(self, ids: List[str], tenant_id: str | None = None) -> None:
+        index = await self._index(tenant_id)
+        if index is not None:
+            await run_io(index.delete, ids)
+
+    async def delete_documents(self, doc_ids: Sequence[str], tenant_id: str | None = None) -> None:
+        index = await self._index(tenant_id)
+        if index is not None:
+            await run_io(index.delete_documents, doc_ids)
+
+    async def drop_tenant(self, tenant_id: str) -> None:
+        self._tenants.pop(tenant_id, None)
+        await run_io(shutil.rmtree, self._tenant_path(tenant_id), True)
+
+    async def search(self, query_vec: QueryVector, top_k: int = 4, where: SearchFilter | None = None) -> List[SearchHit]:
+        # off the loop: the index lock is held for seconds while an upsert trains k-means
+        where = where or SearchFilter()
+        index = await self._index(where.tenant_id)
+        if index is None:
+            return []
+        return await run_cpu(index.search, np.asarray(query_vec, dtype=np.float32), top_k, doc_ids=where.doc_ids)
+
+    async def search_batch(self, query_vecs: np.ndarray, top_k: int = 4, where: SearchFilter | None = None) -> List[List[SearchHit]]:
+        where = where or SearchFilter()
+        index = await self._index(where.tenant_id)
+        if index is None:
+            return [[] for _ in query_vecs]
+        return await run_cpu(index.search_batch, np.asarray(query_vecs, dtype=np.float32), top_k, doc_ids=where.doc_ids)
+
+
+STORES: Dict[str, type[PooledStore]] = {
+    "qdrant": QdrantStore,
+    "pinecone": PineconeStore,
+    "weaviate": WeaviateStore,
+    "milvus": MilvusStore,
+    "local": LocalStore,
+}
+
+_stores: Dict[str, VectorStore] = {}
+
+def get_store(backend: str) -> VectorStore:
+    store = _stores.get(backend)
+    if store is None:
+        if backend not in STORES:
+            raise ValueError(f"Unsupported vector backend: {backend}")
+        store = _stores.setdefault(backend, STORES[backend]())
+    return store
+
+async def init_stores(backends: Iterable[str]) -> None:
+    for backend in backends:
+        store = get_store(backend)
         try:
-            client.get_collection(settings.MILVUS_COLLECTION)
+            await store.connect()
         except Exception:
-            client.create_collection(collection_name=settings.MILVUS_COLLECTION, dimension=len(items[0].vector))
-        client.insert(collection_name=settings.MILVUS_COLLECTION, data={
-            "id": [it.id for it in items],
-            "vector": [it.vector for it in items],
-            "text": [it.text for it in items],
-        })
+            # keep the app up; the store reconnects on first use
+            logger.exception("Could not connect to %s vector store at startup", backend)
+
+async def close_stores() -> None:
+    stores = list(_stores.values())
+    _stores.clear()
+    for store in stores:
+        await store.close()
+
+async def stores_health() -> Dict[str, bool]:
+    return {name: await store.health() for name, store in list(_stores.items())}
+
+async def upsert_vectors(items: VectorBatch | List[VectorItem], backend: str = "qdrant", tenant_id: str | None = None) -> None:
+    batch = items if isinstance(items, VectorBatch) else VectorBatch.from_items(items)
+    if len(batch):
+        with span("upsert", backend):
+            await get_store(backend).upsert(batch, tenant_id=tenant_id)
+
+async def search_vectors(query_vec: QueryVector, top_k: int = 4, backend: str = "qdrant",
+                         where: SearchFilter | None = None) -> List[SearchHit]:
+    with span("search", backend):
+        return await get_store(backend).search(query_vec, top_k=top_k, where=where)
+
+async def delete_vectors(ids: List[str], backend: str = "qdrant", tenant_id: str | None = None) -> None:
+    if not ids:
         return
-    raise ValueError(f"Unsupported vector backend: {backend}")
-
-def search_vectors(query_vec: List[float], top_k: int = 4, backend: str = "qdrant") -> List[Tuple[str, float, Dict]]:
-    if backend == "qdrant":
-        cli = _qdrant_client()
-        res = cli.search(collection_name=settings.QDRANT_COLLECTION, query_vector=query_vec, limit=top_k, with_payload=True)
-        return [(str(r.id), float(r.score), r.payload) for r in res]
-    if backend == "pinecone":
-        index = pinecone.Index(settings.PINECONE_INDEX)
-        res = index.query(vector=query_vec, top_k=top_k, include_metadata=True)
-        return [(m["id"], float(m["score"]), m["metadata"]) for m in res["matches"]]
-    if backend == "weaviate":
-        client = weaviate.connect_to_custom(url=settings.WEAVIATE_URL, auth_client_secret=weaviate.auth.AuthApiKey(settings.WEAVIATE_API_KEY) if settings.WEAVIATE_API_KEY else None)
-        coll = client.collections.get(settings.WEAVIATE_COLLECTION)
-        res = coll.query.near_vector(query_vec, limit=top_k, return_metadata=["distance"]).objects
-        out = []
-        for o in res:
-            out.append((o.uuid, 1.0 - float(o.metadata.distance), {"text": o.properties.get("text", "")}))
-        client.close()
-        return out
-    if backend == "milvus":
-        client = MilvusClient(uri=settings.MILVUS_URI, token=settings.MILVUS_TOKEN)
-        res = client.search(collection_name=settings.MILVUS_COLLECTION, data=[query_vec], limit=top_k, output_fields=["text"])
-        out = []
-        for hit in res[0]:
-            out.append((str(hit["id"]), float(hit["distance"]), {"text": hit["entity"]["text"]}))
-        return out
-    raise ValueError(f"Unsupported vector backend: {backend}")
+    with span("delete", backend):
+        await get_store(backend).delete(ids, tenant_id=tenant_id)
+
+async def delete_document_vectors(doc_ids: Sequence[str], backend: str = "qdrant", tenant_id: str | None = None) -> None:
+    # by payload/metadata filter: no need to know the chunk ids
+    if not doc_ids:
+        return
+    with span("delete", backend):
+        await get_store(backend).delete_documents(doc_ids, tenant_id=tenant_id)
+
+async def drop_tenant_vectors(tenant_id: str, backend: str = "qdrant") -> None:
+    if not tenant_id:
+        raise ValueError("The default tenant cannot be dropped")
+    with span("drop_tenant", backend):
+        await get_store(backend).drop_tenant(tenant_id)
+
+async def search_vectors_batch(query_vecs: np.ndarray, top_k: int = 4, backend: str = "qdrant",
+                               where: SearchFilter | None = None) -> List[List[SearchHit]]:
+    if not len(query_vecs):
+        return []
+    with span("search_batch", backend):
+        return await get_store(backend).search_batch(query_vecs, top_k=top_k, where=where)
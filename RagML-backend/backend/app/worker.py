@@ -0,0 +1,112 @@
+from __future__ import annotations
+import argparse
+import asyncio
+import logging
+import multiprocessing as mp
+import signal
+from .core.config import get_settings
+from .core.concurrency import shutdown_executors
+from .core.tracing import start_metrics_server
+from .services.jobs import RedisJobQueue, process_job
+from .services.memory import close_redis
+from .services.metadata_writer import close_metadata_writers, migrate_metadata
+from .db.sql import dispose_engine
+from .db.nosql import close_client
+from .services.outbox import start_senders, stop_senders
+from .services.vector_store import close_stores
+
+# Ingestion worker pool: `python -m app.worker --processes 4`.
+# Each process drains the Redis job queue, running up to --concurrency jobs at once.
+
+settings = get_settings()
+logger = logging.getLogger("app.worker")
+
+async def _drain(queue: RedisJobQueue, stop: asyncio.Event) -> None:
+    backoff = 1.0
+    while not stop.is_set():
+        try:
+            job_id = await queue.next(timeout=2.0)
+            if job_id is None:
+                continue
+            job = await queue.get(job_id)
+            if job is None:  # expired record
+                await queue.ack(job_id)
+                continue
+            hold = asyncio.create_task(queue.hold(job_id))
+            try:
+                done = await process_job(queue, job)
+            finally:
+                hold.cancel()
+            if done:
+                await queue.ack(job_id)
+            else:
+                await queue.requeue(job_id)
+            backoff = 1.0
+        except Exception:
+            # e.g. Redis went away; a job taken but not acked comes back once its lease expires
+            logger.warning("Ingest worker iteration failed, retrying in %.0fs", backoff, exc_info=True)
+            try:
+                await asyncio.wait_for(stop.wait(), backoff)
+            except asyncio.TimeoutError:
+                pass
+            backoff = min(backoff * 2, 30.0)
+
+async def _reap(queue: RedisJobQueue, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        try:
+            moved = await queue.recover()
+            if moved:
+                logger.info("Requeued %d ingest jobs with expired leases", moved)
+        except Exception:
+            logger.warning("Recovering expired ingest jobs failed", exc_info=True)
+        try:
+            await asyncio.wait_for(stop.wait(), settings.INGEST_LEASE_S)
+        except asyncio.TimeoutError:
+            pass
+
+async def serve(concurrency: int, email_senders: int = 0, recover: bool = False) -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    queue = RedisJobQueue(settings.REDIS_URL)
+    start_senders(email_senders)
+    migrations = asyncio.create_task(migrate_metadata(filter(None, settings.METADATA_MIGRATE_ON_STARTUP.split(","))))
+    try:
+        reaper = [_reap(queue, stop)] if recover else []
+        await asyncio.gather(*(_drain(queue, stop) for _ in range(concurrency)), *reaper)
+    finally:
+        migrations.cancel()
+        await stop_senders()
+        await close_metadata_writers()
+        await close_redis()
+        await queue.close()
+        await dispose_engine()
+        close_client()
+        await close_stores()
+        shutdown_executors()
+
+def _run(concurrency: int, metrics_port: int | None, email_senders: int, recover: bool) -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(processName)s %(levelname)s %(message)s")
+    if metrics_port:
+        start_metrics_server(metrics_port)
+    asyncio.run(serve(concurrency, email_senders, recover))
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Run ingestion worker processes")
+    ap.add_argument("--processes", type=int, default=mp.cpu_count())
+    ap.add_argument("--concurrency", type=int, default=1, help="jobs per process")
+    ap.add_argument("--recover", action="store_true", help="periodically requeue jobs whose worker died (their lease expired)")
+    ap.add_argument("--email-senders", type=int, default=0, help="outbox sender tasks per process (set EMAIL_SENDERS=0 on the API)")
+    ap.add_argument("--metrics-port", type=int, default=None, help="process i serves /metrics on this port + i")
+    args = ap.parse_args()
+    procs = [mp.Process(target=_run, args=(args.concurrency, args.metrics_port and args.metrics_port + i, args.email_senders,
+                                           args.recover),
+                        name=f"ingest-worker-{i}") for i in range(args.processes)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Throughput of /api/chat/batch against the same queries sent one by one to /api/chat.
+
+Start the stack (docker compose up), ingest a document, and run:
+
+    python -m benchmarks.bench_chat_batch --url http://localhost:8000 --queries 512 --batch 8 32 64 --concurrency 8
+
+Both sides use the same number of in-flight HTTP requests; the batch side packs
+`--batch` queries into each one. Set ANSWER_CACHE_ENABLED=false on the server,
+otherwise repeated single queries are served from the cache and the comparison
+is meaningless (the batch endpoint never uses it).
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import time
+import httpx
+import numpy as np
+
+
+def make_queries(n: int, retrieval: str, top_k: int) -> list[dict]:
+    return [{"session_id": f"bench-{i % 64}", "query": f"What does section {i % 97} say about topic {i % 13}?",
+             "top_k": top_k, "retrieval": retrieval} for i in range(n)]
+
+
+async def drive(client: httpx.AsyncClient, path: str, bodies: list[dict], concurrency: int) -> list[float]:
+    lat: list[float] = []
+    todo = iter(bodies)
+
+    async def worker() -> None:
+        for body in todo:
+            t0 = time.perf_counter()
+            r = await client.post(path, json=body)
+            r.raise_for_status()
+            lat.append((time.perf_counter() - t0) * 1000)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return lat
+
+
+def report(label: str, queries: int, wall: float, lat: list[float]) -> None:
+    arr = np.array(lat)
+    print(f"{label:<14} qps={queries / wall:8.1f} requests={len(arr):<5} p50={np.percentile(arr, 50):7.1f}ms "
+          f"p95={np.percentile(arr, 95):7.1f}ms")
+
+
+async def run(args: argparse.Namespace) -> None:
+    queries = make_queries(args.queries, args.retrieval, args.top_k)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=120) as client:
+        await drive(client, "/api/chat", queries[:args.concurrency], args.concurrency)  # warm up
+        t0 = time.perf_counter()
+        lat = await drive(client, "/api/chat", queries, args.concurrency)
+        report("single", len(queries), time.perf_counter() - t0, lat)
+        for b in args.batch:
+            bodies = [{"queries": queries[s:s + b]} for s in range(0, len(queries), b)]
+            t0 = time.perf_counter()
+            lat = await drive(client, "/api/chat/batch", bodies, args.concurrency)
+            report(f"batch={b}", len(queries), time.perf_counter() - t0, lat)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--url", default="http://localhost:8000")
+    ap.add_argument("--queries", type=int, default=512)
+    ap.add_argument("--batch", type=int, nargs="+", default=[8, 32, 64], help="queries per batch request (<= CHAT_BATCH_MAX)")
+    ap.add_argument("--concurrency", type=int, default=8, help="in-flight HTTP requests")
+    ap.add_argument("--retrieval", choices=["dense", "lexical", "hybrid"], default="dense")
+    ap.add_argument("--top-k", type=int, default=4)
+    args = ap.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
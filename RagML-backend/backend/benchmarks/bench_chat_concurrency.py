@@ -0,0 +1,47 @@
+"""Load test for /api/chat: throughput and latency as concurrent sessions grow.
+
+Start the stack (docker compose up) and run:
+
+    python -m benchmarks.bench_chat_concurrency --url http://localhost:8000 --concurrency 1 8 32 128
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import time
+import httpx
+import numpy as np
+
+
+async def session(client: httpx.AsyncClient, sid: int, requests: int, lat: list[float]) -> None:
+    for i in range(requests):
+        body = {"session_id": f"bench-{sid}", "query": f"What does section {i % 17} say about topic {sid % 5}?", "top_k": 4}
+        t0 = time.perf_counter()
+        r = await client.post("/api/chat", json=body)
+        r.raise_for_status()
+        lat.append((time.perf_counter() - t0) * 1000)
+
+
+async def run(url: str, concurrency: int, requests: int) -> None:
+    lat: list[float] = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        t0 = time.perf_counter()
+        await asyncio.gather(*(session(client, s, requests, lat) for s in range(concurrency)))
+        wall = time.perf_counter() - t0
+    arr = np.array(lat)
+    print(f"sessions={concurrency:<4} qps={len(arr) / wall:8.1f} p50={np.percentile(arr, 50):7.1f}ms "
+          f"p95={np.percentile(arr, 95):7.1f}ms p99={np.percentile(arr, 99):7.1f}ms")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--url", default="http://localhost:8000")
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+    ap.add_argument("--requests", type=int, default=20, help="requests per session")
+    args = ap.parse_args()
+    for c in args.concurrency:
+        asyncio.run(run(args.url, c, args.requests))
+
+
+if __name__ == "__main__":
+    main()
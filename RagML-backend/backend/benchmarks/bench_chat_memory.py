@@ -0,0 +1,97 @@
+"""Round trips and stored bytes per chat session: legacy JSON lists vs the bounded binary memory.
+
+    python -m benchmarks.bench_chat_memory --url redis://localhost:6379/15 --sessions 200 --turns 100
+    python -m benchmarks.bench_chat_memory --fake   # in-process fakeredis, no server needed
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import time
+from redis import asyncio as aioredis
+from redis.asyncio.client import Pipeline
+from app.services import memory
+
+ROUND_TRIPS = 0
+
+
+def _counted(fn):
+    async def wrapper(*args, **kwargs):
+        global ROUND_TRIPS
+        ROUND_TRIPS += 1
+        return await fn(*args, **kwargs)
+    return wrapper
+
+# a plain command is one round trip, a whole pipeline (queued commands skip Redis.execute_command) is one
+aioredis.Redis.execute_command = _counted(aioredis.Redis.execute_command)
+Pipeline.execute = _counted(Pipeline.execute)
+
+
+def answer(turn: int, size: int) -> str:
+    return (f"Turn {turn}: based on the docs, the policy allows refunds within 30 days. " * (size // 70 + 1))[:size]
+
+
+async def legacy_turn(r: aioredis.Redis, sid: str, q: str, a: str) -> None:
+    vals = await r.lrange(f"chat:{sid}", -12, -1)
+    [json.loads(v) for v in vals]
+    await r.rpush(f"chat:{sid}", json.dumps({"role": "user", "content": q}))
+    await r.rpush(f"chat:{sid}", json.dumps({"role": "assistant", "content": a}))
+
+
+async def bounded_turn(r: aioredis.Redis, sid: str, q: str, a: str) -> None:
+    await memory.get_history(sid, limit=12)
+    await memory.append_messages(sid, [("user", q), ("assistant", a)])
+
+
+async def stored_bytes(r: aioredis.Redis, sessions: int) -> tuple[int, int | None]:
+    payload, usage = 0, 0
+    for s in range(sessions):
+        payload += sum(len(v) for v in await r.lrange(f"chat:bench-{s}", 0, -1))
+        try:
+            usage += await r.memory_usage(f"chat:bench-{s}") or 0
+        except Exception:
+            usage = None
+    return payload, usage
+
+
+async def run(r: aioredis.Redis, name: str, turn_fn, args) -> None:
+    global ROUND_TRIPS
+    await r.flushdb()
+    ROUND_TRIPS = 0
+    t0 = time.perf_counter()
+    for t in range(args.turns):
+        await asyncio.gather(*(turn_fn(r, f"bench-{s}", f"What about refunds, take {t}?", answer(t, args.answer_bytes))
+                               for s in range(args.sessions)))
+    wall = time.perf_counter() - t0
+    trips = ROUND_TRIPS / (args.sessions * args.turns)
+    payload, usage = await stored_bytes(r, args.sessions)
+    mem = f" memory_usage={usage / args.sessions / 1024:.1f}KiB/session" if usage else ""
+    print(f"{name:<8} round_trips/turn={trips:.1f} wall={wall:.2f}s "
+          f"payload={payload / args.sessions / 1024:.1f}KiB/session{mem}")
+
+
+async def amain(args) -> None:
+    if args.fake:
+        import fakeredis
+        r = fakeredis.FakeAsyncRedis()
+    else:
+        r = aioredis.from_url(args.url)
+    memory._r = r
+    await run(r, "legacy", legacy_turn, args)
+    await run(r, "bounded", bounded_turn, args)
+    await r.flushdb()
+    await r.aclose()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--url", default="redis://localhost:6379/15")
+    ap.add_argument("--fake", action="store_true")
+    ap.add_argument("--sessions", type=int, default=200)
+    ap.add_argument("--turns", type=int, default=100)
+    ap.add_argument("--answer-bytes", type=int, default=1200)
+    asyncio.run(amain(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Per-query overhead of connect-per-call vs the pooled QdrantStore client.
+
+Both modes run the real `QdrantStore` (AsyncQdrantClient, `PooledStore._call`)
+against a local stub speaking enough of the Qdrant REST API: collection info,
+and canned hits for /points/query. "before" mirrors the old code path, where
+each request built a client, looked the collection up, queried and closed;
+"after" reuses one connected store, as the app does. `--fault-every N` has the
+stub drop the connection on every Nth query, which goes through the
+transport-error reconnect in `PooledStore._call`.
+
+The stub listens on 127.0.0.2: qdrant-client turns keep-alive off for
+"localhost"/"127.0.0.1" URLs, which would hide what pooling saves against a
+remote server.
+
+    python -m benchmarks.bench_client_pooling --queries 2000 --concurrency 1 16
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from importlib.metadata import version
+import numpy as np
+
+DIM = 384
+_INFO = json.dumps({"result": {
+    "status": "green", "optimizer_status": "ok", "points_count": 0, "segments_count": 1,
+    "config": {"params": {"vectors": {"size": DIM, "distance": "Cosine"}},
+               "hnsw_config": {"m": 16, "ef_construct": 100, "full_scan_threshold": 10000},
+               "optimizer_config": {"deleted_threshold": 0.2, "vacuum_min_vector_number": 1000,
+                                    "default_segment_number": 0, "flush_interval_sec": 5},
+               "wal_config": {"wal_capacity_mb": 32, "wal_segments_ahead": 0}},
+    "payload_schema": {"tenant_id": {"data_type": "keyword", "points": 0}, "doc_id": {"data_type": "keyword", "points": 0}},
+}, "status": "ok", "time": 0.0}).encode()
+_HITS = json.dumps({"result": {"points": [
+    {"id": str(uuid.UUID(int=i + 1)), "version": 0, "score": 0.9, "payload": {"text": "x" * 200}} for i in range(4)
+]}, "status": "ok", "time": 0.0}).encode()
+_ROOT = json.dumps({"title": "qdrant - vector search engine", "version": version("qdrant-client")}).encode()
+
+
+class StubQdrant(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    connections = 0
+    queries = 0
+    fail_every = 0
+    _count = threading.Lock()
+
+    def setup(self) -> None:
+        super().setup()
+        type(self).connections += 1
+
+    def _reply(self, body: bytes) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        self._reply(_ROOT if self.path.split("?")[0] == "/" else _INFO)
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with self._count:
+            type(self).queries += 1
+            drop = self.fail_every and self.queries % self.fail_every == 0
+        if drop:
+            self.close_connection = True  # no response: the client sees a transport error
+            return
+        self._reply(_HITS)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+def report(label: str, lat: list[float], wall: float, conns: int) -> None:
+    arr = np.array(lat)
+    print(f"{label:<28} p50={np.percentile(arr, 50):7.3f}ms p99={np.percentile(arr, 99):7.3f}ms "
+          f"qps={len(arr) / wall:8.0f} connections={conns}")
+
+
+async def run(args, concurrency: int) -> None:
+    from app.services.vector_store import QdrantStore
+    vec = np.random.default_rng(0).standard_normal(DIM).astype(np.float32)
+    sem = asyncio.Semaphore(concurrency)
+
+    async def before() -> None:
+        store = QdrantStore()
+        try:
+            await store.search(vec, top_k=4)
+        finally:
+            await store.close()
+
+    pooled = QdrantStore()
+    await pooled.connect()
+
+    async def after() -> None:
+        await pooled.search(vec, top_k=4)
+
+    for label, fn in ((f"before (client per call) x{concurrency}", before), (f"after  (pooled store)   x{concurrency}", after)):
+        lat: list[float] = []
+
+        async def one() -> None:
+            async with sem:
+                t0 = time.perf_counter()
+                await fn()
+                lat.append((time.perf_counter() - t0) * 1000)
+
+        StubQdrant.connections = StubQdrant.queries = 0
+        StubQdrant.fail_every = args.fault_every if fn is after else 0
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(args.queries)))
+        report(label, lat, time.perf_counter() - t0, StubQdrant.connections)
+    await pooled.close()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--queries", type=int, default=2000)
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[1, 16])
+    ap.add_argument("--fault-every", type=int, default=0, help="drop the pooled connection every N queries")
+    args = ap.parse_args()
+    logging.getLogger("app.services.vector_store").setLevel(logging.ERROR)  # one reconnect warning per fault
+
+    server = ThreadingHTTPServer(("127.0.0.2", 0), StubQdrant)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    # the collection size comes from the embedder; the OpenAI width needs no model download
+    os.environ.update(QDRANT_URL=f"http://{host}:{port}", EMBEDDING_PROVIDER="openai", EMBEDDING_DIM=str(DIM),
+                      VECTOR_QUANTIZATION="none")
+    try:
+        for c in args.concurrency:
+            asyncio.run(run(args, c))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
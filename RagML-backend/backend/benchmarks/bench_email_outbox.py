@@ -0,0 +1,114 @@
+"""A burst of booking confirmations: inline SMTP per booking vs the Redis outbox.
+
+Runs against a local aiosmtpd stand-in (pip install aiosmtpd). `--handshake-ms`
+delays EHLO to stand in for the TLS + AUTH round trips of a real provider, and
+`--data-ms` delays each message. Inline mode opens a session per booking, as
+/api/book did before the outbox; outbox mode times the enqueue a booking waits
+for, then how long the sender tasks take to deliver the burst.
+
+    python -m benchmarks.bench_email_outbox --fake --bookings 500 --handshake-ms 150 --senders 1 4
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import time
+import numpy as np
+
+
+class Handler:
+    def __init__(self, handshake_s: float, data_s: float):
+        self.handshake_s, self.data_s = handshake_s, data_s
+        self.received = 0
+        self.sessions = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.sessions += 1
+        await asyncio.sleep(self.handshake_s)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        await asyncio.sleep(self.data_s)
+        self.received += 1
+        return "250 OK"
+
+
+def report(label: str, lat: list[float], wall: float, n: int, sessions: int) -> None:
+    arr = np.array(lat)
+    print(f"{label:<12} booking_p50={np.percentile(arr, 50):8.2f}ms p95={np.percentile(arr, 95):8.2f}ms "
+          f"delivered/s={n / wall:8.1f} smtp_sessions={sessions}")
+
+
+async def inline(args, handler: Handler) -> None:
+    from app.core.concurrency import run_io
+    from app.core.email import send_email
+    sem = asyncio.Semaphore(args.concurrency)
+    lat: list[float] = []
+
+    async def book(i: int) -> None:
+        async with sem:
+            t0 = time.perf_counter()
+            await run_io(send_email, [f"user{i}@example.com"], "Interview Booking Confirmed", "<p>hi</p>")
+            lat.append((time.perf_counter() - t0) * 1000)
+
+    handler.received = handler.sessions = 0
+    t0 = time.perf_counter()
+    await asyncio.gather(*(book(i) for i in range(args.bookings)))
+    report("inline", lat, time.perf_counter() - t0, handler.received, handler.sessions)
+
+
+async def outbox(args, handler: Handler, senders: int) -> None:
+    from app.services import outbox as ob
+    handler.received = handler.sessions = 0
+    lat: list[float] = []
+    t0 = time.perf_counter()
+    for i in range(args.bookings):
+        t1 = time.perf_counter()
+        await ob.enqueue([f"user{i}@example.com"], "Interview Booking Confirmed", "<p>hi</p>")
+        lat.append((time.perf_counter() - t1) * 1000)
+    ob.start_senders(senders)
+    while handler.received < args.bookings:
+        await asyncio.sleep(0.01)
+    wall = time.perf_counter() - t0
+    await ob.stop_senders()
+    report(f"outbox x{senders}", lat, wall, handler.received, handler.sessions)
+
+
+async def amain(args) -> None:
+    from aiosmtpd.controller import Controller
+    from app.services import memory
+    handler = Handler(args.handshake_ms / 1000, args.data_ms / 1000)
+    controller = Controller(handler, hostname="127.0.0.1", port=args.port)
+    controller.start()
+    try:
+        if args.fake:
+            import fakeredis
+            memory._r = fakeredis.FakeAsyncRedis()
+        await inline(args, handler)
+        for s in args.senders:
+            await outbox(args, handler, s)
+    finally:
+        controller.stop()
+        await memory.close_redis()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--fake", action="store_true", help="in-process fakeredis instead of REDIS_URL")
+    ap.add_argument("--bookings", type=int, default=500)
+    ap.add_argument("--concurrency", type=int, default=32, help="inline mode: bookings in flight")
+    ap.add_argument("--senders", type=int, nargs="+", default=[1, 4])
+    ap.add_argument("--batch", type=int, default=20)
+    ap.add_argument("--handshake-ms", type=float, default=150.0)
+    ap.add_argument("--data-ms", type=float, default=2.0)
+    ap.add_argument("--port", type=int, default=8025)
+    args = ap.parse_args()
+    os.environ.update(SMTP_HOST="127.0.0.1", SMTP_PORT=str(args.port), SMTP_STARTTLS="false",
+                      EMAIL_BATCH_SIZE=str(args.batch), EMAIL_POLL_S="0.05")
+    os.environ.pop("SENDGRID_API_KEY", None)
+    asyncio.run(amain(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""QPS and tail latency of single-query encodes with and without micro-batching.
+
+Uses the configured sentence-transformers model by default; `--synthetic`
+swaps in a CPU-bound stand-in with a fixed per-call cost so the benchmark
+runs without model weights.
+
+    python -m benchmarks.bench_embedding_batcher --clients 1 8 64
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import time
+import numpy as np
+from app.core.concurrency import run_cpu
+from app.services.embedding import EmbeddingBatcher
+
+
+def synthetic_encoder(call_ms: float, item_ms: float):
+    w = np.random.default_rng(0).standard_normal((384, 384)).astype(np.float32)
+
+    def encode(texts: list[str]) -> np.ndarray:
+        end = time.perf_counter() + (call_ms + item_ms * len(texts)) / 1000
+        while time.perf_counter() < end:
+            pass
+        return np.ones((len(texts), 384), dtype=np.float32) @ w
+    return encode
+
+
+async def drive(encode, clients: int, per_client: int) -> tuple[float, np.ndarray]:
+    lat: list[float] = []
+
+    async def client(cid: int) -> None:
+        for i in range(per_client):
+            t0 = time.perf_counter()
+            await encode([f"client {cid} question {i} about the handbook"])
+            lat.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client(c) for c in range(clients)))
+    return len(lat) / (time.perf_counter() - t0), np.array(lat)
+
+
+async def bench(fn, clients: int, per_client: int, max_batch: int, max_wait_ms: float) -> None:
+    async def unbatched(texts):
+        return await run_cpu(fn, texts)
+    batcher = EmbeddingBatcher(unbatched, max_batch=max_batch, max_wait_ms=max_wait_ms)
+    for label, encode in (("unbatched", unbatched), ("batched", batcher.encode)):
+        qps, lat = await drive(encode, clients, per_client)
+        extra = f" fill={batcher.stats.fill_ratio:.2f}" if label == "batched" else ""
+        print(f"clients={clients:<3} {label:<9} qps={qps:8.1f} p50={np.percentile(lat, 50):7.2f}ms "
+              f"p99={np.percentile(lat, 99):7.2f}ms{extra}")
+    await batcher.close()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--clients", type=int, nargs="+", default=[1, 8, 64])
+    ap.add_argument("--requests", type=int, default=50, help="requests per client")
+    ap.add_argument("--max-batch", type=int, default=64)
+    ap.add_argument("--max-wait-ms", type=float, default=5.0)
+    ap.add_argument("--synthetic", action="store_true")
+    args = ap.parse_args()
+    if args.synthetic:
+        fn = synthetic_encoder(call_ms=4.0, item_ms=0.2)
+    else:
+        from app.services.embedding import encode_texts as fn
+    for c in args.clients:
+        asyncio.run(bench(fn, c, args.requests, args.max_batch, args.max_wait_ms))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Cold-start import cost of the API, as a CI gate.
+
+Imports `app.main` in fresh interpreters and reports the median wall time plus
+the slowest modules from `-X importtime`. Exits non-zero when the budget is
+exceeded or a heavy, backend-specific dependency is imported eagerly.
+
+    python -m benchmarks.bench_import_time --runs 5 --budget-ms 1500
+"""
+from __future__ import annotations
+import argparse
+import json
+import subprocess
+import sys
+import numpy as np
+
+# only ever imported once the backend / provider that needs them is used
+HEAVY = ("torch", "sentence_transformers", "onnxruntime", "tokenizers", "openai", "qdrant_client",
+         "pinecone", "weaviate", "pymilvus", "pypdf", "motor", "sqlalchemy", "pandas", "sklearn")
+
+PROBE = ("import sys, time, json; t = time.perf_counter(); import {module}; "
+         "print(json.dumps([time.perf_counter() - t, sorted(sys.modules)]))")
+
+
+def run_once(module: str) -> tuple[float, list[str]]:
+    out = subprocess.run([sys.executable, "-c", PROBE.format(module=module)],
+                         check=True, capture_output=True, text=True).stdout
+    seconds, modules = json.loads(out.strip().splitlines()[-1])
+    return seconds * 1000, modules
+
+
+def slowest(module: str, top: int) -> list[tuple[int, str]]:
+    err = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                         check=True, capture_output=True, text=True).stderr
+    rows = []
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), name.rstrip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--module", default="app.main")
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--top", type=int, default=10)
+    ap.add_argument("--budget-ms", type=float, default=None)
+    args = ap.parse_args()
+
+    times, modules = [], []
+    for _ in range(args.runs):
+        ms, modules = run_once(args.module)
+        times.append(ms)
+    med = float(np.median(times))
+    print(f"import {args.module}: median={med:.0f}ms min={min(times):.0f}ms max={max(times):.0f}ms "
+          f"modules={len(modules)}")
+    for us, name in slowest(args.module, args.top):
+        print(f"  {us / 1000:8.1f}ms {name}")
+
+    failures = []
+    eager = sorted({m.split(".")[0] for m in modules} & set(HEAVY))
+    if eager:
+        failures.append(f"heavy modules imported eagerly: {', '.join(eager)}")
+    if args.budget_ms is not None and med > args.budget_ms:
+        failures.append(f"median {med:.0f}ms exceeds budget {args.budget_ms:.0f}ms")
+    for f in failures:
+        print(f"FAIL: {f}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
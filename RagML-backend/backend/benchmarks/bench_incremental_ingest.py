@@ -0,0 +1,74 @@
+"""Re-ingesting an edited document: full pass vs content-hash diff.
+
+Ingests a synthetic N-page document into the embedded `local` backend, edits
+it, and re-ingests with the first run's chunk ids as `known_ids`, the way an
+ingest job does with the document manifest. `replace` edits keep the word
+count; `insert` edits add a sentence, which moves the boundary of every later
+chunk that was cut by length rather than by content, so far less is reused.
+
+    python -m benchmarks.bench_incremental_ingest --pages 500 --edits 5 --synthetic
+    python -m benchmarks.bench_incremental_ingest --strategy semantic_split --edit insert --synthetic
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import numpy as np
+from benchmarks.bench_streaming_ingest import hashing_encoder, synthetic_pages
+
+
+def edited(pages: list[str], edits: int, kind: str, seed: int = 1) -> list[str]:
+    rng = np.random.default_rng(seed)
+    out = list(pages)
+    for p in rng.choice(len(out), size=edits, replace=False):
+        words = out[p].split(" ")
+        at = int(rng.integers(0, len(words)))
+        if kind == "replace":
+            words[at] = f"edited{p}"
+        else:
+            words.insert(at, f"Edited paragraph number {p} added here.")
+        out[p] = " ".join(words)
+    return out
+
+
+async def run(args: argparse.Namespace) -> None:
+    from app.services.ingest_pipeline import run_ingest
+    from app.services.vector_store import close_stores, delete_vectors
+    pages = list(synthetic_pages(args.pages))
+    t0 = time.perf_counter()
+    first = await run_ingest(pages, args.strategy, "local", metadata={"filename": "bench"}, doc_id="bench")
+    full = time.perf_counter() - t0
+    print(f"full         chunks={first.chunks} embedded={first.embedded} wall={full:.2f}s")
+    known = set(first.chunk_ids)
+    t0 = time.perf_counter()
+    second = await run_ingest(edited(pages, args.edits, args.edit), args.strategy, "local",
+                              metadata={"filename": "bench"}, doc_id="bench", known_ids=known)
+    removed = list(known.difference(second.chunk_ids))
+    await delete_vectors(removed, backend="local")
+    incr = time.perf_counter() - t0
+    print(f"incremental  chunks={second.chunks} embedded={second.embedded} skipped={second.skipped} "
+          f"deleted={len(removed)} wall={incr:.2f}s ({100 * incr / full:.1f}% of full)")
+    await close_stores()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", type=int, default=500)
+    ap.add_argument("--strategy", default="sliding_window")
+    ap.add_argument("--edits", type=int, default=5, help="pages edited between the two runs")
+    ap.add_argument("--edit", choices=["replace", "insert"], default="replace")
+    ap.add_argument("--synthetic", action="store_true")
+    args = ap.parse_args()
+    os.environ.setdefault("LOCAL_INDEX_PATH", tempfile.mkdtemp())
+    os.environ.setdefault("LEXICAL_INDEX_PATH", tempfile.mkdtemp())
+    os.environ.setdefault("EMBED_CACHE_ENABLED", "false")  # a warm cache would hide the re-embedding cost
+    from app.services import embedding
+    if args.synthetic:
+        embedding._encode_uncached = hashing_encoder
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
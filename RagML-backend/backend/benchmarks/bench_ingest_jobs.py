@@ -0,0 +1,51 @@
+"""Ingestion job throughput against a running stack.
+
+Submits --jobs documents to POST /api/ingest and polls until every job
+finishes. Re-run with the worker service scaled (e.g. `python -m app.worker
+--processes 1|2|4`) to see throughput follow the number of processes.
+
+    python -m benchmarks.bench_ingest_jobs --url http://localhost:8000 --jobs 32 --pages 50
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import time
+import httpx
+from benchmarks.bench_streaming_ingest import synthetic_pages
+
+
+async def main_async(args) -> None:
+    doc = "\n".join(synthetic_pages(args.pages)).encode()
+    async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+        t0 = time.perf_counter()
+        ids = []
+        for i in range(args.jobs):
+            r = await client.post("/api/ingest", files={"file": (f"bench-{i}.txt", doc, "text/plain")},
+                                  data={"strategy": args.strategy, "vector_backend": args.backend, "db_backend": "postgres"})
+            r.raise_for_status()
+            ids.append(r.json()["job_id"])
+        pending, chunks, failed = set(ids), 0, 0
+        while pending:
+            await asyncio.sleep(0.5)
+            for job_id in list(pending):
+                st = (await client.get(f"/api/ingest/{job_id}")).json()
+                if st["status"] in ("succeeded", "failed"):
+                    pending.discard(job_id)
+                    chunks += st["chunks"]
+                    failed += st["status"] == "failed"
+        wall = time.perf_counter() - t0
+    print(f"jobs={args.jobs} failed={failed} wall={wall:.1f}s jobs/s={args.jobs / wall:.2f} chunks/s={chunks / wall:,.0f}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--url", default="http://localhost:8000")
+    ap.add_argument("--jobs", type=int, default=32)
+    ap.add_argument("--pages", type=int, default=50)
+    ap.add_argument("--strategy", default="sliding_window")
+    ap.add_argument("--backend", default="qdrant")
+    asyncio.run(main_async(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
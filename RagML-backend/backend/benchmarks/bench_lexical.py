@@ -0,0 +1,59 @@
+"""Build time, on-disk size and query latency of the in-process BM25 index.
+
+    python -m benchmarks.bench_lexical --chunks 1000000 --batch 512 --queries 500
+"""
+from __future__ import annotations
+import argparse
+import tempfile
+import time
+import numpy as np
+from app.services.lexical import LexicalIndex
+
+
+def synthetic_texts(n: int, vocab: int, words: int, seed: int = 0):
+    # Zipf-distributed vocabulary, like real prose: a few very common terms, a long tail
+    rng = np.random.default_rng(seed)
+    for start in range(0, n, 10_000):
+        ranks = np.minimum(rng.zipf(1.1, size=(min(10_000, n - start), words)), vocab) - 1
+        for row in ranks:
+            yield " ".join(f"w{r}" for r in row)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chunks", type=int, default=1_000_000)
+    ap.add_argument("--words", type=int, default=120)
+    ap.add_argument("--vocab", type=int, default=200_000)
+    ap.add_argument("--batch", type=int, default=512)
+    ap.add_argument("--merge-factor", type=int, default=8)
+    ap.add_argument("--queries", type=int, default=500)
+    ap.add_argument("--k", type=int, default=10)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        idx = LexicalIndex(tmp, merge_factor=args.merge_factor)
+        texts = synthetic_texts(args.chunks, args.vocab, args.words)
+        t0 = time.perf_counter()
+        for s in range(0, args.chunks, args.batch):
+            ids = [str(i) for i in range(s, min(s + args.batch, args.chunks))]
+            idx.add(ids, [next(texts) for _ in ids], [{} for _ in ids])
+        t_build = time.perf_counter() - t0
+        print(f"chunks={args.chunks} build={t_build:.1f}s ({args.chunks / t_build:.0f} chunks/s) "
+              f"segments={len(idx._segments)} size={idx.size_bytes() / 2**20:.1f}MiB")
+
+        rng = np.random.default_rng(1)
+        for n_terms in (1, 3, 6):
+            lat = []
+            for _ in range(args.queries):
+                # mix of mid-frequency and rare terms, skipping the stop-word head
+                q = " ".join(f"w{r}" for r in rng.integers(50, args.vocab // 10, size=n_terms))
+                t0 = time.perf_counter()
+                idx.search(q, top_k=args.k)
+                lat.append((time.perf_counter() - t0) * 1000)
+            lat = np.array(lat)
+            print(f"terms={n_terms} p50={np.percentile(lat, 50):.2f}ms p99={np.percentile(lat, 99):.2f}ms")
+        idx.close()
+
+
+if __name__ == "__main__":
+    main()
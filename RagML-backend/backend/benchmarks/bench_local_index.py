@@ -0,0 +1,59 @@
+"""Recall and latency of the embedded `local` vector backend against exact search.
+
+    python -m benchmarks.bench_local_index --n 200000 --dim 384 --queries 500
+"""
+from __future__ import annotations
+import argparse
+import tempfile
+import time
+import numpy as np
+from app.services.local_index import LocalIndex, _normalize
+
+
+def synthetic(n: int, dim: int, clusters: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=n)
+    return _normalize(centers[labels] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=200_000)
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--queries", type=int, default=500)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--dtype", default="float32")
+    ap.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32])
+    args = ap.parse_args()
+
+    data = synthetic(args.n, args.dim, clusters=256)
+    queries = synthetic(args.queries, args.dim, clusters=256, seed=1)
+    exact = np.argsort(-(queries @ data.T), axis=1)[:, :args.k]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        idx = LocalIndex(tmp, dtype=args.dtype, train_size=args.n + 1)
+        t0 = time.perf_counter()
+        for s in range(0, args.n, 10_000):
+            ids = [str(i) for i in range(s, min(s + 10_000, args.n))]
+            idx.upsert(ids, data[s:s + 10_000], [{} for _ in ids])
+        t_insert = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        idx.train()
+        t_train = time.perf_counter() - t0
+        print(f"n={args.n} dim={args.dim} dtype={args.dtype} nlist={idx.nlist} "
+              f"insert={t_insert:.1f}s train={t_train:.1f}s")
+        for nprobe in args.nprobe:
+            lat, hits = [], 0
+            for qi, q in enumerate(queries):
+                t0 = time.perf_counter()
+                res = idx.search(q, top_k=args.k, nprobe=nprobe)
+                lat.append((time.perf_counter() - t0) * 1000)
+                hits += len({int(r[0]) for r in res} & set(exact[qi].tolist()))
+            lat = np.array(lat)
+            print(f"nprobe={nprobe:<3} recall@{args.k}={hits / (args.k * len(queries)):.3f} "
+                  f"p50={np.percentile(lat, 50):.3f}ms p99={np.percentile(lat, 99):.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
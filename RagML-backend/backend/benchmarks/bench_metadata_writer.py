@@ -0,0 +1,105 @@
+"""Ingestion metadata inserts/s: DDL + one-row transaction per record vs the buffered bulk writer.
+
+SQL runs against POSTGRES_DSN, or a throwaway SQLite file with --sqlite (needs
+aiosqlite). Mongo runs against --mongo-url, or in memory with --mongomock
+(needs mongomock-motor).
+
+    python -m benchmarks.bench_metadata_writer --sqlite --records 5000 --flush-rows 50 200 1000
+    python -m benchmarks.bench_metadata_writer --mongomock --records 5000
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+
+def record(i: int):
+    from app.services.metadata_writer import IngestRecord
+    return IngestRecord(f"doc-{i}.pdf", f"doc-{i}.pdf", "sliding_window", "qdrant", 12, 240,
+                        {"queued_s": 0.01, "ingest_s": 1.5, "total_s": 1.6})
+
+
+async def legacy_sql(n: int, concurrency: int) -> float:
+    # what every ingest did before: CREATE TABLE IF NOT EXISTS + INSERT, own transaction
+    from sqlalchemy import text
+    from app.db import sql
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        r = record(i)
+        async with sem, sql._get_engine().begin() as conn:
+            await conn.execute(text(sql._MIGRATIONS[0].format(serial="INTEGER" if conn.dialect.name == "sqlite" else "SERIAL")))
+            await conn.execute(text("INSERT INTO ingestions(filename, strategy, vector_backend) VALUES (:f,:s,:b)"),
+                               {"f": r.filename, "s": r.strategy, "b": r.vector_backend})
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n)))
+    return time.perf_counter() - t0
+
+
+async def legacy_mongo(n: int, concurrency: int) -> float:
+    from app.db import nosql
+    db = nosql._mongo()[nosql.settings.MONGODB_DB]
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        r = record(i)
+        async with sem:
+            await db.ingestions.insert_one({"filename": r.filename, "strategy": r.strategy, "vector_backend": r.vector_backend})
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n)))
+    return time.perf_counter() - t0
+
+
+async def buffered(backend: str, n: int, concurrency: int, flush_rows: int) -> float:
+    from app.services.metadata_writer import MetadataWriter, _FLUSH
+    writer = MetadataWriter(backend, _FLUSH[backend], max_rows=flush_rows, max_delay_s=1.0)
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        async with sem:
+            await writer.add(record(i))
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n)))
+    await writer.close()
+    wall = time.perf_counter() - t0
+    assert writer.stats.rows == n and not writer.stats.errors, writer.stats
+    return wall
+
+
+async def run(args) -> None:
+    backend = "mongodb" if (args.mongomock or args.mongo_url) else "postgres"
+    if args.mongomock:
+        from mongomock_motor import AsyncMongoMockClient
+        from app.db import nosql
+        nosql._client = AsyncMongoMockClient()
+    legacy = legacy_mongo if backend == "mongodb" else legacy_sql
+    wall = await legacy(args.records, args.concurrency)
+    print(f"{backend:<8} per-record        inserts/s={args.records / wall:10,.0f} wall={wall:.2f}s")
+    for rows in args.flush_rows:
+        wall = await buffered(backend, args.records, args.concurrency, rows)
+        print(f"{backend:<8} buffered rows={rows:<5} inserts/s={args.records / wall:10,.0f} wall={wall:.2f}s")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--records", type=int, default=5000)
+    ap.add_argument("--concurrency", type=int, default=16, help="jobs finishing at once")
+    ap.add_argument("--flush-rows", type=int, nargs="+", default=[50, 200, 1000])
+    ap.add_argument("--sqlite", action="store_true")
+    ap.add_argument("--mongomock", action="store_true")
+    ap.add_argument("--mongo-url", default=None)
+    args = ap.parse_args()
+    if args.sqlite:
+        os.environ["POSTGRES_DSN"] = "sqlite+aiosqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    if args.mongo_url:
+        os.environ["MONGODB_URI"] = args.mongo_url
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
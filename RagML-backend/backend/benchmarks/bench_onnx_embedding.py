@@ -0,0 +1,75 @@
+"""Throughput and accuracy of the ONNX embedding runtime (fp32 / int8) against PyTorch.
+
+Accuracy is the cosine between each text's ONNX and PyTorch embedding, plus
+the overlap of nearest-neighbour lists computed from each.
+
+    python -m benchmarks.bench_onnx_embedding --texts 2000 --threads 4
+"""
+from __future__ import annotations
+import argparse
+import tempfile
+import time
+import numpy as np
+from app.core.config import get_settings
+from app.services.onnx_embedder import _cosines, load_onnx_embedder
+
+WORDS = ("invoice refund password account policy shipping order payment customer support "
+         "delivery warranty subscription billing address contract renewal discount tax "
+         "the a of to and in for is on with within days after before request").split()
+
+
+def corpus(n: int, seed: int = 0) -> list[str]:
+    rng = np.random.default_rng(seed)
+    return [" ".join(rng.choice(WORDS, size=int(rng.integers(8, 120)))) + "." for _ in range(n)]
+
+
+def throughput(encode, texts: list[str], batch: int) -> tuple[np.ndarray, float]:
+    encode(texts[:batch])  # warm-up
+    t0 = time.perf_counter()
+    out = np.concatenate([encode(texts[s:s + batch]) for s in range(0, len(texts), batch)])
+    return out, len(texts) / (time.perf_counter() - t0)
+
+
+def knn_overlap(a: np.ndarray, b: np.ndarray, k: int, queries: int = 200) -> float:
+    qa, qb = a[:queries], b[:queries]
+    na = np.argsort(-(qa @ a.T), axis=1)[:, 1:k + 1]
+    nb = np.argsort(-(qb @ b.T), axis=1)[:, 1:k + 1]
+    return float(np.mean([len(set(x) & set(y)) / k for x, y in zip(na, nb)]))
+
+
+def main() -> None:
+    settings = get_settings()
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--model", default=settings.ST_MODEL_NAME)
+    ap.add_argument("--texts", type=int, default=2000)
+    ap.add_argument("--batch", type=int, default=32)
+    ap.add_argument("--threads", type=int, default=0)
+    ap.add_argument("--cache-dir", default=None, help="reuse exported artifacts (default: fresh temp dir)")
+    ap.add_argument("--k", type=int, default=10)
+    args = ap.parse_args()
+
+    import torch
+    from sentence_transformers import SentenceTransformer
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    texts = corpus(args.texts)
+    st = SentenceTransformer(args.model, device="cpu")
+    ref, rate = throughput(lambda t: st.encode(t, normalize_embeddings=True, batch_size=args.batch), texts, args.batch)
+    print(f"pytorch    {rate:8.1f} texts/s")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for quantize in (False, True):
+            t0 = time.perf_counter()
+            emb = load_onnx_embedder(args.model, args.cache_dir or tmp, quantize=quantize,
+                                     threads=args.threads, batch_size=args.batch, min_cosine=0.0)
+            t_load = time.perf_counter() - t0
+            out, rate = throughput(lambda t: emb.encode(t, normalize_embeddings=True), texts, args.batch)
+            cos = _cosines(out, ref)
+            print(f"onnx-{'int8' if quantize else 'fp32'}  {rate:8.1f} texts/s  load/export={t_load:.1f}s "
+                  f"cosine mean={cos.mean():.5f} min={cos.min():.5f} "
+                  f"knn@{args.k} overlap={knn_overlap(out, ref, args.k):.3f}")
+
+
+if __name__ == "__main__":
+    main()
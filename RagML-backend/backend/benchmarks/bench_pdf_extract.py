@@ -0,0 +1,85 @@
+"""PDF extraction throughput with 1/2/4/8 pool processes on a generated multi-hundred-page PDF.
+
+Also reports time to the first page, which is what lets chunking start early.
+
+    python -m benchmarks.bench_pdf_extract --pages 400 --workers 1 2 4 8
+"""
+from __future__ import annotations
+import argparse
+import multiprocessing as mp
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+from app.services.pdf_extract import extract_pages
+
+WORDS = ("invoice refund policy customer shipping order payment support delivery warranty "
+         "subscription billing address contract renewal discount account manager region").split()
+
+
+def write_pdf(path: Path, pages: int, lines: int = 50, seed: int = 0) -> None:
+    """Minimal text-only PDF: one Helvetica content stream per page, hand-written xref."""
+    rng = np.random.default_rng(seed)
+    objs: list[bytes] = [b"<< /Type /Catalog /Pages 2 0 R >>", b"", b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for _ in range(pages):
+        text = "".join(f"({' '.join(rng.choice(WORDS, size=12))}) Tj T* " for _ in range(lines))
+        stream = f"BT /F1 10 Tf 12 TL 40 800 Td {text}ET".encode()
+        objs.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        objs.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents %d 0 R "
+                    b"/Resources << /Font << /F1 3 0 R >> >> >>" % len(objs))
+        kids.append(len(objs))
+    objs[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % k for k in kids), pages)
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objs, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1)
+    out += b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objs) + 1, xref)
+    path.write_bytes(bytes(out))
+
+
+def run(path: Path, workers: int, pages_per_task: int) -> tuple[float, float, int, int]:
+    pool = ProcessPoolExecutor(workers, mp_context=mp.get_context("spawn")) if workers > 1 else None
+    try:
+        if pool is not None:
+            list(pool.map(abs, range(workers)))  # start the processes outside the timing
+        t0 = time.perf_counter()
+        first = None
+        n = chars = 0
+        with open(path, "rb") as fp:
+            for page in extract_pages(fp, str(path), pool, pages_per_task, min_pages=1, workers=workers):
+                if first is None:
+                    first = time.perf_counter() - t0
+                n += 1
+                chars += len(page)
+        return time.perf_counter() - t0, first or 0.0, n, chars
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", type=int, default=400)
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    ap.add_argument("--pages-per-task", type=int, default=16)
+    args = ap.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.pdf"
+        write_pdf(path, args.pages)
+        print(f"pages={args.pages} size={path.stat().st_size / 2**20:.1f}MiB cpus={mp.cpu_count()}")
+        base = None
+        for w in args.workers:
+            wall, first, n, chars = run(path, w, args.pages_per_task)
+            base = base or wall
+            print(f"workers={w:<2} wall={wall:6.2f}s pages/s={n / wall:7.1f} first_page={first * 1000:7.1f}ms "
+                  f"speedup={base / wall:4.2f}x chars={chars}")
+
+
+if __name__ == "__main__":
+    main()
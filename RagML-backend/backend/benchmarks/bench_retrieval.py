@@ -0,0 +1,50 @@
+"""Offline retrieval quality and latency: every chunking strategy x retrieval mode on a synthetic corpus.
+
+Results are appended to reports/retrieval.csv (one row per strategy/mode per
+run, comparable across runs) and written to reports/retrieval-<run_id>.json.
+
+    python -m benchmarks.bench_retrieval --docs 40 --queries 200 --k 5
+    python -m benchmarks.bench_retrieval --encoder model   # configured embedding provider (needs the model cached locally)
+"""
+from __future__ import annotations
+import argparse
+from app.evaluation.report import write_results
+from app.evaluation.retrieval import evaluate, hashing_encoder, synthetic_corpus
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--docs", type=int, default=40)
+    ap.add_argument("--pages", type=int, default=4, help="pages per document")
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=5)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--encoder", choices=["hashing", "model"], default="hashing")
+    ap.add_argument("--strategies", nargs="+", default=["sliding_window", "semantic_split"])
+    ap.add_argument("--modes", nargs="+", default=["dense", "lexical", "hybrid"])
+    ap.add_argument("--no-memory", action="store_true", help="skip the traced ingest pass")
+    ap.add_argument("--name", default="retrieval")
+    args = ap.parse_args()
+
+    if args.encoder == "model":
+        from app.services.embedding import encode_texts as encode
+    else:
+        encode = hashing_encoder()
+    corpus = synthetic_corpus(docs=args.docs, pages_per_doc=args.pages, queries=args.queries, seed=args.seed)
+    results = evaluate(corpus, encode, strategies=args.strategies, modes=args.modes, k=args.k,
+                       memory=not args.no_memory)
+    k = args.k
+    print(f"{'strategy':<16}{'mode':<9}{'chunks':>7}{f'recall@{k}':>10}{'mrr':>7}{f'ndcg@{k}':>8}"
+          f"{'p50ms':>8}{'p99ms':>8}{'qps':>8}{'ingest/s':>10}{'peakMB':>8}")
+    for r in results:
+        m = r.metrics
+        print(f"{r.strategy:<16}{r.mode:<9}{m['chunks']:>7}{m[f'recall@{k}']:>10.3f}{m['mrr']:>7.3f}"
+              f"{m[f'ndcg@{k}']:>8.3f}{m['p50_ms']:>8.2f}{m['p99_ms']:>8.2f}{m['qps']:>8.0f}"
+              f"{m['ingest_chunks_per_s']:>10.0f}{m['peak_ingest_mb']:>8.1f}")
+    config = {**vars(args), "corpus_docs": len(corpus.docs), "corpus_queries": len(corpus.queries)}
+    paths = write_results([r.as_row() for r in results], name=args.name, config=config)
+    print(f"wrote {paths['csv']} and {paths['json']}")
+
+
+if __name__ == "__main__":
+    main()
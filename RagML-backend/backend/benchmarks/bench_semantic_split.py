@@ -0,0 +1,66 @@
+"""Grouping cost of semantic_split: per-pair loop vs vectorized, 1k-100k sentences.
+
+Embeddings are synthetic (topic drift with noise) so only the split logic is
+timed; the model forward pass is identical for both implementations.
+
+    python -m benchmarks.bench_semantic_split --sizes 1000 10000 100000
+"""
+from __future__ import annotations
+import argparse
+import time
+import numpy as np
+from app.services.chunking import group_sentences
+
+
+def legacy_group(sentences, embeds, target_tokens, threshold=0.55):
+    # the previous implementation: one similarity call per pair and a
+    # re-count of the whole current group on every iteration
+    groups, current = [], [sentences[0]]
+    for i in range(1, len(sentences)):
+        a, b = embeds[i - 1], embeds[i]
+        sim = float(a @ b / (np.linalg.norm(a) * np.linalg.norm(b)))
+        if sim >= threshold and sum(len(w.split()) for w in current) < target_tokens:
+            current.append(sentences[i])
+        else:
+            groups.append(current)
+            current = [sentences[i]]
+    groups.append(current)
+    return groups
+
+
+def synthetic(n: int, dim: int = 384, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    topic = rng.standard_normal(dim)
+    embeds = np.empty((n, dim), dtype=np.float32)
+    for i in range(n):
+        if rng.random() < 0.05:
+            topic = rng.standard_normal(dim)
+        embeds[i] = topic + 0.5 * rng.standard_normal(dim)
+    embeds /= np.linalg.norm(embeds, axis=1, keepdims=True)
+    sentences = [" ".join(["word"] * int(rng.integers(5, 25))) + "." for _ in range(n)]
+    return sentences, embeds
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    ap.add_argument("--target-tokens", type=int, default=400)
+    args = ap.parse_args()
+    for n in args.sizes:
+        sentences, embeds = synthetic(n)
+        t0 = time.perf_counter()
+        old = legacy_group(sentences, embeds, args.target_tokens)
+        t_old = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        new = group_sentences(sentences, embeds, args.target_tokens)
+        t_new = time.perf_counter() - t0
+        assert old == new
+        t0 = time.perf_counter()
+        group_sentences(sentences, embeds, args.target_tokens, percentile=90, window=3)
+        t_win = time.perf_counter() - t0
+        print(f"sentences={n:<7} legacy={t_old * 1000:9.1f}ms vectorized={t_new * 1000:7.1f}ms "
+              f"({t_old / t_new:5.1f}x) percentile+window={t_win * 1000:7.1f}ms groups={len(new)}")
+
+
+if __name__ == "__main__":
+    main()
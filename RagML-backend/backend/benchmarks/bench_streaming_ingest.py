@@ -0,0 +1,85 @@
+"""Peak memory and throughput of one-shot vs streaming ingestion.
+
+Builds a synthetic N-page document and ingests it into the embedded `local`
+backend both ways. `--synthetic` replaces the embedding model with a cheap
+deterministic encoder so the numbers isolate pipeline overhead.
+
+    python -m benchmarks.bench_streaming_ingest --pages 500 --synthetic
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+import uuid
+import numpy as np
+
+_WORDS = ("retrieval vector index query document embedding policy contract clause "
+          "invoice tenant schedule interview candidate report section appendix").split()
+
+
+def synthetic_pages(n: int, words_per_page: int = 600, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    for _ in range(n):
+        words = rng.choice(_WORDS, size=words_per_page)
+        yield ". ".join(" ".join(words[i:i + 12]) for i in range(0, words_per_page, 12)) + "."
+
+
+def hashing_encoder(texts: list[str]) -> np.ndarray:
+    out = np.zeros((len(texts), 384), dtype=np.float32)
+    for i, t in enumerate(texts):
+        for w in t.split():
+            out[i, hash(w) % 384] += 1.0
+    return out / np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-9)
+
+
+async def one_shot(pages: int, strategy: str) -> int:
+    from app.services.chunking import chunk_text
+    from app.services.embedding import aencode_texts
+    from app.services.vector_store import VectorItem, upsert_vectors
+    raw = "\n".join(synthetic_pages(pages))
+    chunks = chunk_text(raw, strategy)
+    vecs = await aencode_texts([c.text for c in chunks])
+    items = [VectorItem(id=str(uuid.uuid4()), vector=v.tolist(), text=c.text, metadata={"filename": "bench"})
+             for c, v in zip(chunks, vecs)]
+    await upsert_vectors(items, backend="local")
+    return len(items)
+
+
+async def streaming(pages: int, strategy: str) -> int:
+    from app.services.ingest_pipeline import run_ingest
+    progress = await run_ingest(synthetic_pages(pages), strategy, "local", metadata={"filename": "bench"})
+    return progress.chunks
+
+
+def measure(label: str, fn, pages: int, strategy: str) -> None:
+    from app.services.vector_store import close_stores
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    n = asyncio.run(fn(pages, strategy))
+    wall = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    asyncio.run(close_stores())
+    print(f"{label:<9} pages={pages} chunks={n} wall={wall:.2f}s chunks/s={n / wall:,.0f} peak={peak / 2**20:.1f}MiB")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", type=int, default=500)
+    ap.add_argument("--strategy", default="sliding_window")
+    ap.add_argument("--synthetic", action="store_true")
+    args = ap.parse_args()
+    os.environ.setdefault("LOCAL_INDEX_PATH", tempfile.mkdtemp())
+    os.environ.setdefault("EMBED_CACHE_ENABLED", "false")
+    from app.services import embedding
+    if args.synthetic:
+        embedding._encode_uncached = hashing_encoder
+    measure("one-shot", one_shot, args.pages, args.strategy)
+    measure("streaming", streaming, args.pages, args.strategy)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Tenant-filtered query latency as the tenant count grows: one shared collection vs per-tenant partitions.
+
+The corpus size is fixed and split evenly across tenants. "shared" is the
+single-collection layout: every query scans the whole corpus and keeps the
+tenant's hits, over-fetching top_k * tenants to have enough left (recall is
+against the tenant's exact top-k). "partitioned" searches the tenant's own
+partition through the `local` vector backend, and "partitioned+doc" further
+restricts it to one document with a doc_ids filter.
+
+    python -m benchmarks.bench_tenant_search --n 100000 --tenants 1 10 100 --queries 200
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import numpy as np
+
+
+def synthetic(n: int, dim: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((256, dim)).astype(np.float32)
+    x = centers[rng.integers(0, 256, size=n)] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def report(label: str, tenants: int, lat: list[float], recall: float) -> None:
+    arr = np.array(lat)
+    print(f"tenants={tenants:<5} {label:<16} p50={np.percentile(arr, 50):7.3f}ms p95={np.percentile(arr, 95):7.3f}ms "
+          f"recall@k={recall:.3f}")
+
+
+async def run(args, tenants: int, data: np.ndarray, queries: np.ndarray) -> None:
+    from app.services.local_index import LocalIndex
+    from app.services.vector_store import SearchFilter, VectorBatch, close_stores, search_vectors, upsert_vectors
+    owner = np.arange(len(data)) % tenants
+    docs_per_tenant = 10
+    doc = (np.arange(len(data)) // tenants) % docs_per_tenant
+    ids = [str(i) for i in range(len(data))]
+    payloads = [{"tenant_id": f"t{o}", "doc_id": f"d{d}"} for o, d in zip(owner, doc)]
+
+    shared = LocalIndex(tempfile.mkdtemp(), train_size=len(data) + 1)
+    for s in range(0, len(data), 10_000):
+        shared.upsert(ids[s:s + 10_000], data[s:s + 10_000], payloads[s:s + 10_000])
+    for t in range(tenants):
+        rows = np.flatnonzero(owner == t)
+        for s in range(0, len(rows), 10_000):
+            part = rows[s:s + 10_000]
+            await upsert_vectors(VectorBatch([ids[i] for i in part], data[part], [""] * len(part),
+                                             [payloads[i] for i in part]), backend="local", tenant_id=f"t{t}")
+
+    rng = np.random.default_rng(1)
+    asked = rng.integers(0, tenants, size=len(queries))
+    k = args.k
+    lat_s, lat_p, lat_d, rec_s, rec_p, rec_d = [], [], [], [], [], []
+    for q, t in zip(queries, asked):
+        rows = np.flatnonzero(owner == t)
+        exact = set(rows[np.argsort(-(data[rows] @ q))[:k]].tolist())
+        doc_rows = rows[doc[rows] == 0]
+        exact_doc = set(doc_rows[np.argsort(-(data[doc_rows] @ q))[:k]].tolist())
+
+        t0 = time.perf_counter()
+        hits = [h for h in shared.search(q, top_k=k * tenants) if h[2]["tenant_id"] == f"t{t}"][:k]
+        lat_s.append((time.perf_counter() - t0) * 1000)
+        rec_s.append(len({int(h[0]) for h in hits} & exact) / k)
+
+        t0 = time.perf_counter()
+        hits = await search_vectors(q, top_k=k, backend="local", where=SearchFilter(f"t{t}"))
+        lat_p.append((time.perf_counter() - t0) * 1000)
+        rec_p.append(len({int(h[0]) for h in hits} & exact) / k)
+
+        t0 = time.perf_counter()
+        hits = await search_vectors(q, top_k=k, backend="local", where=SearchFilter(f"t{t}", ("d0",)))
+        lat_d.append((time.perf_counter() - t0) * 1000)
+        rec_d.append(len({int(h[0]) for h in hits} & exact_doc) / max(min(k, len(doc_rows)), 1))
+    await close_stores()
+    report("shared", tenants, lat_s, float(np.mean(rec_s)))
+    report("partitioned", tenants, lat_p, float(np.mean(rec_p)))
+    report("partitioned+doc", tenants, lat_d, float(np.mean(rec_d)))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=100_000, help="total vectors, split across tenants")
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--tenants", type=int, nargs="+", default=[1, 10, 100])
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=10)
+    args = ap.parse_args()
+    data = synthetic(args.n, args.dim)
+    queries = synthetic(args.queries, args.dim, seed=1)
+    for tenants in args.tenants:
+        # a fresh store directory per run
+        os.environ["LOCAL_INDEX_PATH"] = tempfile.mkdtemp()
+        from app.core.config import get_settings
+        get_settings().LOCAL_INDEX_PATH = os.environ["LOCAL_INDEX_PATH"]
+        asyncio.run(run(args, tenants, data, queries))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Per-call cost of tracing spans, enabled vs disabled, and of a /metrics scrape.
+
+    python -m benchmarks.bench_tracing --calls 200000
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import time
+from app.core import tracing
+from app.core.config import get_settings
+
+
+async def spans(calls: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(calls):
+        with tracing.span("search", "local"):
+            pass
+    return (time.perf_counter() - t0) / calls * 1e9
+
+
+async def bare(calls: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(calls):
+        pass
+    return (time.perf_counter() - t0) / calls * 1e9
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--calls", type=int, default=200_000)
+    args = ap.parse_args()
+    settings = get_settings()
+    base = asyncio.run(bare(args.calls))
+    for enabled in (False, True):
+        settings.TRACING_ENABLED = enabled
+        ns = asyncio.run(spans(args.calls)) - base
+        print(f"tracing={'on ' if enabled else 'off'} span overhead={ns:7.0f}ns/call")
+    for stage in ("embed", "upsert", "history_read", "history_write", "synthesize"):
+        for backend in ("local", "qdrant", "redis", ""):
+            tracing.record(stage, backend, 0.01)
+    t0 = time.perf_counter()
+    body = tracing.render_metrics()
+    print(f"/metrics render={1000 * (time.perf_counter() - t0):.2f}ms ({len(body.splitlines())} lines)")
+
+
+if __name__ == "__main__":
+    main()
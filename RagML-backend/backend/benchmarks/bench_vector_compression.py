@@ -0,0 +1,76 @@
+"""Memory per million vectors vs recall@10 for each compression mode of the local index.
+
+Recall is measured against exact float32 search over the full-width vectors,
+so truncated modes pay for the dimensions they drop. "index" is what a scan
+reads (codes + scales, the part to keep in RAM); "rescore" is the
+full-precision copy only the top candidates are read from.
+
+Synthetic vectors have a decaying per-dimension spectrum, like PCA-ordered or
+Matryoshka-trained embeddings; pass `--embeddings vecs.npy` to use real ones.
+
+    python -m benchmarks.bench_vector_compression --n 100000 --dim 384 --truncate 384 256 128
+"""
+from __future__ import annotations
+import argparse
+import tempfile
+import time
+import numpy as np
+from app.services.local_index import LocalIndex, _normalize
+
+MODES = [
+    ("float32", 0.0), ("float16", 0.0),
+    ("int8", 0.0), ("int8", 4.0),
+    ("binary", 0.0), ("binary", 4.0), ("binary", 10.0),
+]
+
+
+def synthetic(n: int, dim: int, clusters: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    spectrum = (1.0 + np.arange(dim, dtype=np.float32)) ** -0.5
+    centers = np.random.default_rng(42).standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=n)
+    return _normalize((centers[labels] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)) * spectrum)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=100_000)
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--truncate", type=int, nargs="+", default=[384, 256, 128])
+    ap.add_argument("--embeddings", default=None, help=".npy matrix of real embeddings; queries are held-out rows")
+    args = ap.parse_args()
+
+    if args.embeddings:
+        vecs = _normalize(np.load(args.embeddings))
+        data, queries = vecs[args.queries:], vecs[:args.queries]
+    else:
+        data = synthetic(args.n, args.dim, clusters=256)
+        queries = synthetic(args.queries, args.dim, clusters=256, seed=1)
+    exact = np.argsort(-(queries @ data.T), axis=1)[:, :args.k]
+    print(f"n={len(data)} dim={data.shape[1]} queries={len(queries)} (brute force, recall vs full-width float32)")
+
+    for dim in args.truncate:
+        if dim > data.shape[1]:
+            continue
+        d, q = _normalize(data[:, :dim]), _normalize(queries[:, :dim])
+        for dtype, oversampling in MODES:
+            with tempfile.TemporaryDirectory() as tmp:
+                idx = LocalIndex(tmp, dtype=dtype, train_size=len(d) + 1, oversampling=oversampling)
+                for s in range(0, len(d), 10_000):
+                    ids = [str(i) for i in range(s, min(s + 10_000, len(d)))]
+                    idx.upsert(ids, d[s:s + 10_000], [{} for _ in ids])
+                t0 = time.perf_counter()
+                res = idx.search_batch(q, top_k=args.k)
+                qps = len(q) / (time.perf_counter() - t0)
+                hits = sum(len({int(r[0]) for r in rs} & set(e.tolist())) for rs, e in zip(res, exact))
+                size = idx.bytes_per_vector()
+                label = dtype + (f"+rescore x{oversampling:g}" if oversampling else "")
+                print(f"dim={dim:<4} {label:<20} index={size['index'] * 1e6 / 2**20:8.0f}MB/1M "
+                      f"rescore={size['rescore'] * 1e6 / 2**20:6.0f}MB/1M "
+                      f"recall@{args.k}={hits / (args.k * len(q)):.3f} qps={qps:7.1f}")
+
+
+if __name__ == "__main__":
+    main()
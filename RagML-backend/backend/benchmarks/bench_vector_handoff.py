@@ -0,0 +1,61 @@
+"""Memory and wall clock of handing embeddings to the vector store.
+
+"before": every row becomes `v.tolist()` inside a pydantic VectorItem, then the
+store rebuilds a matrix (or PointStructs). "after": one VectorBatch carrying
+the float32 matrix. Uses the embedded `local` store plus an offline build of
+the Qdrant request body, so no server is needed.
+
+    python -m benchmarks.bench_vector_handoff --chunks 10000
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+
+
+def measure(label: str, fn) -> None:
+    t0 = time.perf_counter()
+    fn()
+    wall = time.perf_counter() - t0
+    tracemalloc.start()  # separate run: tracing inflates wall time
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} wall={wall * 1000:8.1f}ms peak={peak / 2**20:7.1f}MiB")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chunks", type=int, default=10_000)
+    ap.add_argument("--dim", type=int, default=384)
+    args = ap.parse_args()
+    os.environ.setdefault("LOCAL_INDEX_PATH", tempfile.mkdtemp())
+    from qdrant_client.http.models import Batch, PointStruct
+    from app.services.vector_store import VectorBatch, VectorItem, upsert_vectors, close_stores
+
+    vecs = np.random.default_rng(0).standard_normal((args.chunks, args.dim)).astype(np.float32)
+    ids = [f"{i:032x}" for i in range(args.chunks)]
+    texts = [f"chunk {i} " * 40 for i in range(args.chunks)]
+    meta = {"filename": "bench.pdf"}
+
+    def items() -> list:
+        return [VectorItem(id=i, vector=v.tolist(), text=t, metadata=meta) for i, v, t in zip(ids, vecs, texts)]
+
+    def batch() -> VectorBatch:
+        return VectorBatch(ids, vecs, texts, [meta] * len(ids))
+
+    measure("before: build VectorItems", items)
+    measure("after:  build VectorBatch", batch)
+    measure("before: local upsert", lambda: asyncio.run(upsert_vectors(items(), backend="local")))
+    measure("after:  local upsert", lambda: asyncio.run(upsert_vectors(batch(), backend="local")))
+    measure("before: qdrant PointStructs", lambda: [PointStruct(id=it.id, vector=it.vector, payload={"text": it.text, **it.metadata}) for it in items()])
+    measure("after:  qdrant Batch", lambda: Batch.model_construct(ids=ids, vectors=vecs.tolist(), payloads=batch().payloads()))
+    asyncio.run(close_stores())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import pytest
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def redis(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    from app.services import memory
+    r = fakeredis.FakeAsyncRedis()
+    monkeypatch.setattr(memory, "_r", r)
+    yield r
+    await r.aclose()
+
+
+def fake_embed(texts, dim=64):
+    """Deterministic bag-of-words vectors: texts sharing words point the same way."""
+    import zlib
+    import numpy as np
+    out = np.zeros((len(texts), dim), dtype=np.float32)
+    for i, text in enumerate(texts):
+        for word in text.lower().split():
+            out[i, zlib.crc32(word.strip(".,?!").encode()) % dim] += 1.0
+    out[:, -1] += 1e-3  # no all-zero rows
+    return out / np.linalg.norm(out, axis=1, keepdims=True)
+
+
+@pytest.fixture
+async def local_rag(tmp_path, monkeypatch, redis):
+    """The local vector backend, lexical index and sqlite manifests under tmp_path, with a fake embedder."""
+    pytest.importorskip("aiosqlite")
+    pytest.importorskip("lupa")  # fakeredis runs the Lua behind redis-py locks with it
+    from app.core.config import get_settings
+    from app.db import sql
+    from app.services import embedding
+    from app.services.lexical import close_lexical_index
+    from app.services.metadata_writer import close_metadata_writers
+    from app.services.vector_store import close_stores
+    for name, value in [("LOCAL_INDEX_PATH", str(tmp_path / "local")), ("LEXICAL_INDEX_PATH", str(tmp_path / "lexical")),
+                        ("INGEST_SPOOL_DIR", str(tmp_path / "spool")),
+                        ("POSTGRES_DSN", f"sqlite+aiosqlite:///{tmp_path / 'meta.db'}"),
+                        ("EMBEDDING_PROVIDER", "sentence_transformers"), ("ST_MODEL_NAME", "fake"),
+                        ("EMBEDDING_DIM", 0), ("VECTOR_QUANTIZATION", "none"), ("EMBED_CACHE_ENABLED", False),
+                        ("LEXICAL_ENABLED", True), ("ANSWER_CACHE_ENABLED", False), ("INGEST_RETRY_BACKOFF_S", 0.0)]:
+        monkeypatch.setattr(get_settings(), name, value)
+    monkeypatch.setattr(embedding, "_encode_uncached", fake_embed)
+    await sql.dispose_engine()
+    yield get_settings()
+    await embedding.close_batcher()
+    await close_metadata_writers()
+    await close_stores()
+    close_lexical_index()
+    await sql.dispose_engine()
+
+
+async def ingest_text(text, doc_id=None, tenant_id=None, strategy="sliding_window"):
+    """Runs one ingest job for `text` on the local_rag stack; returns the finished job."""
+    from app.services import jobs
+
+    class Queue:
+        async def save(self, job):
+            pass
+
+    job_id = jobs.new_job_id()
+    path = jobs.spool_path(job_id, "doc.txt")
+    path.write_text(text)
+    job = jobs.IngestJob(job_id, "doc.txt", str(path), strategy, "local", "postgres", doc_id=doc_id, tenant_id=tenant_id)
+    assert await jobs.process_job(Queue(), job)
+    assert job.status == "succeeded", job.error
+    return job
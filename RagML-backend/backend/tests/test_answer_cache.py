@@ -0,0 +1,133 @@
+import numpy as np
+import pytest
+from app.services import answer_cache
+from app.services.answer_cache import GENERATION_KEY, CachedAnswer, SemanticCache
+
+pytestmark = pytest.mark.anyio
+
+
+def unit(*values):
+    v = np.array(values, dtype=np.float32)
+    return v / np.linalg.norm(v)
+
+
+def entry(text="ctx"):
+    return CachedAnswer("q", [text], "answer")
+
+
+def test_lookup_hits_only_above_the_threshold():
+    cache = SemanticCache(max_items=8, threshold=0.9)
+    cache.store("s", unit(1, 0, 0), entry())
+    assert cache.lookup("s", unit(1, 0.2, 0)).context == ["ctx"]  # cos 0.98
+    assert cache.lookup("s", unit(1, 0.6, 0)) is None  # cos 0.86
+    assert cache.lookup("s", 5 * unit(1, 0, 0)) is not None  # magnitude does not matter
+    assert (cache.stats.hits, cache.stats.misses) == (2, 1)
+
+
+def test_paraphrase_replaces_its_neighbour():
+    cache = SemanticCache(max_items=8, threshold=0.9)
+    cache.store("s", unit(1, 0, 0), entry("old"))
+    cache.store("s", unit(1, 0.1, 0), entry("new"))
+    assert len(cache) == 1
+    assert cache.lookup("s", unit(1, 0, 0)).context == ["new"]
+
+
+def test_scopes_are_isolated():
+    # rag.chat scopes by backend, tenant, doc filter, retrieval mode and top_k
+    cache = SemanticCache(max_items=8)
+    vec = unit(0, 1, 0)
+    cache.store("local:tenant-a:*:dense:4", vec, entry("a"))
+    cache.store("local:tenant-b:*:dense:4", vec, entry("b"))
+    assert cache.lookup("local:tenant-a:*:dense:4", vec).context == ["a"]
+    assert cache.lookup("local:tenant-b:*:dense:4", vec).context == ["b"]
+    assert cache.lookup("local:tenant-a:doc-1:dense:4", vec) is None
+    assert cache.lookup("local::*:dense:4", vec) is None
+
+
+def test_expired_entries_miss_and_are_reused(monkeypatch):
+    cache = SemanticCache(max_items=1, ttl_s=10)
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache.time, "time", lambda: now[0])
+    cache.store("s", unit(1, 0), entry())
+    now[0] += 11
+    assert cache.lookup("s", unit(1, 0)) is None
+    cache.store("s", unit(0, 1), entry("fresh"))
+    assert cache.stats.evictions == 0
+    assert cache.lookup("s", unit(0, 1)).context == ["fresh"]
+
+
+def test_full_cache_evicts_least_recently_used():
+    cache = SemanticCache(max_items=2)
+    cache.store("s", unit(1, 0, 0), entry("x"))
+    cache.store("s", unit(0, 1, 0), entry("y"))
+    cache.lookup("s", unit(1, 0, 0))  # x is now the more recent
+    cache.store("s", unit(0, 0, 1), entry("z"))
+    assert cache.stats.evictions == 1
+    assert cache.lookup("s", unit(0, 1, 0)) is None
+    assert cache.lookup("s", unit(1, 0, 0)).context == ["x"]
+
+
+def test_scope_table_forgets_dead_scopes(monkeypatch):
+    cache = SemanticCache(max_items=4, ttl_s=10)
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache.time, "time", lambda: now[0])
+    for i in range(50):
+        cache.store(f"tenant-{i}", unit(1, 0), entry())
+        now[0] += 11  # every earlier entry has expired
+        assert len(cache._scopes) <= cache.max_items
+    cache.store("kept", unit(1, 0), entry("kept"))
+    for i in range(20):
+        now[0] += 0.01
+        cache.store(f"evicted-{i}", unit(0, 1), entry())  # pushes older evicted-* out of the slots
+        assert cache.lookup("kept", unit(1, 0)).context == ["kept"]
+        assert len(cache._scopes) <= cache.max_items + 1  # one per slot, plus the scope just stored
+
+
+async def test_sync_follows_the_corpus_generation(redis, monkeypatch):
+    cache = SemanticCache(max_items=4, sync_s=60)
+    clock = [0.0]
+    monkeypatch.setattr(answer_cache.time, "monotonic", lambda: clock[0] + 1000)
+    await cache.sync()
+    cache.store("s", unit(1, 0), entry())
+    await redis.incr(GENERATION_KEY)  # another process ingested a document
+    await cache.sync()  # throttled: Redis is not read again yet
+    assert cache.lookup("s", unit(1, 0)) is not None
+    clock[0] += 61
+    await cache.sync()
+    assert cache.generation == 1 and cache.stats.invalidations == 1
+    assert cache.lookup("s", unit(1, 0)) is None and not cache._scopes
+
+
+async def test_invalidate_answer_cache_bumps_the_shared_generation(redis, monkeypatch):
+    cache = SemanticCache(max_items=4)
+    monkeypatch.setattr(answer_cache, "_cache", cache)
+    cache.store("s", unit(1, 0), entry())
+    await answer_cache.invalidate_answer_cache()
+    assert int(await redis.get(GENERATION_KEY)) == cache.generation == 1
+    assert len(cache) == 0
+
+
+async def test_chat_reuses_retrieval_and_skips_the_encoder_for_lexical(local_rag, monkeypatch):
+    from app.api import rag
+    from app.models.schemas import ChatQuery
+    monkeypatch.setattr(local_rag, "ANSWER_CACHE_ENABLED", True)
+    monkeypatch.setattr(local_rag, "VECTOR_BACKEND", "local")
+    monkeypatch.setattr(answer_cache, "_cache", SemanticCache(max_items=8))
+    encoded, retrieved = [], []
+    real_encode, real_retrieve = rag.aencode_texts, rag.retrieve
+
+    async def encode(texts):
+        encoded.extend(texts)
+        return await real_encode(texts)
+
+    async def retrieve(query, qvec=None):
+        retrieved.append(query.query)
+        return await real_retrieve(query, qvec)
+
+    monkeypatch.setattr(rag, "aencode_texts", encode)
+    monkeypatch.setattr(rag, "retrieve", retrieve)
+    await rag.chat(ChatQuery(session_id="s1", query="what is bm25"))
+    await rag.chat(ChatQuery(session_id="s2", query="what is bm25"))
+    assert encoded == ["what is bm25"] * 2 and retrieved == ["what is bm25"]
+    await rag.chat(ChatQuery(session_id="s3", query="what is bm25", retrieval="lexical"))
+    assert len(encoded) == 2 and len(retrieved) == 2
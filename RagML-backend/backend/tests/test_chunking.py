@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+from app.services.chunking import (_stream_sliding_window, adjacent_similarities, group_sentences,
+                                   semantic_split, sliding_window)
+
+
+def topic_sentences(n, seed=0):
+    # runs of sentences on one topic, so similar neighbours and real breaks both occur
+    rng = np.random.default_rng(seed)
+    topics = np.repeat(np.arange(n), rng.integers(1, 6, size=n))[:n]
+    return [f"Topic {t} sentence {i} " + "word " * int(rng.integers(1, 12)) + "end." for i, t in enumerate(topics)]
+
+
+def fake_encode(sentences, dim=32):
+    # deterministic: a topic direction plus per-sentence noise
+    out = []
+    for s in sentences:
+        topic = int(s.split()[1])
+        base = np.random.default_rng(topic).standard_normal(dim)
+        noise = np.random.default_rng(abs(hash(s)) % 2**32).standard_normal(dim)
+        out.append(base + 0.5 * noise)
+    e = np.array(out, dtype=np.float32)
+    return e / np.linalg.norm(e, axis=1, keepdims=True)
+
+
+def reference_similarities(embeds, window):
+    sims = []
+    for i in range(len(embeds) - 1):
+        left = embeds[max(0, i - window + 1):i + 1].sum(axis=0)
+        right = embeds[i + 1:i + 1 + window].sum(axis=0)
+        sims.append(left @ right / max(np.linalg.norm(left) * np.linalg.norm(right), 1e-12))
+    return np.array(sims)
+
+
+def reference_groups(sentences, embeds, target_tokens, threshold, percentile, window):
+    sims = reference_similarities(embeds, max(window, 1))
+    if percentile is not None:
+        cutoff = np.percentile([1.0 - s for s in sims], percentile)
+        breaks = [1.0 - s > cutoff for s in sims]
+    else:
+        breaks = [s < threshold for s in sims]
+    groups, current, tokens = [], [sentences[0]], len(sentences[0].split())
+    for i in range(1, len(sentences)):
+        if breaks[i - 1] or tokens >= target_tokens:
+            groups.append(current)
+            current, tokens = [], 0
+        current.append(sentences[i])
+        tokens += len(sentences[i].split())
+    groups.append(current)
+    return groups
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 40, 257])
+@pytest.mark.parametrize("window", [1, 2, 3, 8])
+def test_adjacent_similarities_match_reference(n, window):
+    embeds = fake_encode(topic_sentences(n, seed=n))
+    got = adjacent_similarities(embeds, window)
+    assert got.shape == (max(n - 1, 0),)
+    np.testing.assert_allclose(got, reference_similarities(embeds.astype(np.float64), window), atol=1e-5)
+
+
+@pytest.mark.parametrize("window", [1, 3])
+@pytest.mark.parametrize("threshold,percentile", [(0.55, None), (0.8, None), (0.0, 50.0), (0.0, 90.0)])
+@pytest.mark.parametrize("target_tokens", [10, 60, 10_000])
+def test_group_sentences_matches_reference(window, threshold, percentile, target_tokens):
+    sentences = topic_sentences(120, seed=window)
+    embeds = fake_encode(sentences)
+    got = group_sentences(sentences, embeds, target_tokens, threshold=threshold, percentile=percentile, window=window)
+    assert got == reference_groups(sentences, embeds, target_tokens, threshold, percentile, window)
+    assert [s for g in got for s in g] == sentences
+
+
+def test_percentile_breaks_at_the_largest_distances():
+    sentences = topic_sentences(200, seed=3)
+    groups = group_sentences(sentences, fake_encode(sentences), 10_000, percentile=90.0)
+    assert len(groups) - 1 == 20  # the top 10% of the 199 boundaries, rounded up
+
+
+def test_semantic_split_uses_the_given_encoder():
+    sentences = topic_sentences(30, seed=5)
+    chunks = semantic_split(" ".join(sentences), 10_000, encode=fake_encode)
+    expected = reference_groups(sentences, fake_encode(sentences), 10_000, 0.55, None, 1)
+    assert [c.text for c in chunks] == [" ".join(g) for g in expected]
+
+
+@pytest.mark.parametrize("words,max_tokens,overlap", [(0, 5, 1), (7, 5, 2), (100, 16, 4), (100, 10, 10)])
+def test_streamed_windows_match_sliding_window(words, max_tokens, overlap):
+    text = " ".join(f"w{i}" for i in range(words))
+    pages = [" ".join(text.split()[i:i + 9]) for i in range(0, words, 9)]
+    expected = [c.text for c in sliding_window(text, max_tokens, overlap)]
+    assert list(_stream_sliding_window(pages, max_tokens, overlap)) == expected
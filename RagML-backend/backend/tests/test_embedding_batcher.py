@@ -0,0 +1,109 @@
+import asyncio
+import time
+import numpy as np
+import pytest
+from app.services import embedding
+from app.services.embedding import EmbeddingBatcher
+
+pytestmark = pytest.mark.anyio
+
+
+def vec(text: str) -> list[float]:
+    a, b = text.split("-")
+    return [float(a), float(b)]
+
+
+class FakeEncoder:
+    def __init__(self, delay: float = 0.0, error: Exception | None = None):
+        self.delay, self.error = delay, error
+        self.calls: list[tuple[float, list[str]]] = []
+        self.t0 = time.monotonic()
+
+    async def __call__(self, texts):
+        self.calls.append((time.monotonic() - self.t0, list(texts)))
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return np.array([vec(t) for t in texts], dtype=np.float32)
+
+    @property
+    def sizes(self):
+        return [len(texts) for _, texts in self.calls]
+
+
+def texts(caller: int, n: int) -> list[str]:
+    return [f"{caller}-{j}" for j in range(n)]
+
+
+async def test_concurrent_callers_share_one_encode():
+    enc = FakeEncoder()
+    batcher = EmbeddingBatcher(enc, max_batch=64, max_wait_ms=50)
+    requests = [texts(i, 1 + i % 3) for i in range(12)]
+    results = await asyncio.gather(*(batcher.encode(r) for r in requests))
+    await batcher.close()
+    assert enc.sizes == [sum(len(r) for r in requests)]
+    for r, out in zip(requests, results):
+        assert out.tolist() == [vec(t) for t in r]
+    assert (batcher.stats.requests, batcher.stats.batches, batcher.stats.items) == (12, 1, 24)
+
+
+async def test_lone_request_on_an_idle_encoder_does_not_wait():
+    enc = FakeEncoder()
+    batcher = EmbeddingBatcher(enc, max_batch=64, max_wait_ms=1000)
+    t0 = time.monotonic()
+    out = await batcher.encode(["1-2"])
+    await batcher.close()
+    assert out.tolist() == [[1.0, 2.0]]
+    assert time.monotonic() - t0 < 0.5
+
+
+async def test_flushes_at_max_batch():
+    enc = FakeEncoder(delay=0.01)
+    batcher = EmbeddingBatcher(enc, max_batch=8, max_wait_ms=200, concurrency=4)
+    requests = [texts(i, 1) for i in range(20)]
+    results = await asyncio.gather(*(batcher.encode(r) for r in requests))
+    await batcher.close()
+    assert enc.sizes == [8, 8, 4]
+    assert enc.calls[0][0] < 0.1 and enc.calls[1][0] < 0.1  # full batches did not wait out max_wait
+    assert [o.tolist() for o in results] == [[vec(r[0])] for r in requests]
+    assert batcher.stats.full_batches == 2
+
+
+async def test_flushes_after_max_wait():
+    enc = FakeEncoder(delay=0.3)
+    batcher = EmbeddingBatcher(enc, max_batch=64, max_wait_ms=50, concurrency=2)
+    first = asyncio.create_task(batcher.encode(["0-0"]))  # idle: dispatched at once
+    await asyncio.sleep(0.01)
+    second = await batcher.encode(["1-1"])  # encoder busy: waits up to max_wait for company
+    await first
+    await batcher.close()
+    assert enc.sizes == [1, 1]
+    assert 0.04 <= enc.calls[1][0] - enc.calls[0][0] < 0.25
+    assert second.tolist() == [[1.0, 1.0]]
+
+
+async def test_encoder_errors_reach_every_waiter():
+    err = RuntimeError("model crashed")
+    enc = FakeEncoder(error=err)
+    batcher = EmbeddingBatcher(enc, max_batch=64, max_wait_ms=20)
+    results = await asyncio.gather(*(batcher.encode(texts(i, 2)) for i in range(5)), return_exceptions=True)
+    assert results == [err] * 5
+    enc.error = None
+    assert (await batcher.encode(["3-4"])).tolist() == [[3.0, 4.0]]  # the batcher survives
+    await batcher.close()
+
+
+async def test_aencode_texts_goes_through_the_batcher(monkeypatch):
+    enc = FakeEncoder()
+    monkeypatch.setattr(embedding, "_encode_offloaded", enc)
+    monkeypatch.setattr(embedding.settings, "EMBED_BATCH_ENABLED", True)
+    monkeypatch.setattr(embedding.settings, "EMBED_BATCH_MAX_SIZE", 16)
+    await embedding.close_batcher()
+    try:
+        small = await asyncio.gather(*(embedding.aencode_texts(texts(i, 2)) for i in range(4)))
+        big = await embedding.aencode_texts(texts(9, 16))  # bulk calls skip the queue
+    finally:
+        await embedding.close_batcher()
+    assert enc.sizes == [8, 16]
+    assert [o.tolist() for o in small] == [[vec(t) for t in texts(i, 2)] for i in range(4)]
+    assert big.shape == (16, 2)
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+from app.services import embedding
+from app.services.embedding_cache import EmbeddingCache, cache_key
+
+
+def vecs(*values):
+    return np.array([[v, -v] for v in values], dtype=np.float32)
+
+
+def test_lru_evicts_least_recently_used():
+    cache = EmbeddingCache(max_items=3)
+    cache.put_many(["a", "b", "c"], vecs(1, 2, 3))
+    cache.get_many(["a"])  # a becomes most recent
+    cache.put_many(["d"], vecs(4))
+    got = cache.get_many(["a", "b", "c", "d"])
+    assert got[1] is None
+    assert [g[0] for g in (got[0], got[2], got[3])] == [1, 3, 4]
+
+
+def test_sqlite_tier_persists_across_instances(tmp_path):
+    path = str(tmp_path / "emb" / "cache.sqlite")
+    first = EmbeddingCache(max_items=10, path=path)
+    first.put_many(["a", "b"], vecs(1, 2))
+    first.close()
+    second = EmbeddingCache(max_items=10, path=path)
+    got = second.get_many(["b", "a", "missing"])
+    assert got[0].tolist() == [2, -2] and got[1].tolist() == [1, -1] and got[2] is None
+    assert (second.stats.disk_hits, second.stats.memory_hits, second.stats.misses) == (2, 0, 1)
+    second.get_many(["a"])  # promoted into memory by the disk hit
+    assert second.stats.memory_hits == 1
+    second.close()
+
+
+def test_counters_and_duplicate_keys():
+    cache = EmbeddingCache(max_items=10)
+    assert cache.get_many(["a", "a"]) == [None, None]
+    cache.put_many(["a"], vecs(1))
+    cache.get_many(["a", "a", "b"])
+    assert cache.stats.as_dict() == {"memory_hits": 2, "disk_hits": 0, "misses": 3, "hit_rate": 0.4}
+
+
+def test_keys_depend_on_provider_model_and_normalized_text():
+    base = cache_key("sentence_transformers", "all-MiniLM-L6-v2", "hello  world")
+    assert base == cache_key("sentence_transformers", "all-MiniLM-L6-v2", " hello world\n")
+    assert base != cache_key("sentence_transformers", "all-mpnet-base-v2", "hello world")
+    assert base != cache_key("onnx", "all-MiniLM-L6-v2", "hello world")
+
+
+def test_switching_st_model_name_misses_the_cache(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_encode(texts):
+        calls.append(list(texts))
+        return vecs(*range(1, len(texts) + 1))
+
+    monkeypatch.setattr(embedding, "_encode_uncached", fake_encode)
+    monkeypatch.setattr(embedding, "_cache", EmbeddingCache(max_items=100, path=str(tmp_path / "c.sqlite")))
+    monkeypatch.setattr(embedding.settings, "EMBED_CACHE_ENABLED", True)
+    monkeypatch.setattr(embedding.settings, "EMBEDDING_PROVIDER", "sentence_transformers")
+    monkeypatch.setattr(embedding.settings, "EMBEDDING_DIM", 0)
+    monkeypatch.setattr(embedding.settings, "ST_MODEL_NAME", "model-a")
+    embedding.encode_texts(["x", "y"])
+    embedding.encode_texts(["y", "x"])
+    assert calls == [["x", "y"]]
+    monkeypatch.setattr(embedding.settings, "ST_MODEL_NAME", "model-b")
+    embedding.encode_texts(["x"])
+    assert calls == [["x", "y"], ["x"]]
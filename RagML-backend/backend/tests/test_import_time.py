@@ -0,0 +1,16 @@
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+from benchmarks.bench_import_time import HEAVY
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+
+@pytest.mark.parametrize("module", ["app.main", "app.worker"])
+def test_heavy_dependencies_are_not_imported_eagerly(module):
+    err = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=BACKEND,
+                         check=True, capture_output=True, text=True).stderr
+    imported = {line.split("|")[-1].strip().split(".")[0] for line in err.splitlines() if line.startswith("import time:")}
+    assert module.split(".")[0] in imported
+    assert sorted(imported.intersection(HEAVY)) == []  # torch, sentence_transformers, sklearn, pandas, SDKs ...
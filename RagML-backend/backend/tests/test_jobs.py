@@ -0,0 +1,148 @@
+import asyncio
+import time
+import pytest
+from app import worker
+from app.services import jobs
+from app.services.jobs import IngestJob, RedisJobQueue
+from conftest import fake_embed, ingest_text
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def queue(redis, monkeypatch):
+    monkeypatch.setattr(jobs.settings, "INGEST_LEASE_S", 60.0)
+    q = RedisJobQueue("redis://unused")
+    await q._r.aclose()
+    q._r = redis
+    return q
+
+
+def job(job_id):
+    return IngestJob(job_id, "a.txt", "/nowhere/a.txt", "recursive", "local", "sqlite")
+
+
+async def take(queue, job_id):
+    await queue.submit(job(job_id))
+    assert await queue.next(timeout=0.1) == job_id
+
+
+async def test_recover_leaves_live_leases_alone(queue, redis):
+    await take(queue, "live")
+    assert await queue.recover() == 0
+    assert await redis.lrange(RedisJobQueue.PROCESSING, 0, -1) == [b"live"]
+
+
+async def test_recover_requeues_expired_leases(queue, redis):
+    await take(queue, "dead")
+    await take(queue, "live")
+    await redis.zadd(RedisJobQueue.LEASES, {"dead": time.time() - 1})
+    assert await queue.recover() == 1
+    assert await redis.lrange(RedisJobQueue.QUEUE, 0, -1) == [b"dead"]
+    assert await redis.lrange(RedisJobQueue.PROCESSING, 0, -1) == [b"live"]
+    assert await redis.zscore(RedisJobQueue.LEASES, "dead") is None
+
+
+async def test_unleased_jobs_get_a_grace_period(queue, redis):
+    await redis.lpush(RedisJobQueue.PROCESSING, "orphan")  # worker died before leasing it
+    assert await queue.recover() == 0
+    assert await redis.zscore(RedisJobQueue.LEASES, "orphan") > time.time()
+    await redis.zadd(RedisJobQueue.LEASES, {"orphan": time.time() - 1})  # ... which then runs out
+    assert await queue.recover() == 1
+    assert await redis.lrange(RedisJobQueue.QUEUE, 0, -1) == [b"orphan"]
+
+
+async def test_acked_jobs_are_not_revived(queue, redis):
+    await take(queue, "done")
+    await queue.ack("done")
+    assert await queue.recover() == 0
+    assert await redis.llen(RedisJobQueue.QUEUE) == 0
+    assert await redis.zcard(RedisJobQueue.LEASES) == 0
+
+
+async def test_hold_renews_the_lease(queue, redis, monkeypatch):
+    await take(queue, "slow")
+    monkeypatch.setattr(jobs.settings, "INGEST_LEASE_S", 0.06)
+    await redis.zadd(RedisJobQueue.LEASES, {"slow": time.time()})
+    hold = asyncio.create_task(queue.hold("slow"))
+    await asyncio.sleep(0.05)
+    hold.cancel()
+    assert await redis.zscore(RedisJobQueue.LEASES, "slow") > time.time()
+
+
+async def test_drain_survives_failing_iterations(queue, monkeypatch):
+    stop = asyncio.Event()
+    calls = []
+    real_next = queue.next
+
+    async def flaky_next(timeout):
+        calls.append(timeout)
+        if len(calls) == 1:
+            raise ConnectionError("redis went away")
+        return await real_next(timeout=0.01)
+
+    async def process(q, j):
+        stop.set()
+        return True
+
+    monkeypatch.setattr(queue, "next", flaky_next)
+    monkeypatch.setattr(worker, "process_job", process)
+    await queue.submit(job("j1"))
+    await asyncio.wait_for(worker._drain(queue, stop), 5)
+    assert len(calls) >= 2
+    assert await queue._r.llen(RedisJobQueue.PROCESSING) == 0
+
+
+async def ingest(text, doc_id=None):
+    return await ingest_text(text, doc_id=doc_id)
+
+
+async def stored_ids(doc_id=None):
+    from app.services.vector_store import SearchFilter, search_vectors
+    where = SearchFilter(None, (doc_id,)) if doc_id else None
+    hits = await search_vectors(fake_embed(["anything"])[0], top_k=1000, backend="local", where=where)
+    return sorted(h[0] for h in hits)
+
+
+def paragraphs(n, tag=""):
+    return "\n\n".join(f"Paragraph {i} {tag} talks about topic {i} in some words." * 3 for i in range(n))
+
+
+async def test_unchanged_document_is_skipped(local_rag):
+    first = await ingest(paragraphs(5), doc_id="d")
+    again = await ingest(paragraphs(5), doc_id="d")
+    assert again.skipped == again.chunks == first.chunks
+    assert len(await stored_ids("d")) == first.chunks
+
+
+async def test_embedder_change_reembeds_and_replaces_chunks(local_rag, monkeypatch):
+    await ingest(paragraphs(5), doc_id="d")
+    before = await stored_ids("d")
+    monkeypatch.setattr(local_rag, "ST_MODEL_NAME", "another-fake")
+    again = await ingest(paragraphs(5), doc_id="d")
+    assert again.skipped == 0 and again.deleted == len(before)
+    after = await stored_ids("d")
+    assert len(after) == len(before) and not set(after) & set(before)
+
+
+async def test_chunking_change_is_not_skipped(local_rag, monkeypatch):
+    first = await ingest(paragraphs(5), doc_id="d")
+    monkeypatch.setattr(local_rag, "MAX_CHUNK_TOKENS", local_rag.MAX_CHUNK_TOKENS // 4)
+    again = await ingest(paragraphs(5), doc_id="d")
+    assert again.chunks > first.chunks
+    assert len(await stored_ids("d")) == again.chunks
+
+
+async def test_uploads_without_doc_id_are_separate_documents(local_rag):
+    first = await ingest(paragraphs(2))
+    second = await ingest(paragraphs(2))
+    assert second.skipped == 0
+    assert len(await stored_ids(first.id)) == first.chunks
+    assert len(await stored_ids(second.id)) == second.chunks
+
+
+async def test_concurrent_uploads_of_one_document_leave_no_orphans(local_rag):
+    from app.services.manifest import load_manifest
+    await asyncio.gather(*(ingest(paragraphs(4, tag=f"v{v}"), doc_id="d") for v in range(4)))
+    manifest = await load_manifest("postgres", "d", "local")
+    assert await stored_ids("d") == sorted(manifest.chunk_ids)
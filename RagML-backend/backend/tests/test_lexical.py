@@ -0,0 +1,89 @@
+import pytest
+from app.services.lexical import LexicalIndex, reciprocal_rank_fusion
+
+
+def add(index, ids, texts, doc_id="d"):
+    index.add(ids, texts, [{"text": t, "doc_id": doc_id} for t in texts])
+
+
+def ids(hits):
+    return [h[0] for h in hits]
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = LexicalIndex(tmp_path / "lex", merge_factor=4, refresh_s=0)
+    yield index
+    index.close()
+
+
+def test_bm25_ranks_matching_chunks(index):
+    add(index, ["a", "b", "c"], ["the quick brown fox", "a lazy dog sleeps", "quick quick fox jumps"])
+    hits = index.search("quick fox", top_k=3)
+    assert ids(hits) == ["c", "a"]
+    assert hits[0][1] > hits[1][1] > 0
+    assert hits[0][2] == {"text": "quick quick fox jumps", "doc_id": "d"}
+    assert index.search("", top_k=3) == [] and index.search("absent", top_k=3) == []
+
+
+def test_deleted_chunks_do_not_crowd_out_live_ones(index):
+    # in one segment, the deleted chunks outscore the live one and fill any fixed over-fetch
+    add(index, [f"x{i}" for i in range(50)] + ["live"], ["zebra zebra zebra"] * 50 + ["zebra and other words around it"])
+    index.delete([f"x{i}" for i in range(50)])
+    assert ids(index.search("zebra", top_k=3)) == ["live"]
+    add(index, ["live2"], ["zebra zebra"])
+    assert ids(index.search("zebra", top_k=2)) == ["live2", "live"]
+
+
+def test_readded_id_is_scored_from_its_newest_version(index):
+    add(index, ["a", "b"], ["apple apple apple", "apple pie"])
+    add(index, ["a"], ["banana split"])
+    assert ids(index.search("apple", top_k=2)) == ["b"]
+    assert ids(index.search("banana", top_k=2)) == ["a"]
+    assert index.search("banana", top_k=1)[0][2]["text"] == "banana split"
+
+
+def test_doc_filter_fetches_past_other_documents(index):
+    add(index, [f"o{i}" for i in range(40)], ["needle needle needle"] * 40, doc_id="other")
+    add(index, ["m"], ["a needle in the haystack"], doc_id="mine")
+    assert ids(index.search("needle", top_k=2, doc_ids={"mine"})) == ["m"]
+    assert len(index.search("needle", top_k=5, doc_ids={"mine", "other"})) == 5
+
+
+def test_tiered_merge_keeps_results_and_drops_deleted(index):
+    for i in range(4):
+        if i == 3:
+            index.delete(["s1"])  # before the fourth segment triggers the merge
+        add(index, [f"s{i}"], [f"segment {i} shares the word merge"])
+    add(index, ["s2"], ["segment 2 rewritten after the others"])
+    index.refresh(force=True)
+    assert len(index._segments) <= 2
+    merged = max(index._segments.values(), key=lambda s: s.docs)
+    assert b"s1" not in set(merged.ids)
+    assert sorted(ids(index.search("merge", top_k=10))) == ["s0", "s3"]
+    assert ids(index.search("rewritten", top_k=10)) == ["s2"]
+
+
+def test_reopen_sees_segments_and_deletes(tmp_path, index):
+    add(index, ["a", "b"], ["persistent words", "persistent other words"])
+    index.delete(["b"])
+    again = LexicalIndex(tmp_path / "lex", merge_factor=4)
+    try:
+        assert ids(again.search("persistent", top_k=5)) == ["a"]
+        add(again, ["c"], ["persistent from a second process"])
+        assert sorted(ids(index.search("persistent", top_k=5))) == ["a", "c"]
+    finally:
+        again.close()
+
+
+def test_delete_documents(index):
+    add(index, ["a1", "a2"], ["shared term one", "shared term two"], doc_id="A")
+    add(index, ["b1"], ["shared term three"], doc_id="B")
+    assert index.delete_documents(["A"]) == 2
+    assert ids(index.search("shared", top_k=5)) == ["b1"]
+
+
+def test_reciprocal_rank_fusion():
+    dense = [("a", 0.9, {}), ("b", 0.8, {}), ("c", 0.7, {})]
+    lexical = [("c", 9.0, {}), ("a", 5.0, {})]
+    assert ids(reciprocal_rank_fusion(dense, lexical, top_k=3)) == ["a", "c", "b"]
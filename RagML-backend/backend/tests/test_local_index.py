@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+from app.services.local_index import LocalIndex, _normalize
+
+N, DIM, K = 20000, 64, 10
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((64, DIM))
+    data = _normalize(centers[rng.integers(0, 64, N)] + 0.8 * rng.standard_normal((N, DIM)))
+    queries = _normalize(centers[rng.integers(0, 64, 50)] + 0.8 * rng.standard_normal((50, DIM)))
+    exact = np.argsort(-(queries @ data.T), axis=1)[:, :K]
+    return data, queries, exact
+
+
+def build(path, data, **kw):
+    idx = LocalIndex(path, train_size=len(data), **kw)
+    for s in range(0, len(data), 5000):
+        idx.upsert([str(i) for i in range(s, min(s + 5000, len(data)))], data[s:s + 5000],
+                   [{"doc_id": f"d{i % 10}"} for i in range(s, min(s + 5000, len(data)))])
+    return idx
+
+
+def recall(results, exact) -> float:
+    return float(np.mean([len({int(h[0]) for h in hits} & set(e.tolist())) / K for hits, e in zip(results, exact)]))
+
+
+@pytest.mark.parametrize("dtype,oversampling,threshold", [
+    ("float32", 0.0, 0.9), ("int8", 4.0, 0.9), ("binary", 10.0, 0.75),
+])
+def test_ivf_recall_against_exact(tmp_path, corpus, dtype, oversampling, threshold):
+    data, queries, exact = corpus
+    idx = build(tmp_path, data, dtype=dtype, oversampling=oversampling, nprobe=16)
+    assert idx._centroids is not None
+    assert recall(idx.search_batch(queries, top_k=K), exact) >= threshold
+    assert recall([idx.search(q, top_k=K) for q in queries], exact) >= threshold
+
+
+def test_reopen_keeps_vectors_payloads_and_training(tmp_path, corpus):
+    data, queries, _ = corpus
+    idx = build(tmp_path, data[:5000], dtype="int8")
+    idx.train(nlist=32)
+    before = idx.search_batch(queries, top_k=K)
+    again = LocalIndex(tmp_path)
+    assert (again.dtype, again.nlist, again.live_count()) == ("int8", 32, 5000)
+    assert again._centroids is not None
+    assert again.search_batch(queries, top_k=K) == before
+
+
+def test_delete_tombstones_survive_reopen(tmp_path, corpus):
+    data, _, _ = corpus
+    idx = build(tmp_path, data[:100])
+    idx.delete(["7", "missing"])
+    assert idx.live_count() == 99
+    assert all(h[0] != "7" for h in idx.search(data[7], top_k=5))
+    assert "7" not in {h[0] for h in LocalIndex(tmp_path).search(data[7], top_k=5)}
+    idx.upsert(["7"], data[8:9], [{"doc_id": "new"}])
+    hits = LocalIndex(tmp_path).search(data[8], top_k=2)
+    assert {h[0] for h in hits} == {"7", "8"}
+    assert LocalIndex(tmp_path).live_count() == 100
+
+
+def test_doc_ids_filter(tmp_path, corpus):
+    data, queries, _ = corpus
+    idx = build(tmp_path, data[:2000])
+    hits = idx.search(queries[0], top_k=K, doc_ids=["d3"])
+    assert len(hits) == K and {h[2]["doc_id"] for h in hits} == {"d3"}
+    rows = np.arange(3, 2000, 10)
+    best = rows[np.argsort(-(data[rows] @ queries[0]))[:K]]
+    assert [int(h[0]) for h in hits] == best.tolist()
+    assert idx.search_batch(queries[:2], top_k=K, doc_ids=["d3"])[0] == hits
+    assert idx.search(queries[0], top_k=K, doc_ids=["nope"]) == []
+    assert idx.delete_documents(["d3"]) == 200
+    assert idx.search(queries[0], top_k=K, doc_ids=["d3"]) == []
+    assert idx.live_count() == 1800
+
+
+def test_writes_from_another_process_are_visible(tmp_path, corpus):
+    data, _, _ = corpus
+    a, b = LocalIndex(tmp_path), LocalIndex(tmp_path)
+    a.upsert(["x"], data[:1], [{}])
+    assert [h[0] for h in b.search(data[0], top_k=1)] == ["x"]
+    b.upsert(["y"], data[1:2], [{}])
+    a.delete(["x"])
+    assert [h[0] for h in b.search(data[0], top_k=2)] == ["y"]
+    assert sorted(LocalIndex(tmp_path)._rows) == ["y"]
+
+
+def test_retrains_as_the_index_grows(tmp_path, corpus):
+    data, queries, exact = corpus
+    idx = LocalIndex(tmp_path, train_size=1000, retrain_factor=4.0)
+    idx.upsert([str(i) for i in range(1000)], data[:1000], [{} for _ in range(1000)])
+    assert (idx._epoch, idx.nlist) == (1, int(4 * np.sqrt(1000)))
+    idx.upsert([str(i) for i in range(1000, 3999)], data[1000:3999], [{} for _ in range(2999)])
+    assert idx._epoch == 1
+    idx.upsert([str(i) for i in range(3999, N)], data[3999:], [{} for _ in range(N - 3999)])
+    assert (idx._epoch, idx.nlist) == (2, int(4 * np.sqrt(N)))
+    assert max(len(lst) for lst in idx._lists) < N / 20
+    assert recall(idx.search_batch(queries, top_k=K), exact) >= 0.9
+    reader = LocalIndex(tmp_path)
+    assert (reader._epoch, reader.nlist, reader._trained_at) == (2, idx.nlist, N)
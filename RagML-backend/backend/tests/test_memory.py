@@ -0,0 +1,59 @@
+import json
+import pytest
+from app.services import memory
+from app.services.memory import decode_message, encode_message
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.parametrize("role", memory.ROLES)
+@pytest.mark.parametrize("content", ["", "hello", "héllo wörld — 日本語 🚀", "ünïcode " * 200, "abc" * 1000])
+def test_encode_round_trip(role, content):
+    raw = encode_message(role, content)
+    assert raw[0] & 0x7F == memory.ROLES.index(role)
+    assert decode_message(raw) == (role, content)
+
+
+def test_long_messages_are_compressed():
+    content = "the same sentence again. " * 100
+    raw = encode_message("assistant", content)
+    assert raw[0] & memory._COMPRESSED and len(raw) < len(content)
+    assert len(encode_message("user", "short")) == 1 + len("short")
+
+
+@pytest.mark.parametrize("role", ["tool", "usér", "USER"])
+def test_unknown_role_is_rejected(role):
+    with pytest.raises(ValueError):
+        encode_message(role, "x")
+
+
+def test_legacy_json_entries_still_decode():
+    raw = json.dumps({"role": "user", "content": "grüße"}).encode()
+    assert decode_message(raw) == ("user", "grüße")
+
+
+async def test_history_is_capped(redis, monkeypatch):
+    monkeypatch.setattr(memory.settings, "CHAT_HISTORY_MAX", 5)
+    for i in range(4):
+        await memory.append_messages("s", [("user", f"q{i}"), ("assistant", f"a{i} ✓")])
+    await memory.append_many({"s": [("user", "last")], "t": [("system", "sys")]})
+    assert await redis.llen("chat:s") == 5
+    assert await memory.get_history("s", limit=50) == [
+        ("user", "q2"), ("assistant", "a2 ✓"), ("user", "q3"), ("assistant", "a3 ✓"), ("user", "last")]
+    assert await memory.get_history("s", limit=2) == [("assistant", "a3 ✓"), ("user", "last")]
+    assert await memory.get_histories(["t", "s", "t", "missing"], limit=1) == {
+        "t": [("system", "sys")], "s": [("user", "last")], "missing": []}
+
+
+async def test_reads_and_writes_refresh_expiry(redis, monkeypatch):
+    monkeypatch.setattr(memory.settings, "CHAT_TTL_S", 1000)
+    await memory.append_message("s", "user", "hi")
+    await memory.append_many({"t": [("user", "hi")]})
+    assert 990 < await redis.ttl("chat:s") <= 1000
+    assert 990 < await redis.ttl("chat:t") <= 1000
+    await redis.expire("chat:s", 10)
+    await redis.expire("chat:t", 10)
+    await memory.get_history("s")
+    assert await redis.ttl("chat:s") > 990
+    await memory.get_histories(["t"])
+    assert await redis.ttl("chat:t") > 990
@@ -0,0 +1,140 @@
+import asyncio
+import pytest
+from app.db import nosql, sql
+from app.services.metadata_writer import _FLUSH, IngestRecord, MetadataWriter
+
+pytestmark = pytest.mark.anyio
+
+
+def record(i: int, tenant_id: str | None = None) -> IngestRecord:
+    return IngestRecord(f"doc-{i}.pdf", f"doc-{i}", "sliding_window", "qdrant", 3, 12,
+                        {"ingest_s": 0.5}, tenant_id=tenant_id)
+
+
+class Sink:
+    def __init__(self, failures: int = 0):
+        self.batches: list[list[dict]] = []
+        self.failures = failures
+
+    async def __call__(self, rows):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("metadata store down")
+        self.batches.append(list(rows))
+
+    def files(self):
+        return [r["filename"] for b in self.batches for r in b]
+
+
+@pytest.fixture
+async def sqlite_db(tmp_path, monkeypatch):
+    pytest.importorskip("aiosqlite")
+    await sql.dispose_engine()
+    monkeypatch.setattr(sql.settings, "POSTGRES_DSN", f"sqlite+aiosqlite:///{tmp_path / 'meta.db'}")
+    yield
+    await sql.dispose_engine()
+
+
+async def scalar(query: str):
+    from sqlalchemy import text
+    async with sql._get_engine().connect() as conn:
+        return (await conn.execute(text(query))).scalar()
+
+
+async def test_sql_migrate_is_idempotent(sqlite_db):
+    assert await sql.migrate() == len(sql._MIGRATIONS)
+    assert await scalar("SELECT MAX(version) FROM schema_version") == len(sql._MIGRATIONS)
+    assert await sql.migrate() == 0  # once per process
+    await sql.dispose_engine()
+    assert await sql.migrate() == 0  # and once per database
+    assert await scalar("SELECT COUNT(*) FROM schema_version") == 1
+
+
+async def test_sql_migrate_applies_only_new_steps(sqlite_db, monkeypatch):
+    full = list(sql._MIGRATIONS)
+    monkeypatch.setattr(sql, "_MIGRATIONS", full[:7])
+    assert await sql.migrate() == 7
+    assert await scalar("SELECT MAX(version) FROM schema_version") == 7
+    await sql.dispose_engine()
+    monkeypatch.setattr(sql, "_MIGRATIONS", full)
+    assert await sql.migrate() == len(full) - 7
+    assert await scalar("SELECT MAX(version) FROM schema_version") == len(full)
+    assert await scalar("SELECT COUNT(tenant_id) FROM documents") == 0
+
+
+async def test_sql_bulk_insert_through_the_writer(sqlite_db):
+    writer = MetadataWriter("postgres", _FLUSH["postgres"], max_rows=4, max_delay_s=10)
+    for i in range(10):
+        await writer.add(record(i, tenant_id="acme" if i % 2 else None))
+    assert (writer.stats.flushes, writer.pending()) == (2, 2)
+    await writer.close()
+    assert (writer.stats.rows, writer.stats.errors) == (10, 0)
+    assert await scalar("SELECT COUNT(*) FROM ingestions") == 10
+    assert await scalar("SELECT COUNT(*) FROM ingestions WHERE tenant_id = 'acme'") == 5
+    assert await scalar("SELECT timings FROM ingestions WHERE doc_id = 'doc-3'") == '{"ingest_s": 0.5}'
+
+
+async def test_flushes_when_max_rows_accumulate():
+    sink = Sink()
+    writer = MetadataWriter("test", sink, max_rows=3, max_delay_s=60)
+    for i in range(7):
+        await writer.add(record(i))
+    assert [len(b) for b in sink.batches] == [3, 3]
+    assert writer.pending() == 1
+    await writer.close()
+    assert [len(b) for b in sink.batches] == [3, 3, 1]
+    assert sink.files() == [f"doc-{i}.pdf" for i in range(7)]
+
+
+async def test_flushes_after_max_delay():
+    sink = Sink()
+    writer = MetadataWriter("test", sink, max_rows=100, max_delay_s=0.05)
+    await writer.add(record(0))
+    await writer.add(record(1))
+    assert sink.batches == []
+    await asyncio.sleep(0.15)
+    assert [len(b) for b in sink.batches] == [2]
+    assert (writer.stats.rows, writer.stats.flushes, writer.pending()) == (2, 1, 0)
+    await writer.close()
+
+
+async def test_failed_flush_is_retried_in_order():
+    sink = Sink(failures=1)
+    writer = MetadataWriter("test", sink, max_rows=2, max_delay_s=0.05)
+    await writer.add(record(0))
+    await writer.add(record(1))  # flush fails, rows stay queued
+    assert (writer.stats.errors, writer.pending()) == (1, 2)
+    await writer.add(record(2))
+    await asyncio.sleep(0.15)  # the retry timer flushes everything
+    assert sink.files() == ["doc-0.pdf", "doc-1.pdf", "doc-2.pdf"]
+    assert (writer.stats.rows, writer.pending()) == (3, 0)
+    await writer.close()
+
+
+async def test_overflow_drops_the_oldest_rows():
+    sink = Sink(failures=100)
+    writer = MetadataWriter("test", sink, max_rows=2, max_delay_s=60, max_pending=5)
+    for i in range(8):
+        await writer.add(record(i))
+    assert writer.pending() == 5
+    assert writer.stats.dropped == 3
+    sink.failures = 0
+    await writer.close()
+    assert sink.files() == [f"doc-{i}.pdf" for i in range(3, 8)]
+
+
+async def test_mongo_bulk_path(monkeypatch):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    monkeypatch.setattr(nosql, "_client", mongomock_motor.AsyncMongoMockClient())
+    monkeypatch.setattr(nosql, "_migrated", False)
+    writer = MetadataWriter("mongodb", _FLUSH["mongodb"], max_rows=3, max_delay_s=60)
+    for i in range(7):
+        await writer.add(record(i, tenant_id="acme"))
+    await writer.close()
+    db = nosql._mongo()[nosql.settings.MONGODB_DB]
+    assert (writer.stats.rows, writer.stats.flushes, writer.stats.errors) == (7, 3, 0)
+    assert await db.ingestions.count_documents({"tenant_id": "acme"}) == 7
+    assert (await db.ingestions.find_one({"doc_id": "doc-4"}))["timings"] == {"ingest_s": 0.5}
+    assert "ix_ingestions_doc_id" in await db.ingestions.index_information()
+    assert "ix_documents_tenant" in await db.documents.index_information()
+    assert await nosql.migrate() == 0
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from app.core.config import get_settings
+from app.services.onnx_embedder import PROBE_TEXTS, artifact_dir, load_onnx_embedder
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("tokenizers")
+torch = pytest.importorskip("torch")
+st = pytest.importorskip("sentence_transformers")
+transformers = pytest.importorskip("transformers")
+
+TEXTS = PROBE_TEXTS + [
+    "Short.",
+    "A much longer passage about invoices, refunds and passwords that pads every other text in its batch " * 3,
+    "",
+]
+
+
+@pytest.fixture(scope="module")
+def tiny_model(tmp_path_factory):
+    # a small randomly initialised BERT saved as a sentence-transformers model:
+    # the export path is the real one, without downloading a checkpoint
+    root = tmp_path_factory.mktemp("model")
+    words = sorted({w for t in TEXTS for w in t.lower().replace(",", " ").replace(".", " ").replace("?", " ").split()})
+    (root / "vocab.txt").write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", ",", ".", "?", *words]))
+    tokenizer = transformers.BertTokenizerFast(vocab_file=str(root / "vocab.txt"))
+    config = transformers.BertConfig(vocab_size=tokenizer.vocab_size, hidden_size=64, num_hidden_layers=2,
+                                     num_attention_heads=4, intermediate_size=128, max_position_embeddings=128)
+    torch.manual_seed(0)
+    transformers.BertModel(config).save_pretrained(root / "bert")
+    tokenizer.save_pretrained(root / "bert")
+    try:
+        from sentence_transformers.sentence_transformer.modules import Normalize, Pooling, Transformer
+    except ImportError:  # sentence-transformers < 5
+        from sentence_transformers.models import Normalize, Pooling, Transformer
+    body = Transformer(str(root / "bert"), max_seq_length=128)
+    model = st.SentenceTransformer(modules=[body, Pooling(64, "mean"), Normalize()], device="cpu")
+    model.save(str(root / "st"))
+    return str(root / "st"), model
+
+
+@pytest.mark.parametrize("quantize", [False, True])
+def test_onnx_matches_pytorch(tiny_model, tmp_path, quantize):
+    name, model = tiny_model
+    min_cosine = get_settings().ONNX_MIN_COSINE
+    embedder = load_onnx_embedder(name, tmp_path, quantize=quantize, batch_size=3, min_cosine=min_cosine)
+    assert embedder.config["min_cosine"] >= min_cosine
+    for normalize in (True, False):
+        ours = embedder.encode(TEXTS, normalize_embeddings=normalize)
+        ref = model.encode(TEXTS, normalize_embeddings=normalize, convert_to_numpy=True)
+        assert ours.shape == ref.shape == (len(TEXTS), embedder.dim)
+        cos = (ours * ref).sum(1) / (np.linalg.norm(ours, axis=1) * np.linalg.norm(ref, axis=1))
+        assert cos.min() >= min_cosine
+    # the model ends in Normalize, and the artifact remembers it
+    np.testing.assert_allclose(np.linalg.norm(embedder.encode(TEXTS), axis=1), 1.0, rtol=1e-5)
+
+
+def test_export_is_cached(tiny_model, tmp_path):
+    name, _ = tiny_model
+    load_onnx_embedder(name, tmp_path)
+    path = artifact_dir(tmp_path, name, False) / "model.onnx"
+    mtime = path.stat().st_mtime_ns
+    load_onnx_embedder(name, tmp_path)
+    assert path.stat().st_mtime_ns == mtime
+
+
+def test_export_rejects_a_disagreeing_model(tiny_model, tmp_path):
+    name, _ = tiny_model
+    with pytest.raises(RuntimeError, match="disagrees with PyTorch"):
+        load_onnx_embedder(name, tmp_path, quantize=True, min_cosine=1.01)
+    assert not artifact_dir(tmp_path, name, True).exists()
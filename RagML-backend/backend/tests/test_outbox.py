@@ -0,0 +1,140 @@
+import asyncio
+import socket
+import time
+import pytest
+from app.core.email import SmtpSession
+from app.services import outbox
+
+pytestmark = pytest.mark.anyio
+aiosmtpd = pytest.importorskip("aiosmtpd.controller")
+
+
+class Handler:
+    def __init__(self, replies=()):
+        self.replies = list(replies)  # served first, then "250 OK"
+        self.received: list[str] = []
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.replies:
+            return self.replies.pop(0)
+        self.received.extend(envelope.rcpt_tos)
+        return "250 OK"
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    def start(replies=()):
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        handler = Handler(replies)
+        controller = aiosmtpd.Controller(handler, hostname="127.0.0.1", port=port)
+        controller.start()
+        started.append(controller)
+        for name, value in [("SMTP_HOST", "127.0.0.1"), ("SMTP_PORT", port), ("SMTP_STARTTLS", False),
+                            ("SMTP_USERNAME", None), ("SENDGRID_API_KEY", None)]:
+            monkeypatch.setattr(outbox.settings, name, value)
+        return handler
+    started: list = []
+    yield start
+    for c in started:
+        c.stop()
+
+
+@pytest.fixture(autouse=True)
+def fresh_outbox(monkeypatch):
+    monkeypatch.setattr(outbox, "_wake", None)
+    monkeypatch.setattr(outbox, "_disabled", None)
+    monkeypatch.setattr(outbox.settings, "EMAIL_POLL_S", 0.02)
+    monkeypatch.setattr(outbox.settings, "EMAIL_RETRY_BACKOFF_S", 0.05)
+
+
+def session() -> SmtpSession:
+    s = outbox.settings
+    return SmtpSession(s.SMTP_HOST, s.SMTP_PORT, None, None, starttls=False)
+
+
+async def wait_for(cond, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not await cond():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.02)
+
+
+async def test_senders_deliver_and_clear_the_queue(redis, smtp):
+    handler = smtp()
+    msgs = [await outbox.enqueue([f"u{i}@example.com"], "hi", "<p>hi</p>") for i in range(5)]
+    outbox.start_senders(2)
+    try:
+        async def delivered():
+            return len(handler.received) == 5 and (await outbox.get_message(msgs[-1].id)).status == "sent"
+        await wait_for(delivered)
+        health = await outbox.outbox_health()
+        assert (health["status"], health["senders"], health["local_senders"]) == ("ok", 2, 2)
+    finally:
+        await outbox.stop_senders()
+    for m in msgs:
+        stored = await outbox.get_message(m.id)
+        assert (stored.status, stored.attempts, stored.error) == ("sent", 1, None)
+    assert sorted(handler.received) == sorted(f"u{i}@example.com" for i in range(5))
+    assert await redis.zcard(outbox.DUE) == 0
+    assert not await redis.keys("outbox:lease:*")
+    assert await outbox.live_senders() == 0  # stopped senders deregister
+
+
+async def test_claim_is_exclusive_until_the_lease_expires(redis, monkeypatch):
+    monkeypatch.setattr(outbox.settings, "EMAIL_LEASE_S", 1.0)
+    msg = await outbox.enqueue(["a@example.com"], "hi", "<p>hi</p>")
+    assert [m.id for m in await outbox.claim(10, "a")] == [msg.id]
+    assert await outbox.claim(10, "b") == []
+    await asyncio.sleep(1.1)  # sender "a" died holding the message
+    assert [m.id for m in await outbox.claim(10, "b")] == [msg.id]
+    assert await redis.get(outbox._lease_key(msg.id)) == b"b"
+
+
+async def test_transient_failures_are_retried_then_delivered(redis, smtp):
+    handler = smtp(["451 4.3.0 try again later"])
+    msg = await outbox.enqueue(["a@example.com"], "hi", "<p>hi</p>")
+    s = session()
+    try:
+        await outbox.deliver(s, await outbox.claim(10, "a"))
+        stored = await outbox.get_message(msg.id)
+        assert (stored.status, stored.attempts) == ("retrying", 1)
+        assert "451" in stored.error
+        assert await outbox.claim(10, "a") == []  # backing off
+        await asyncio.sleep(0.1)
+        await outbox.deliver(s, await outbox.claim(10, "a"))
+    finally:
+        s.close()
+    stored = await outbox.get_message(msg.id)
+    assert (stored.status, stored.attempts, stored.error) == ("sent", 2, None)
+    assert handler.received == ["a@example.com"]
+    assert await redis.zcard(outbox.DUE) == 0
+
+
+async def test_rejected_messages_fail_without_retry(redis, smtp):
+    smtp(["550 5.1.1 no such user"])
+    msg = await outbox.enqueue(["nobody@example.com"], "hi", "<p>hi</p>")
+    s = session()
+    try:
+        await outbox.deliver(s, await outbox.claim(10, "a"))
+    finally:
+        s.close()
+    stored = await outbox.get_message(msg.id)
+    assert (stored.status, stored.attempts) == ("failed", 1)
+    assert await redis.zcard(outbox.DUE) == 0
+
+
+async def test_unconfigured_sender_is_reported(redis, monkeypatch):
+    monkeypatch.setattr(outbox.settings, "SMTP_HOST", None)
+    monkeypatch.setattr(outbox.settings, "SENDGRID_API_KEY", None)
+    await outbox.enqueue(["a@example.com"], "hi", "<p>hi</p>")
+    outbox.start_senders(1)
+    try:
+        await asyncio.sleep(0.05)
+        health = await outbox.outbox_health()
+    finally:
+        await outbox.stop_senders()
+    assert health["status"] == "no_sender"
+    assert (health["senders"], health["local_senders"], health["pending"], health["due"]) == (0, 0, 1, 1)
+    assert "not configured" in health["disabled"]
@@ -0,0 +1,72 @@
+from pathlib import Path
+import pytest
+from app.api import rag
+from app.api.ingestion import remove_document, remove_tenant
+from app.models.schemas import ChatQuery, DBBackend, VectorBackend
+from app.services.manifest import load_manifest
+from conftest import ingest_text
+
+pytestmark = pytest.mark.anyio
+MODES = ["dense", "lexical", "hybrid"]
+
+
+def text(words, n=3):
+    return "\n\n".join(f"Section {i} covers {words} in detail, {words} again." for i in range(n))
+
+
+@pytest.fixture
+async def corpus(local_rag, monkeypatch):
+    monkeypatch.setattr(local_rag, "VECTOR_BACKEND", "local")
+    # the same words everywhere, so a leak across tenants would rank
+    await ingest_text(text("shared billing policy"), doc_id="a1", tenant_id="A")
+    await ingest_text(text("shared billing refunds"), doc_id="a2", tenant_id="A")
+    await ingest_text(text("shared billing policy"), doc_id="a1", tenant_id="B")  # doc ids are per tenant
+    await ingest_text(text("shared billing policy"), doc_id="d1")
+    return local_rag
+
+
+async def found(mode, tenant_id=None, doc_ids=None):
+    hits = await rag.retrieve(ChatQuery(session_id="s", query="shared billing policy", top_k=20, retrieval=mode,
+                                        tenant_id=tenant_id, doc_ids=doc_ids))
+    return {(h[2].get("tenant_id"), h[2]["doc_id"]) for h in hits}
+
+
+@pytest.mark.parametrize("mode", MODES)
+async def test_tenants_only_see_their_own_documents(corpus, mode):
+    assert await found(mode, "A") == {("A", "a1"), ("A", "a2")}
+    assert await found(mode, "B") == {("B", "a1")}
+    assert await found(mode) == {(None, "d1")}
+    assert await found(mode, "nobody") == set()
+
+
+@pytest.mark.parametrize("mode", MODES)
+async def test_doc_ids_filter_within_a_tenant(corpus, mode):
+    assert await found(mode, "A", ["a2"]) == {("A", "a2")}
+    assert await found(mode, "A", ["a1", "missing"]) == {("A", "a1")}
+    assert await found(mode, "B", ["a2"]) == set()
+
+
+async def test_delete_document_removes_it_from_one_tenant(corpus):
+    deleted = await remove_document("a1", VectorBackend.local, DBBackend.postgres, tenant_id="A")
+    assert deleted.chunks > 0
+    for mode in MODES:
+        assert await found(mode, "A") == {("A", "a2")}
+        assert await found(mode, "B") == {("B", "a1")}
+    assert await load_manifest("postgres", "A/a1", "local") is None
+    assert await load_manifest("postgres", "B/a1", "local") is not None
+
+
+async def test_drop_tenant_removes_vectors_lexical_entries_and_manifests(corpus):
+    dropped = await remove_tenant("A", VectorBackend.local, DBBackend.postgres)
+    assert dropped.documents == 2
+    for mode in MODES:
+        assert await found(mode, "A") == set()
+        assert await found(mode, "B") == {("B", "a1")}
+        assert await found(mode) == {(None, "d1")}
+    assert await load_manifest("postgres", "A/a2", "local") is None
+    assert await load_manifest("postgres", "B/a1", "local") is not None
+    for root in (corpus.LOCAL_INDEX_PATH, corpus.LEXICAL_INDEX_PATH):
+        assert len(list((Path(root) / "tenants").iterdir())) == 1  # only B's partition is left
+    # the tenant starts over empty, without the old chunks resurfacing
+    await ingest_text(text("shared billing policy", n=1), doc_id="a9", tenant_id="A")
+    assert await found("hybrid", "A") == {("A", "a9")}
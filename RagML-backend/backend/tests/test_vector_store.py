@@ -0,0 +1,129 @@
+import pytest
+from app.services.vector_store import PooledStore
+
+pytestmark = pytest.mark.anyio
+
+
+class StubStore(PooledStore):
+    name = "stub"
+
+    def __init__(self):
+        super().__init__()
+        self.connects = 0
+
+    async def _connect(self):
+        self.connects += 1
+        return object()
+
+    async def _disconnect(self, client):
+        pass
+
+
+def failing(*errors):
+    errors = list(errors)
+
+    async def fn(client):
+        if errors:
+            raise errors.pop(0)
+        return client
+    return fn
+
+
+def wrapped(inner: Exception) -> Exception:
+    # the shape SDKs raise: their own exception type around the transport error
+    try:
+        raise inner
+    except Exception as e:
+        try:
+            raise KeyError("sdk wrapper") from e
+        except KeyError as outer:
+            return outer
+
+
+def qdrant_wrapped(inner: Exception) -> Exception:
+    exc = pytest.importorskip("qdrant_client.http.exceptions")
+    return exc.ResponseHandlingException(inner)
+
+
+@pytest.mark.parametrize("error", [
+    ConnectionResetError("reset by peer"),
+    TimeoutError("read timed out"),
+    lambda: wrapped(BrokenPipeError()),
+    lambda: qdrant_wrapped(pytest.importorskip("httpx").ConnectError("refused")),
+])
+async def test_transport_errors_reconnect_and_retry(error):
+    store = StubStore()
+    first = await store._get_client()
+    result = await store._call(failing(error() if callable(error) else error))
+    assert store.connects == 2 and result is not first
+
+
+@pytest.mark.parametrize("error", [AttributeError("x"), TypeError("y"), ImportError("z"),
+                                   ValueError("bad dim"), KeyError("missing")])
+async def test_other_errors_propagate_without_reconnecting(error):
+    store = StubStore()
+    client = await store._get_client()
+    with pytest.raises(type(error)):
+        await store._call(failing(error))
+    assert store.connects == 1 and store._client is client
+
+
+async def test_a_second_transport_failure_propagates():
+    store = StubStore()
+    with pytest.raises(ConnectionError):
+        await store._call(failing(ConnectionError(), ConnectionError()))
+    assert store.connects == 2
+
+
+async def test_grpc_status_decides():
+    grpc = pytest.importorskip("grpc")
+
+    class Rpc(grpc.RpcError):
+        def __init__(self, code):
+            self._code = code
+
+        def code(self):
+            return self._code
+
+    store = StubStore()
+    await store._call(failing(Rpc(grpc.StatusCode.UNAVAILABLE)))
+    assert store.connects == 2
+    with pytest.raises(grpc.RpcError):
+        await store._call(failing(Rpc(grpc.StatusCode.INVALID_ARGUMENT)))
+    assert store.connects == 2
+
+
+@pytest.fixture
+def qdrant_store(monkeypatch):
+    qdrant_client = pytest.importorskip("qdrant_client")
+    from app.services import vector_store
+    real = qdrant_client.AsyncQdrantClient
+    monkeypatch.setattr(qdrant_client, "AsyncQdrantClient", lambda url: real(location=":memory:"))
+    monkeypatch.setattr(vector_store, "embedding_dim", lambda: 8)
+    monkeypatch.setattr(vector_store.settings, "VECTOR_QUANTIZATION", "none")
+    return vector_store.QdrantStore()
+
+
+@pytest.mark.filterwarnings("ignore:Payload indexes have no effect")
+async def test_qdrant_search_and_batch_search(qdrant_store):
+    import uuid
+    import numpy as np
+    from app.services.vector_store import SearchFilter, VectorBatch
+    rng = np.random.default_rng(0)
+    vecs = rng.standard_normal((6, 8)).astype(np.float32)
+    ids = [str(uuid.UUID(int=i + 1)) for i in range(6)]
+    meta = [{"doc_id": f"d{i % 2}"} for i in range(6)]
+    await qdrant_store.upsert(VectorBatch(ids[:4], vecs[:4], ["t"] * 4, meta[:4]))
+    await qdrant_store.upsert(VectorBatch(ids[4:], vecs[4:], ["t"] * 2, meta[4:]), tenant_id="acme")
+    try:
+        hits = await qdrant_store.search(vecs[1], top_k=2)
+        assert hits[0][0] == ids[1] and hits[0][2]["doc_id"] == "d1"
+        assert {h[0] for h in await qdrant_store.search(vecs[1], top_k=10)} == set(ids[:4])
+        batch = await qdrant_store.search_batch(vecs[:3], top_k=1, where=SearchFilter(None, ("d0",)))
+        unit = vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+        d0 = [0, 2]
+        assert [[h[0] for h in hits] for hits in batch] == [[ids[d0[int(np.argmax(unit[d0] @ q))]]] for q in unit[:3]]
+        batch = await qdrant_store.search_batch(vecs[4:], top_k=5, where=SearchFilter("acme"))
+        assert [hits[0][0] for hits in batch] == ids[4:] and all(len(h) == 2 for h in batch)
+    finally:
+        await qdrant_store.close()